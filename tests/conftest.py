@@ -1,7 +1,71 @@
+import threading
+
 import pytest
+import requests
 from faker import Faker
 from requests_mock import Mocker
 
+from yelpapi.transport import InMemoryResponse
+
+
+class Clock:
+    """A fake clock, which only moves when `now` is changed."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeBackend:
+    """
+    An `InMemoryTransport` handler that takes `latency` seconds of `clock` time per request (raising a `ReadTimeout`
+    if that is longer than the request's timeout), then raises `error` or answers with `status_code` and `body` (plus
+    the request's `url`). While `gate` is clear, requests block until it is set. Every request is recorded.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.status_code = 200
+        self.body = {}
+        self.error = None
+        self.latency = 0.0
+        self.gate = threading.Event()
+        self.gate.set()
+        self.requests = []
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self.lock = threading.Lock()
+
+    @property
+    def calls(self):
+        return len(self.requests)
+
+    @property
+    def timeouts(self):
+        return [request.timeout for request in self.requests]
+
+    @property
+    def sent(self):
+        """The last path segment (e.g., the business ID) of every request, in order."""
+        return [request.url.rsplit('/', 1)[-1] for request in self.requests]
+
+    def __call__(self, request):
+        with self.lock:
+            self.requests.append(request)
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        self.gate.wait(5)
+        with self.lock:
+            self.concurrent -= 1
+        self.clock.now += self.latency
+        if request.timeout is not None and self.latency > request.timeout:
+            raise requests.exceptions.ReadTimeout()
+        if self.error is not None:
+            raise self.error
+        return InMemoryResponse({**self.body, 'url': request.url}, self.status_code, request.url)
+
 
 @pytest.fixture(autouse=True)
 def mock_request():
@@ -12,3 +76,13 @@ def mock_request():
 @pytest.fixture
 def faker():
     return Faker()
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def backend(clock):
+    return FakeBackend(clock)
@@ -0,0 +1,161 @@
+import pytest
+import requests
+from unittest.mock import MagicMock
+
+from yelpapi import YelpAPI
+from yelpapi.breaker import CircuitBreakerTransport, CircuitOpenError
+from yelpapi.deadline import Deadline, DeadlineExceeded
+from yelpapi.transport import InMemoryTransport
+from yelpapi.yelpapi import BUSINESS_API_URL, REVIEW_HIGHLIGHTS_API_URL
+
+
+@pytest.fixture
+def breaker(backend, clock):
+    return CircuitBreakerTransport(InMemoryTransport(backend), window=4, min_requests=4, open_s=10, probes=2,
+                                   clock=clock)
+
+
+@pytest.fixture
+def yelp(breaker):
+    return YelpAPI('key', transport=breaker)
+
+
+def call(yelp, business_id='x'):
+    try:
+        yelp.review_highlights_query(business_id)
+    except requests.exceptions.RequestException as e:
+        return e
+    return None
+
+
+class TestCircuitBreaker:
+    def test_validates_failure_rate(self):
+        with pytest.raises(ValueError):
+            CircuitBreakerTransport(InMemoryTransport(), failure_rate=0)
+
+    def test_stays_closed_when_healthy(self, yelp, breaker, backend):
+        backend.status_code = 500
+        call(yelp)
+        backend.status_code = 200
+        for _ in range(10):
+            assert call(yelp) is None
+
+        assert breaker.states() == {REVIEW_HIGHLIGHTS_API_URL: 'closed'}
+
+    @pytest.mark.parametrize('status_code, error', [(500, None), (200, requests.exceptions.ConnectionError())])
+    def test_opens_on_errors(self, yelp, breaker, backend, status_code, error):
+        backend.status_code, backend.error = status_code, error
+        for _ in range(4):
+            assert not isinstance(call(yelp), CircuitOpenError)
+
+        error = call(yelp)
+
+        assert isinstance(error, CircuitOpenError)
+        assert error.endpoint == REVIEW_HIGHLIGHTS_API_URL
+        assert error.retry_after_s == 10
+        assert backend.calls == 4
+        assert breaker.stats() == {REVIEW_HIGHLIGHTS_API_URL: {'state': 'open', 'requests': 4, 'failure_rate': 1.0}}
+
+    def test_opens_on_slow_calls(self, backend, clock):
+        breaker = CircuitBreakerTransport(InMemoryTransport(backend), slow_call_s=1, window=4, min_requests=4,
+                                          clock=clock)
+        yelp = YelpAPI('key', transport=breaker)
+        backend.latency = 2
+        for _ in range(4):
+            call(yelp)
+
+        assert isinstance(call(yelp), CircuitOpenError)
+
+    @pytest.mark.parametrize('deadline_caused', ['raised', 'timeout'])
+    def test_deadline_is_neutral(self, yelp, breaker, backend, clock, deadline_caused):
+        if deadline_caused == 'raised':
+            backend.error = DeadlineExceeded()
+        else:
+            backend.latency = 2
+        for _ in range(4):
+            with pytest.raises(requests.exceptions.Timeout):
+                yelp.review_highlights_query('x', deadline=Deadline(1, clock=clock))
+
+        assert breaker.stats() == {REVIEW_HIGHLIGHTS_API_URL: {'state': 'closed', 'requests': 0, 'failure_rate': 0.0}}
+
+    def test_deadline_does_not_fail_probe(self, yelp, breaker, backend, clock):
+        backend.status_code = 500
+        for _ in range(4):
+            call(yelp)
+        backend.status_code = 200
+        clock.now += 10
+        backend.latency = 2
+
+        with pytest.raises(requests.exceptions.Timeout):
+            yelp.review_highlights_query('x', deadline=Deadline(1, clock=clock))
+        backend.latency = 0
+
+        assert breaker.states() == {REVIEW_HIGHLIGHTS_API_URL: 'half_open'}
+        assert call(yelp) is None
+        assert call(yelp) is None
+        assert breaker.states() == {REVIEW_HIGHLIGHTS_API_URL: 'closed'}
+
+    def test_circuits_are_per_endpoint(self, yelp, breaker, backend):
+        backend.status_code = 500
+        for i in range(4):
+            call(yelp, str(i))
+        backend.status_code = 200
+
+        assert yelp.business_query('x') == {'url': BUSINESS_API_URL.format('x')}
+        assert breaker.states() == {REVIEW_HIGHLIGHTS_API_URL: 'open', BUSINESS_API_URL: 'closed'}
+
+    def test_half_open_probes_close_circuit(self, yelp, breaker, backend, clock):
+        backend.status_code = 500
+        for _ in range(4):
+            call(yelp)
+        backend.status_code = 200
+        clock.now += 10
+
+        assert breaker.states() == {REVIEW_HIGHLIGHTS_API_URL: 'half_open'}
+        assert call(yelp) is None
+        assert breaker.states() == {REVIEW_HIGHLIGHTS_API_URL: 'half_open'}
+        assert call(yelp) is None
+        assert breaker.stats() == {REVIEW_HIGHLIGHTS_API_URL: {'state': 'closed', 'requests': 0, 'failure_rate': 0.0}}
+
+    def test_failed_probe_reopens(self, yelp, breaker, backend, clock):
+        backend.status_code = 500
+        for _ in range(4):
+            call(yelp)
+        clock.now += 10
+
+        call(yelp)
+
+        assert breaker.states() == {REVIEW_HIGHLIGHTS_API_URL: 'open'}
+        assert isinstance(call(yelp), CircuitOpenError)
+
+    def test_limits_concurrent_probes(self, breaker, backend, clock):
+        backend.status_code = 500
+        for _ in range(4):
+            breaker._admit(REVIEW_HIGHLIGHTS_API_URL)
+            breaker._record(REVIEW_HIGHLIGHTS_API_URL, False, failed=True)
+        clock.now += 10
+
+        assert breaker._admit(REVIEW_HIGHLIGHTS_API_URL)
+        assert breaker._admit(REVIEW_HIGHLIGHTS_API_URL)
+        with pytest.raises(CircuitOpenError):
+            breaker._admit(REVIEW_HIGHLIGHTS_API_URL)
+
+        breaker._record(REVIEW_HIGHLIGHTS_API_URL, True, failed=True)
+        breaker._record(REVIEW_HIGHLIGHTS_API_URL, True, failed=False)
+
+        assert breaker.states() == {REVIEW_HIGHLIGHTS_API_URL: 'open'}
+
+    def test_annotates_span(self, yelp):
+        spans = []
+        yelp.hooks['response'].append(spans.append)
+
+        call(yelp)
+
+        assert spans[0].attributes == {'circuit_state': 'closed'}
+
+    def test_close(self):
+        inner = MagicMock()
+
+        CircuitBreakerTransport(inner).close()
+
+        inner.close.assert_called_once()
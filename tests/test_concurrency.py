@@ -0,0 +1,228 @@
+import random
+import threading
+import time
+
+import pytest
+import requests
+
+from yelpapi import YelpAPI
+from yelpapi.concurrency import AdaptiveConcurrencyTransport
+from yelpapi.deadline import Deadline, DeadlineExceeded
+from yelpapi.transport import InMemoryTransport
+
+
+def limiter_and_api(backend, clock, **kwargs):
+    limiter = AdaptiveConcurrencyTransport(InMemoryTransport(backend), clock=clock, **kwargs)
+    return limiter, YelpAPI('key', transport=limiter)
+
+
+def call(yelp):
+    try:
+        yelp.business_query('x')
+    except (requests.exceptions.RequestException, ValueError):
+        pass
+
+
+def concurrently(yelp, n):
+    threads = [threading.Thread(target=call, args=(yelp,)) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def wait_until(predicate):
+    deadline = time.monotonic() + 5
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_limits_requests_in_flight(backend, clock):
+    limiter, yelp = limiter_and_api(backend, clock, initial_limit=2)
+    backend.gate.clear()
+
+    threads = concurrently(yelp, 6)
+    wait_until(lambda: backend.concurrent == 2)
+    time.sleep(0.05)
+
+    assert backend.max_concurrent == 2
+    assert limiter.in_flight == 2
+
+    backend.gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert limiter.in_flight == 0
+
+
+def test_increases_only_while_in_use(backend, clock):
+    limiter, yelp = limiter_and_api(backend, clock, initial_limit=1)
+
+    for _ in range(10):
+        call(yelp)
+
+    # One request at a time only ever fills half of a limit of 2.
+    assert limiter.limit == 2
+    assert list(limiter.history) == [(0, 1), (0, 2)]
+
+
+def test_max_limit(backend, clock):
+    limiter, yelp = limiter_and_api(backend, clock, initial_limit=1, max_limit=1)
+
+    call(yelp)
+
+    assert limiter.limit == 1
+
+
+@pytest.mark.parametrize('status_code, error', [
+    (429, None),
+    (503, None),
+    (200, requests.exceptions.ReadTimeout()),
+    (200, requests.exceptions.ConnectionError()),
+])
+def test_backs_off(backend, clock, status_code, error):
+    limiter, yelp = limiter_and_api(backend, clock, initial_limit=8, min_limit=2)
+    backend.status_code, backend.error = status_code, error
+
+    for limit in (4, 2, 2):
+        clock.now += 1
+        call(yelp)
+
+        assert limiter.limit == limit
+
+    assert list(limiter.history) == [(0, 8), (1, 4), (2, 2)]
+
+
+@pytest.mark.parametrize('status_code, error', [(404, None), (200, ValueError())])
+def test_other_errors_are_neutral(backend, clock, status_code, error):
+    limiter, yelp = limiter_and_api(backend, clock, initial_limit=1)
+    backend.status_code, backend.error = status_code, error
+
+    call(yelp)
+
+    assert limiter.limit == 1
+
+
+def test_deadline_timeout_is_neutral(backend, clock):
+    limiter, yelp = limiter_and_api(backend, clock, initial_limit=4)
+    backend.error = requests.exceptions.ReadTimeout()
+    backend.latency = 1
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        yelp.business_query('x', deadline=Deadline(1, clock=clock))
+    assert limiter.limit == 4
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        yelp.business_query('x', deadline=Deadline(5, clock=clock))
+    assert limiter.limit == 2
+
+
+def test_deadline_while_waiting_for_slot(backend, clock):
+    limiter, yelp = limiter_and_api(backend, clock, initial_limit=1)
+    backend.gate.clear()
+    threads = concurrently(yelp, 1)
+    wait_until(lambda: backend.concurrent == 1)
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        yelp.business_query('x', deadline=Deadline(0.05))
+
+    assert time.monotonic() - start < 0.5
+    assert limiter.in_flight == 1
+    backend.gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert limiter.in_flight == 0
+
+
+def test_burst_of_errors_backs_off_once(backend, clock):
+    limiter, yelp = limiter_and_api(backend, clock, initial_limit=4)
+    backend.status_code = 429
+    backend.latency = 1
+    backend.gate.clear()
+
+    threads = concurrently(yelp, 3)
+    wait_until(lambda: backend.concurrent == 3)
+    backend.gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert limiter.limit == 2
+
+
+def test_backs_off_on_latency(backend, clock):
+    limiter, yelp = limiter_and_api(backend, clock, initial_limit=4)
+    backend.latency = 1
+    for _ in range(10):
+        call(yelp)
+
+    # A single slow request is smoothed over; a sustained slowdown is not.
+    backend.latency = 3
+    for _ in range(3):
+        call(yelp)
+
+    assert limiter.limit == 4
+
+    call(yelp)
+
+    assert limiter.limit == 2
+
+
+def test_latency_noise_is_not_overload(backend, clock):
+    limiter, yelp = limiter_and_api(backend, clock, initial_limit=16)
+    rng = random.Random(0)
+
+    for _ in range(500):
+        backend.latency = rng.lognormvariate(0, 0.5)
+        call(yelp)
+
+    assert limiter.limit == 16
+
+
+def test_latency_is_tracked_per_endpoint(backend, clock):
+    limiter, yelp = limiter_and_api(backend, clock, initial_limit=4)
+
+    for _ in range(20):
+        backend.latency = 0.01
+        yelp.autocomplete_query(text='x')
+        backend.latency = 1
+        call(yelp)
+
+    assert limiter.limit == 4
+
+
+def test_ignores_latency(backend, clock):
+    limiter, yelp = limiter_and_api(backend, clock, initial_limit=4, latency_tolerance=None)
+    backend.latency = 1
+    call(yelp)
+    backend.latency = 10
+    call(yelp)
+
+    assert limiter.limit == 4
+
+
+def test_annotates_span(backend, clock):
+    limiter, yelp = limiter_and_api(backend, clock, initial_limit=3)
+    spans = []
+    yelp.hooks['response'].append(spans.append)
+
+    call(yelp)
+
+    assert spans[0].attributes['concurrency_limit'] == 3
+
+
+@pytest.mark.parametrize('kwargs, match', [
+    ({'backoff': 1}, 'backoff'),
+    ({'initial_limit': 0, 'min_limit': 0}, 'Limits'),
+    ({'initial_limit': 8, 'max_limit': 4}, 'Limits'),
+])
+def test_invalid_arguments(kwargs, match):
+    with pytest.raises(ValueError, match=match):
+        AdaptiveConcurrencyTransport(InMemoryTransport(), **kwargs)
+
+
+def test_close():
+    transport = InMemoryTransport()
+    transport.close = lambda: setattr(transport, 'closed', True)
+
+    AdaptiveConcurrencyTransport(transport).close()
+
+    assert transport.closed
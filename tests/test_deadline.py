@@ -0,0 +1,178 @@
+import pytest
+import requests
+
+from yelpapi import CrawlPlanner, GeoIndex, RefreshScheduler, YelpAPI
+from yelpapi.deadline import Deadline, DeadlineExceeded, PartialDict, PartialList
+from yelpapi.transport import InMemoryTransport
+from yelpapi.yelpapi import BUSINESS_API_URL
+
+
+@pytest.fixture
+def backend(backend):
+    backend.body = {'businesses': [], 'total': 100}
+    return backend
+
+
+class TestDeadline:
+    def test_remaining(self, clock):
+        deadline = Deadline(2, clock=clock)
+        clock.now = 0.5
+
+        assert deadline.remaining() == 1.5
+        assert not deadline.expired
+
+        clock.now = 3
+
+        assert deadline.remaining() == 0
+        assert deadline.expired
+
+    @pytest.mark.parametrize('timeout_s, expected', [(None, 1.5), (1, 1), (5, 1.5)])
+    def test_timeout(self, clock, timeout_s, expected):
+        deadline = Deadline(2, clock=clock)
+        clock.now = 0.5
+
+        assert deadline.timeout(timeout_s) == expected
+
+    def test_timeout_after_deadline(self, clock):
+        deadline = Deadline(2, clock=clock)
+        clock.now = 2
+
+        with pytest.raises(DeadlineExceeded, match='exceeded'):
+            deadline.timeout(1)
+
+    def test_cancellation_token(self):
+        deadline = Deadline()
+
+        assert deadline.remaining() is None
+        assert deadline.timeout(3) == 3
+        assert not deadline.cancelled
+
+        deadline.cancel()
+
+        assert deadline.cancelled
+        assert deadline.expired
+        with pytest.raises(DeadlineExceeded, match='cancelled'):
+            deadline.timeout(3)
+
+    def test_stopped(self, clock):
+        deadline = Deadline(1, clock=clock)
+
+        assert not deadline.stopped()
+        assert not deadline.stopped(requests.exceptions.ReadTimeout())
+
+        clock.now = 1
+
+        assert deadline.stopped()
+        assert deadline.stopped(requests.exceptions.ReadTimeout())
+        assert deadline.stopped(DeadlineExceeded())
+        assert not deadline.stopped(requests.exceptions.HTTPError())
+
+    def test_partial_results(self):
+        assert PartialList().truncated is False
+        assert PartialDict().truncated is False
+
+
+class TestQueryDeadline:
+    def test_shrinks_timeout(self, clock, backend):
+        yelp = YelpAPI('key', timeout_s=5, transport=InMemoryTransport(backend))
+        deadline = Deadline(2, clock=clock)
+        clock.now = 1.5
+
+        yelp.business_query('x', deadline=deadline)
+        yelp.business_query('x')
+
+        assert backend.timeouts == [0.5, 5]
+
+    def test_does_not_start_after_deadline(self, clock, backend):
+        transport = InMemoryTransport(backend)
+        yelp = YelpAPI('key', transport=transport)
+        deadline = Deadline(1, clock=clock)
+        clock.now = 1
+
+        with pytest.raises(DeadlineExceeded):
+            yelp.search_query(location='x', deadline=deadline)
+        assert transport.request_count == 0
+
+
+class TestCompositeDeadlines:
+    def test_planner_execute(self, clock, backend):
+        backend.latency = 1
+        yelp = YelpAPI('key', transport=InMemoryTransport(backend))
+        planner = CrawlPlanner()
+        for business_id in 'abcd':
+            planner.business_query(business_id, deadline=Deadline())
+        with planner.options(paginate=True):
+            planner.search_query(location='x')
+
+        responses = planner.execute(yelp, deadline=Deadline(2.5, clock=clock))
+
+        assert [r['url'] for r in responses] == [BUSINESS_API_URL.format('a'), BUSINESS_API_URL.format('b')]
+        assert responses.truncated
+        assert backend.timeouts == [2.5, 1.5, 0.5]
+        assert planner.calls[0].params == {}
+
+    def test_planner_execute_paginated(self, clock, backend):
+        backend.latency = 1
+        yelp = YelpAPI('key', transport=InMemoryTransport(backend))
+        planner = CrawlPlanner()
+        with planner.options(paginate=True):
+            planner.search_query(location='x')
+
+        responses = planner.execute(yelp, deadline=Deadline(2, clock=clock))
+
+        assert len(responses) == 2
+        assert responses.truncated
+
+    def test_planner_execute_completes(self, clock, backend):
+        yelp = YelpAPI('key', transport=InMemoryTransport(backend))
+        planner = CrawlPlanner()
+        planner.business_query('a')
+
+        responses = planner.execute(yelp, deadline=Deadline(2, clock=clock))
+
+        assert len(responses) == 1
+        assert not responses.truncated
+
+    def test_planner_execute_propagates_other_errors(self, clock):
+        transport = InMemoryTransport()
+        transport.add(BUSINESS_API_URL.format('a'), status_code=500)
+        planner = CrawlPlanner()
+        planner.business_query('a')
+
+        with pytest.raises(requests.exceptions.HTTPError):
+            planner.execute(YelpAPI('key', transport=transport), deadline=Deadline(2, clock=clock))
+
+    def test_refresh(self, clock, backend):
+        backend.latency = 1
+        yelp = YelpAPI('key', transport=InMemoryTransport(backend))
+        scheduler = RefreshScheduler(clock=clock)
+        for business_id in 'abc':
+            scheduler.track(business_id)
+
+        refreshed = scheduler.refresh(yelp, 3, deadline=Deadline(1.5, clock=clock))
+
+        assert list(refreshed) == ['a']
+        assert refreshed.truncated
+        assert sorted(scheduler.due(2)) == ['b', 'c']
+
+    def test_refresh_records_other_errors(self, clock):
+        transport = InMemoryTransport()
+        transport.add(BUSINESS_API_URL.format('a'), status_code=404)
+        scheduler = RefreshScheduler(clock=clock)
+        scheduler.track('a')
+
+        refreshed = scheduler.refresh(YelpAPI('key', transport=transport), 1, deadline=Deadline(2, clock=clock))
+
+        assert not refreshed.truncated
+        assert isinstance(refreshed.errors['a'], requests.exceptions.HTTPError)
+
+    def test_geo_search(self, clock, backend):
+        backend.body['total'] = 0
+        yelp = YelpAPI('key', transport=InMemoryTransport(backend))
+        index = GeoIndex(clock=clock)
+        query = {'latitude': 37.7, 'longitude': -122.4, 'radius': 1000}
+
+        index.search_query(yelp, deadline=Deadline(2, clock=clock), **query)
+        index.search_query(yelp, deadline=Deadline(2, clock=clock), **query)
+
+        assert backend.timeouts == [2]
@@ -0,0 +1,253 @@
+import pytest
+
+from yelpapi import BusinessStore, GeoIndex, YelpAPI
+from yelpapi.geo import METERS_PER_DEGREE, distance_m
+from yelpapi.transport import InMemoryTransport
+from yelpapi.yelpapi import SEARCH_API_URL
+
+CENTER = (37.7749, -122.4194)
+TAXONOMY = [
+    {'alias': 'food', 'parent_aliases': []},
+    {'alias': 'restaurants', 'parent_aliases': []},
+    {'alias': 'bakeries', 'parent_aliases': ['food']},
+    {'alias': 'cafes', 'parent_aliases': ['food', 'restaurants']},
+    {'alias': 'pizza', 'parent_aliases': ['restaurants']},
+]
+
+
+def business(business_id, north_m=0.0, east_m=0.0, categories=('cafes',), **kwargs):
+    latitude = CENTER[0] + north_m / METERS_PER_DEGREE
+    longitude = CENTER[1] + east_m / METERS_PER_DEGREE / 0.7908
+    return {
+        'id': business_id,
+        'coordinates': {'latitude': latitude, 'longitude': longitude},
+        'categories': [{'alias': c, 'title': c.title()} for c in categories],
+        **kwargs,
+    }
+
+
+@pytest.fixture
+def index(clock):
+    index = GeoIndex(max_age_s=100, taxonomy=TAXONOMY, clock=clock)
+    index.extend([
+        business('near', 100, categories=('cafes', 'bakeries'), rating=3.0, review_count=10, price='$'),
+        business('mid', 0, -500, categories=('pizza',), rating=4.5, review_count=5, price='$$'),
+        business('far', -2000, rating=5.0, review_count=100, price='$$'),
+    ])
+    return index
+
+
+@pytest.fixture
+def transport():
+    return InMemoryTransport()
+
+
+@pytest.fixture
+def yelp(faker, transport):
+    return YelpAPI(faker.pystr(), transport=transport)
+
+
+def test_distance():
+    assert distance_m(0, 0, 0, 1) == pytest.approx(METERS_PER_DEGREE)
+    assert distance_m(*CENTER, *CENTER) == 0
+
+
+class TestGeoIndex:
+    def test_within_radius(self, index):
+        matches = index.within_radius(*CENTER, 1000)
+
+        assert [(round(d), b['id']) for d, b in matches] == [(100, 'near'), (500, 'mid')]
+
+    @pytest.mark.parametrize('categories, expected', [
+        ('bakeries', ['near']),
+        ('pizza,bakeries', ['near', 'mid']),
+        (['pizza'], ['mid']),
+        ('', ['near', 'mid']),
+    ])
+    def test_within_radius_categories(self, index, categories, expected):
+        assert [b['id'] for _, b in index.within_radius(*CENTER, 1000, categories)] == expected
+
+    def test_within_bbox(self, index):
+        south, north = CENTER[0] - 0.01, CENTER[0] + 0.01
+        west, east = CENTER[1] - 0.001, CENTER[1] + 0.001
+
+        assert [b['id'] for b in index.within_bbox(south, west, north, east)] == ['near']
+        assert sorted(b['id'] for b in index.within_bbox(-90, -180, 90, 180)) == ['far', 'mid', 'near']
+
+    def test_ignores_businesses_without_coordinates(self, index):
+        index.add({'id': 'nowhere', 'coordinates': {'latitude': None, 'longitude': None}})
+        index.add({'id': 'unknown'})
+
+        assert len(index) == 3
+        assert 'nowhere' not in index
+
+    def test_moves_business(self, index):
+        index.add(business('far', 10))
+
+        assert len(index) == 3
+        assert [b['id'] for _, b in index.within_radius(*CENTER, 50)] == ['far']
+
+    def test_uses_store(self):
+        store = BusinessStore([business('a'), {'id': 'b'}])
+
+        index = GeoIndex(store=store)
+        index.add(business('c', distance=10.0))
+
+        assert len(index) == 2
+        assert 'distance' not in store['c']
+
+    def test_remove(self, index):
+        index.remove('near')
+        index.remove('unknown')
+
+        assert 'near' not in index
+        assert [b['id'] for _, b in index.within_radius(*CENTER, 1000)] == ['mid']
+
+    @pytest.mark.parametrize('categories, expected', [
+        ('restaurants', ['near', 'mid']),
+        ('food', ['near']),
+        ('unknown', []),
+    ])
+    def test_parent_categories(self, index, categories, expected):
+        assert [b['id'] for _, b in index.within_radius(*CENTER, 1000, categories)] == expected
+
+
+class TestCoverage:
+    def test_is_covered(self, index, clock):
+        index.mark_covered(*CENTER, 1000)
+
+        assert index.is_covered(*CENTER, 500)
+        assert index.is_covered(*CENTER, 500, 'pizza')
+        assert not index.is_covered(*CENTER, 1500)
+
+        clock.now = 101
+
+        assert not index.is_covered(*CENTER, 500)
+
+    def test_uncategorized_coverage_needs_taxonomy(self, clock):
+        index = GeoIndex(max_age_s=100, clock=clock)
+        index.mark_covered(*CENTER, 1000)
+
+        assert index.is_covered(*CENTER, 500)
+        assert not index.is_covered(*CENTER, 500, 'pizza')
+
+    def test_uncategorized_coverage_needs_known_categories(self, index):
+        index.mark_covered(*CENTER, 1000)
+
+        assert not index.is_covered(*CENTER, 500, 'pizza,unknown')
+
+    def test_category_coverage(self, index):
+        index.mark_covered(*CENTER, 1000, 'pizza,cafes')
+
+        assert index.is_covered(*CENTER, 500, 'pizza')
+        assert not index.is_covered(*CENTER, 500, 'pizza,bars')
+        assert not index.is_covered(*CENTER, 500)
+
+
+class TestSearchQuery:
+    def test_answers_locally(self, index, yelp, transport):
+        index.mark_covered(*CENTER, 5000)
+
+        response = index.search_query(yelp, latitude=CENTER[0], longitude=CENTER[1], radius=3000, sort_by='rating',
+                                      limit=2, offset=0, term=None)
+
+        assert transport.request_count == 0
+        assert [b['id'] for b in response['businesses']] == ['far', 'mid']
+        assert response['total'] == 3
+        assert response['businesses'][0]['distance'] == pytest.approx(2000, rel=0.01)
+
+    @pytest.mark.parametrize('kwargs, expected', [
+        ({'price': '2'}, ['mid', 'far']),
+        ({'categories': 'cafes'}, ['near', 'far']),
+        ({'sort_by': 'review_count'}, ['far', 'near', 'mid']),
+        ({'offset': 1, 'limit': 1}, ['mid']),
+    ])
+    def test_local_filters(self, index, yelp, kwargs, expected):
+        index.mark_covered(*CENTER, 5000)
+
+        response = index.search_query(yelp, latitude=CENTER[0], longitude=CENTER[1], radius=3000, **kwargs)
+
+        assert [b['id'] for b in response['businesses']] == expected
+
+    @pytest.mark.parametrize('kwargs', [
+        {'radius': 3000, 'term': 'coffee'},
+        {'radius': 3000, 'sort_by': 'unknown'},
+        {},
+    ])
+    def test_unsupported_queries_go_remote(self, index, yelp, transport, kwargs):
+        index.mark_covered(*CENTER, 5000)
+        transport.add(SEARCH_API_URL, json={'businesses': [], 'total': 0})
+
+        index.search_query(yelp, latitude=CENTER[0], longitude=CENTER[1], **kwargs)
+
+        assert transport.request_count == 1
+
+    def test_harvests_and_covers(self, yelp, transport):
+        index = GeoIndex()
+        remote = {'businesses': [business('a', 10, categories=('italian',), distance=10.0)], 'total': 1}
+        transport.add(SEARCH_API_URL, json=remote)
+        query = {'latitude': CENTER[0], 'longitude': CENTER[1], 'radius': 1000, 'categories': 'restaurants'}
+
+        assert index.search_query(yelp, **query) is remote
+        local = index.search_query(yelp, **query)
+
+        assert transport.request_count == 1
+        assert [b['id'] for b in local['businesses']] == ['a']
+        assert local['businesses'][0]['distance'] == pytest.approx(10)
+
+    def test_parent_category_from_uncategorized_harvest(self, yelp, transport):
+        index = GeoIndex(taxonomy=TAXONOMY)
+        transport.add(SEARCH_API_URL, json={'businesses': [business('a', 10, categories=('pizza',))], 'total': 1})
+        query = {'latitude': CENTER[0], 'longitude': CENTER[1], 'radius': 1000}
+
+        index.search_query(yelp, **query)
+        local = index.search_query(yelp, categories='restaurants', **query)
+
+        assert transport.request_count == 1
+        assert [b['id'] for b in local['businesses']] == ['a']
+
+    def test_evicts_missing_businesses(self, index, yelp, transport):
+        transport.add(SEARCH_API_URL, json={'businesses': [business('near', 100)], 'total': 1})
+
+        index.search_query(yelp, latitude=CENTER[0], longitude=CENTER[1], radius=1000, categories='cafes')
+
+        # 'mid' isn't a cafe and 'far' is outside the harvested area, so only 'near' is known to be current.
+        assert sorted(index._store) == ['far', 'mid', 'near']
+
+        transport.add(SEARCH_API_URL, json={'businesses': [], 'total': 0})
+        index.search_query(yelp, latitude=CENTER[0], longitude=CENTER[1], radius=1000)
+
+        assert sorted(index._store) == ['far']
+
+    def test_keeps_businesses_missing_from_incomplete_results(self, index, yelp, transport):
+        transport.add(SEARCH_API_URL, json={'businesses': [], 'total': 1})
+
+        index.search_query(yelp, latitude=CENTER[0], longitude=CENTER[1], radius=1000)
+
+        assert len(index) == 3
+
+    @pytest.mark.parametrize('kwargs, total', [
+        ({}, 2),
+        ({'offset': 20}, 1),
+        ({'price': '1'}, 1),
+    ])
+    def test_incomplete_results_not_covered(self, yelp, transport, kwargs, total):
+        index = GeoIndex()
+        transport.add(SEARCH_API_URL, json={'businesses': [business('a')], 'total': total})
+
+        index.search_query(yelp, latitude=CENTER[0], longitude=CENTER[1], radius=1000, **kwargs)
+
+        assert 'a' in index
+        assert not index.is_covered(*CENTER, 1000)
+
+    def test_projects_fields(self, index, yelp, transport):
+        transport.add(SEARCH_API_URL, json={'businesses': [business('a', 3000)], 'total': 1})
+        index.mark_covered(*CENTER, 1000)
+        query = {'latitude': CENTER[0], 'longitude': CENTER[1], 'fields': 'id'}
+
+        local = index.search_query(yelp, radius=200, **query)
+        remote = index.search_query(yelp, radius=4000, **query)
+
+        assert local['businesses'] == [{'id': 'near'}]
+        assert remote['businesses'] == [{'id': 'a'}]
+        assert index.within_radius(*CENTER, 4000)[-1][1]['coordinates']
@@ -0,0 +1,204 @@
+import threading
+import time
+
+import pytest
+import requests
+from concurrent.futures import Future
+from unittest.mock import MagicMock
+
+from yelpapi import YelpAPI
+from yelpapi.deadline import Deadline
+from yelpapi.hedging import HedgedTransport, _close_response
+from yelpapi.scheduling import SchedulingTransport, traffic_class
+from yelpapi.transport import InMemoryResponse, InMemoryTransport
+from yelpapi.yelpapi import BUSINESS_API_URL, SEARCH_API_URL
+
+
+class ScriptedHandler:
+    """
+    Serves each request after the next scripted delay, raising the scripted exception (if any) instead. Records the
+    timeout and thread of every request.
+    """
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.timeouts = []
+        self.threads = []
+
+    def __call__(self, request):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+            self.timeouts.append(request.timeout)
+            self.threads.append(threading.current_thread())
+            step = self.script.pop(0) if self.script else 0
+        delay, error = step if isinstance(step, tuple) else (0, step) if isinstance(step, Exception) else (step, None)
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return InMemoryResponse({'call': call})
+
+
+def hedged_yelp(handler, **kwargs):
+    transport = HedgedTransport(InMemoryTransport(handler), **kwargs)
+    return YelpAPI('key', transport=transport), transport
+
+
+class TestHedgedTransport:
+    def test_validates_percentile(self):
+        with pytest.raises(ValueError):
+            HedgedTransport(InMemoryTransport(), percentile=101)
+
+    def test_no_hedge_without_samples(self):
+        handler = ScriptedHandler(0.05)
+        yelp, transport = hedged_yelp(handler, min_samples=1, budget=1)
+
+        assert yelp.search_query(location='x') == {'call': 1}
+        assert transport.hedge_count == 0
+        assert transport.hedge_delay(SEARCH_API_URL) == pytest.approx(0.05, abs=0.04)
+
+    def test_hedges_slow_request(self):
+        handler = ScriptedHandler(0, 0, 1.0)
+        yelp, transport = hedged_yelp(handler, min_samples=2, budget=1)
+        yelp.search_query(location='x')
+        yelp.search_query(location='x')
+        spans = []
+        yelp.hooks['response'].append(spans.append)
+
+        start = time.perf_counter()
+        assert yelp.search_query(location='x') == {'call': 4}
+        assert time.perf_counter() - start < 0.5
+        assert transport.hedge_count == 1
+        assert spans[0].attributes == {'hedged': True, 'hedge_won': True}
+
+    def test_latency_is_tracked_per_endpoint(self):
+        handler = ScriptedHandler(0, 0, 0.2)
+        yelp, transport = hedged_yelp(handler, min_samples=2, budget=1)
+        yelp.search_query(location='x')
+        yelp.search_query(location='x')
+
+        yelp.business_query('x')
+
+        assert transport.hedge_count == 0
+        assert transport.hedge_delay(BUSINESS_API_URL) is None
+
+    def test_primary_can_win(self):
+        handler = ScriptedHandler(0.01, 0.01, 0.2, 1.0)
+        yelp, transport = hedged_yelp(handler, min_samples=2, budget=1)
+        yelp.search_query(location='x')
+        yelp.search_query(location='x')
+
+        assert yelp.search_query(location='x') == {'call': 3}
+        assert transport.hedge_count == 1
+
+    def test_budget(self):
+        handler = ScriptedHandler(0, 0, 0.1)
+        yelp, transport = hedged_yelp(handler, min_samples=2, budget=0.1)
+        yelp.search_query(location='x')
+        yelp.search_query(location='x')
+
+        assert yelp.search_query(location='x') == {'call': 3}
+        assert transport.hedge_count == 0
+        assert handler.calls == 3
+
+    def test_failed_request_falls_back_to_other(self):
+        handler = ScriptedHandler(0, 0, 0.1, requests.exceptions.ConnectionError())
+        yelp, transport = hedged_yelp(handler, min_samples=2, budget=1)
+        yelp.search_query(location='x')
+        yelp.search_query(location='x')
+
+        assert yelp.search_query(location='x') == {'call': 3}
+
+    def test_both_fail(self):
+        handler = ScriptedHandler(0, 0, (0.1, requests.exceptions.Timeout()), requests.exceptions.ConnectionError())
+        yelp, transport = hedged_yelp(handler, min_samples=2, budget=1)
+        yelp.search_query(location='x')
+        yelp.search_query(location='x')
+
+        with pytest.raises(requests.exceptions.RequestException):
+            yelp.search_query(location='x')
+        assert transport.hedge_count == 1
+
+    def test_primary_error_without_hedge(self):
+        handler = ScriptedHandler(0, 0, requests.exceptions.ConnectionError())
+        yelp, transport = hedged_yelp(handler, min_samples=2, budget=1)
+        yelp.search_query(location='x')
+        yelp.search_query(location='x')
+
+        with pytest.raises(requests.exceptions.ConnectionError):
+            yelp.search_query(location='x')
+        assert transport.hedge_count == 0
+
+    def test_hedge_gets_remaining_timeout(self):
+        handler = ScriptedHandler(0, 0, 0.3)
+        transport = HedgedTransport(InMemoryTransport(handler), min_samples=2, budget=1)
+        yelp = YelpAPI('key', timeout_s=1, transport=transport)
+        for _ in range(3):
+            yelp.search_query(location='x')
+
+        assert transport.hedge_count == 1
+        assert handler.timeouts[2] == 1
+        assert 0.5 < handler.timeouts[3] < 1
+
+    def test_no_hedge_after_timeout(self):
+        handler = ScriptedHandler(0.1, 0.1, 0.2)
+        transport = HedgedTransport(InMemoryTransport(handler), min_samples=2, budget=1)
+        yelp = YelpAPI('key', timeout_s=0.05, transport=transport)
+        for _ in range(3):
+            yelp.search_query(location='x')
+
+        assert transport.hedge_count == 0
+        assert handler.calls == 3
+
+    def test_full_pool_is_not_a_queue(self):
+        handler = ScriptedHandler(0, 0, 0.3, 0)
+        yelp, transport = hedged_yelp(handler, min_samples=2, budget=1, max_workers=1)
+        yelp.search_query(location='x')
+        yelp.search_query(location='x')
+
+        slow = threading.Thread(target=yelp.search_query, kwargs={'location': 'x'})
+        slow.start()
+        while handler.calls < 3:
+            time.sleep(0.001)
+        # The slow request holds the only pool thread, so it can't be hedged and this one runs on the caller's thread.
+        assert yelp.search_query(location='x') == {'call': 4}
+        slow.join(5)
+
+        assert handler.threads[3] is threading.current_thread()
+        assert transport.hedge_count == 0
+
+    def test_requests_keep_context_on_pool(self):
+        handler = ScriptedHandler(0, 0, 0.3)
+        scheduler = SchedulingTransport(InMemoryTransport(handler), qps=1000)
+        transport = HedgedTransport(scheduler, min_samples=2, budget=1)
+        yelp = YelpAPI('key', transport=transport)
+        yelp.search_query(location='x')
+        yelp.search_query(location='x')
+        spans = []
+        yelp.hooks['response'].append(spans.append)
+
+        with traffic_class('batch'):
+            yelp.search_query(location='x', deadline=Deadline(0.9))
+
+        assert transport.hedge_count == 1
+        assert scheduler.stats()['batch']['sent'] == 2
+        assert spans[0].attributes['traffic_class'] == 'batch'
+        assert all(timeout < 0.9 for timeout in handler.timeouts[2:])
+
+    def test_closes_losing_response(self):
+        response = MagicMock()
+        future = Future()
+        future.set_result(response)
+
+        _close_response(future)
+
+        response.close.assert_called_once()
+
+    def test_close(self):
+        inner = MagicMock()
+
+        HedgedTransport(inner).close()
+
+        inner.close.assert_called_once()
@@ -0,0 +1,212 @@
+import pytest
+
+from yelpapi import CrawlPlanner, YelpAPI
+from yelpapi.planner import PlannedCall, total_key
+from yelpapi.yelpapi import BUSINESS_API_URL, EVENT_SEARCH_API_URL, SEARCH_API_URL
+
+
+@pytest.fixture
+def planner():
+    return CrawlPlanner()
+
+
+@pytest.fixture
+def yelp(faker):
+    return YelpAPI(faker.pystr())
+
+
+class TestRecording:
+    def test_records_without_calling(self, planner, faker, mock_request):
+        business_id = faker.pystr()
+
+        assert planner.business_query(business_id, locale=None) == {}
+
+        assert planner.calls == [PlannedCall(BUSINESS_API_URL.format(business_id), {})]
+        assert not mock_request.called
+
+    def test_validates_parameters(self, planner):
+        with pytest.raises(ValueError):
+            planner.search_query()
+
+        assert planner.calls == []
+
+    def test_options(self, planner, faker):
+        with planner.options(priority=5, paginate=True) as p:
+            p.search_query(location=faker.city())
+        planner.search_query(location=faker.city())
+
+        assert [(c.priority, c.paginate) for c in planner.calls] == [(5, True), (0, False)]
+
+    def test_rejects_unpaginated_endpoint(self, planner, faker):
+        with pytest.raises(ValueError):
+            with planner.options(paginate=True):
+                planner.business_query(faker.pystr())
+
+    def test_context_manager(self):
+        with CrawlPlanner() as planner:
+            assert isinstance(planner, YelpAPI)
+
+
+class TestEstimateCalls:
+    def test_unpaginated(self, planner, faker):
+        planner.business_query(faker.pystr())
+        planner.search_query(location=faker.city())
+
+        assert planner.estimate_calls() == 2
+
+    def test_unknown_total_assumes_worst_case(self, planner, faker):
+        with planner.options(paginate=True):
+            planner.search_query(location=faker.city(), limit=50)
+            planner.event_search_query()
+
+        assert planner.estimate_calls(planner.calls[0]) == 5
+        assert planner.estimate_calls(planner.calls[1]) == 334
+
+    @pytest.mark.parametrize('total, offset, expected', [(0, 0, 1), (45, 0, 3), (45, 20, 2), (1000, 0, 12)])
+    def test_cached_total(self, faker, total, offset, expected):
+        params = {'location': faker.city(), 'offset': offset}
+        planner = CrawlPlanner(totals={total_key(SEARCH_API_URL, params): total})
+        with planner.options(paginate=True):
+            planner.search_query(**params)
+
+        assert planner.estimate_calls() == expected
+
+
+class TestSchedule:
+    def test_split_by_priority(self, planner, faker):
+        planner.business_query('low')
+        with planner.options(priority=1):
+            planner.business_query('high')
+        with planner.options(paginate=True):
+            planner.search_query(location=faker.city(), limit=120)
+
+        shards, unscheduled = planner.split([1, 2, 1])
+
+        assert [[c.url for c in shard] for shard in shards] == [
+            [BUSINESS_API_URL.format('high')],
+            [BUSINESS_API_URL.format('low')],
+            [],
+        ]
+        assert [c.url for c in unscheduled] == [SEARCH_API_URL]
+
+    def test_lower_priority_prefers_budgets_after_spilled_call(self, planner):
+        with planner.options(priority=2):
+            planner.business_query('first')
+        with planner.options(priority=1, paginate=True):
+            planner.search_query(location='x', limit=50)
+        planner.business_query('low')
+
+        shards, unscheduled = planner.split([5, 6])
+
+        # The search had to wait for the second budget, so 'low' waits for it too rather than going ahead of it.
+        assert [[c.url for c in shard] for shard in shards] == [
+            [BUSINESS_API_URL.format('first')],
+            [SEARCH_API_URL, BUSINESS_API_URL.format('low')],
+        ]
+        assert len(unscheduled) == 0
+
+    def test_oversized_call_does_not_block_lower_priority(self, planner):
+        with planner.options(priority=1, paginate=True):
+            planner.search_query(location='x', limit=50)
+        planner.business_query('low')
+
+        shards, unscheduled = planner.split([1])
+
+        assert [[c.url for c in shard] for shard in shards] == [[BUSINESS_API_URL.format('low')]]
+        assert [c.url for c in unscheduled] == [SEARCH_API_URL]
+
+    def test_no_budget_is_idle_while_calls_are_dropped(self, planner):
+        for i in range(3):
+            planner.business_query(str(i))
+        with planner.options(priority=1, paginate=True):
+            planner.search_query(location='x', limit=50)
+
+        shards, unscheduled = planner.split([4, 5])
+
+        assert [[c.url for c in shard] for shard in shards] == [
+            [BUSINESS_API_URL.format(i) for i in range(3)],
+            [SEARCH_API_URL],
+        ]
+        assert len(unscheduled) == 0
+
+    def test_days_and_keys(self, planner):
+        for i in range(7):
+            planner.business_query(str(i))
+
+        plan, unscheduled = planner.schedule(2, days=2, keys=2, used_today=[1, 0])
+
+        assert [[len(shard) for shard in day] for day in plan] == [[1, 2], [2, 2]]
+        assert len(unscheduled) == 0
+
+    def test_used_today_for_all_keys(self, planner):
+        for i in range(3):
+            planner.business_query(str(i))
+
+        plan, unscheduled = planner.schedule(2, keys=2, used_today=1)
+
+        assert [[len(shard) for shard in day] for day in plan] == [[1, 1]]
+        assert len(unscheduled) == 1
+
+    def test_used_today_per_key(self, planner):
+        with pytest.raises(ValueError):
+            planner.schedule(10, keys=2, used_today=[1])
+
+
+class TestExecute:
+    def test_replays_calls(self, planner, yelp, faker, mock_request):
+        business_id = faker.pystr()
+        body = {'id': business_id}
+        mock_call = mock_request.get(BUSINESS_API_URL.format(business_id), json=body)
+        planner.business_query(business_id, locale='en_US')
+
+        assert planner.execute(yelp) == [body]
+        assert mock_call.last_request.qs == {'locale': ['en_US']}
+
+    def test_paginates_and_caches_total(self, planner, yelp, faker, mock_request):
+        location = faker.city()
+        mock_call = mock_request.get(SEARCH_API_URL, json={'businesses': [], 'total': 230})
+        with planner.options(paginate=True):
+            planner.search_query(location=location, limit=50, offset=100)
+
+        responses = planner.execute(yelp)
+
+        assert len(responses) == 3
+        assert [(r.qs['offset'], r.qs['limit']) for r in mock_call.request_history] == [
+            (['100'], ['50']), (['150'], ['50']), (['200'], ['40']),
+        ]
+        assert planner.totals == {total_key(SEARCH_API_URL, {'location': location}): 230}
+
+    def test_projects_fields(self, planner, yelp, mock_request):
+        mock_call = mock_request.get(SEARCH_API_URL, json={'businesses': [{'id': 'a', 'photos': []}], 'total': 1})
+        with planner.options(paginate=True):
+            planner.search_query(location='x', fields=['id'])
+
+        assert planner.execute(yelp) == [{'businesses': [{'id': 'a'}], 'total': 1}]
+        assert 'fields' not in mock_call.last_request.qs
+        assert planner.totals == {total_key(SEARCH_API_URL, {'location': 'x'}): 1}
+
+    def test_clamps_first_page_at_result_cap(self, planner, yelp, mock_request):
+        mock_call = mock_request.get(SEARCH_API_URL, json={'total': 5000})
+        call = PlannedCall(SEARCH_API_URL, {'location': 'x', 'offset': 230, 'limit': 20}, paginate=True)
+
+        planner.execute(yelp, [call])
+
+        assert planner.estimate_calls(call) == 1
+        assert [(r.qs['offset'], r.qs['limit']) for r in mock_call.request_history] == [(['230'], ['10'])]
+
+    def test_truncates_last_page_at_result_cap(self, planner, yelp, mock_request):
+        mock_call = mock_request.get(SEARCH_API_URL, json={'total': 5000})
+
+        planner.execute(yelp, [PlannedCall(SEARCH_API_URL, {'location': 'x', 'limit': 50}, paginate=True)])
+
+        assert mock_call.last_request.qs['offset'] == ['200']
+        assert mock_call.last_request.qs['limit'] == ['40']
+
+    def test_executes_in_priority_order(self, planner, yelp, mock_request):
+        mock_request.get(EVENT_SEARCH_API_URL, json={'which': 'low'})
+        mock_request.get(BUSINESS_API_URL.format('high'), json={'which': 'high'})
+        planner.event_search_query()
+        with planner.options(priority=1):
+            planner.business_query('high')
+
+        assert planner.execute(yelp) == [{'which': 'high'}, {'which': 'low'}]
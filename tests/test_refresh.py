@@ -0,0 +1,137 @@
+import pytest
+import requests
+
+from yelpapi import RefreshScheduler, YelpAPI
+from yelpapi.transport import InMemoryTransport
+from yelpapi.yelpapi import BUSINESS_API_URL
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture
+def scheduler(clock):
+    return RefreshScheduler(prior_interval_s=10 * DAY, clock=clock)
+
+
+@pytest.fixture
+def transport():
+    return InMemoryTransport()
+
+
+@pytest.fixture
+def yelp(faker, transport):
+    return YelpAPI(faker.pystr(), transport=transport)
+
+
+class TestRefreshScheduler:
+    def test_track(self, scheduler):
+        scheduler.track('a')
+        scheduler.track('a')
+
+        assert len(scheduler) == 1
+        assert 'a' in scheduler
+
+        scheduler.untrack('a')
+
+        assert 'a' not in scheduler
+        assert scheduler.due(10) == []
+
+    @pytest.mark.parametrize('invalid_id', [None, ''])
+    def test_requires_id(self, scheduler, invalid_id):
+        with pytest.raises(ValueError):
+            scheduler.track(invalid_id)
+
+    def test_requires_positive_weight(self):
+        with pytest.raises(ValueError):
+            RefreshScheduler({'rating': 0})
+
+    def test_never_fetched_first(self, scheduler):
+        scheduler.track('fetched', {'rating': 4.0}, fetched_at=-5 * DAY)
+        scheduler.track('new')
+
+        assert scheduler.due(1) == ['new']
+        assert scheduler.due(2) == ['new', 'fetched']
+
+    def test_stalest_first(self, scheduler):
+        scheduler.track('recent', {'rating': 4.0}, fetched_at=-1 * DAY)
+        scheduler.track('stale', {'rating': 4.0}, fetched_at=-3 * DAY)
+
+        assert scheduler.due(2) == ['stale', 'recent']
+
+    def test_learns_volatility(self, scheduler):
+        for i in range(5):
+            scheduler.track('volatile', {'rating': float(i), 'is_closed': i % 2 == 0}, fetched_at=i * DAY)
+            scheduler.track('stable', {'rating': 4.0, 'is_closed': False}, fetched_at=i * DAY)
+
+        assert scheduler.volatility('volatile') > scheduler.volatility('stable')
+        assert scheduler.due(2) == ['volatile', 'stable']
+
+    def test_field_weights(self, clock):
+        scheduler = RefreshScheduler({'hours': 10.0, 'rating': 0.1}, prior_interval_s=DAY, clock=clock)
+        for i in range(3):
+            scheduler.track('hours', {'hours': [i], 'rating': 4.0}, fetched_at=i * DAY)
+            scheduler.track('rating', {'hours': [], 'rating': float(i)}, fetched_at=i * DAY)
+
+        assert scheduler.due(2) == ['hours', 'rating']
+
+    def test_refresh(self, scheduler, yelp, transport, clock):
+        for business_id in ('a', 'b', 'c'):
+            transport.add(BUSINESS_API_URL.format(business_id), json={'id': business_id, 'rating': 4.0})
+            scheduler.track(business_id)
+        scheduler.record('c', {'rating': 4.0})
+        clock.now = 1.0
+
+        assert scheduler.refresh(yelp, 2) == {'a': {'id': 'a', 'rating': 4.0}, 'b': {'id': 'b', 'rating': 4.0}}
+        assert transport.request_count == 2
+        assert scheduler.due(3) == ['c', 'a', 'b']
+
+    def test_refresh_skips_failing_business(self, scheduler, yelp, transport):
+        transport.add(BUSINESS_API_URL.format('ok'), json={'id': 'ok'})
+        transport.add(BUSINESS_API_URL.format('gone'), status_code=404)
+        scheduler.track('gone')
+        scheduler.track('ok', {}, fetched_at=-100 * DAY)
+
+        failed = scheduler.refresh(yelp, 1)
+        refreshed = scheduler.refresh(yelp, 1)
+
+        assert list(failed) == []
+        assert isinstance(failed.errors['gone'], requests.exceptions.HTTPError)
+        # 'gone' is retried later rather than blocking the businesses behind it.
+        assert list(refreshed) == ['ok']
+        assert refreshed.errors == {}
+
+    def test_refresh_fetches_each_business_once(self, scheduler, yelp, transport):
+        transport.add(BUSINESS_API_URL.format('gone'), status_code=404)
+        for business_id in ('b', 'c'):
+            transport.add(BUSINESS_API_URL.format(business_id), json={'id': business_id})
+            scheduler.track(business_id, {}, fetched_at=0)
+        scheduler.track('gone')
+
+        refreshed = scheduler.refresh(yelp, 3)
+
+        assert transport.request_count == 3
+        assert sorted(refreshed) == ['b', 'c']
+        assert list(refreshed.errors) == ['gone']
+
+    def test_retry_backoff_doubles(self, scheduler, yelp, transport, clock):
+        transport.add(BUSINESS_API_URL.format('gone'), status_code=404)
+        scheduler.track('gone')
+        scheduler.track('other', {}, fetched_at=0)
+
+        retries = []
+        for _ in range(3):
+            scheduler.refresh(yelp, 1)
+            retries.append(scheduler._tracked['gone'].due - clock.now)
+            clock.now = scheduler._tracked['gone'].due
+
+        assert retries == [60 * 60, 2 * 60 * 60, 4 * 60 * 60]
+
+    def test_compacts_heap(self, scheduler):
+        for i in range(1000):
+            scheduler.track(str(i), {'rating': 4.0}, fetched_at=0)
+            scheduler.track(str(i), {'rating': 4.5}, fetched_at=DAY)
+        for i in range(900):
+            scheduler.untrack(str(i))
+
+        assert len(scheduler._heap) <= 2 * len(scheduler) + 64
+        assert sorted(scheduler.due(200)) == sorted(str(i) for i in range(900, 1000))
@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+
+from yelpapi import YelpAPI
+from yelpapi.deadline import Deadline, DeadlineExceeded
+from yelpapi.scheduling import SchedulingTransport, traffic_class
+from yelpapi.transport import InMemoryTransport
+
+
+def queue_requests(scheduler, yelp, requests):
+    """
+    Occupy the only slot for the next second, queue `requests` (pairs of traffic class and business ID) in order, then
+    raise the QPS limit so that the queue drains, and wait for every request to finish.
+    """
+    yelp.business_query('first')
+    threads = []
+    for i, (name, business_id) in enumerate(requests):
+        def run(name=name, business_id=business_id):
+            with traffic_class(name):
+                yelp.business_query(business_id)
+
+        threads.append(threading.Thread(target=run))
+        threads[-1].start()
+        while sum(s['queued'] for s in scheduler.stats().values()) <= i:
+            time.sleep(0.001)
+
+    scheduler.qps = 1000
+    assert scheduler.qps == 1000
+    for thread in threads:
+        thread.join(5)
+
+
+def test_interactive_preempts_batch(backend):
+    scheduler = SchedulingTransport(InMemoryTransport(backend), qps=1)
+    yelp = YelpAPI('key', transport=scheduler)
+
+    queue_requests(scheduler, yelp, [('batch', 'b1'), ('batch', 'b2'), ('interactive', 'i1'), ('batch', 'b3'),
+                                     ('interactive', 'i2')])
+
+    assert backend.sent == ['first', 'i1', 'i2', 'b1', 'b2', 'b3']
+    stats = scheduler.stats()
+    assert stats['interactive']['sent'] == 3
+    assert stats['batch']['queued'] == 0
+    assert stats['batch']['sent'] == 3
+    assert stats['batch']['mean_wait_s'] > stats['interactive']['mean_wait_s']
+
+
+def test_weighted_fair_queuing(backend):
+    classes = {'a': (0, 2.0), 'b': (0, 1.0)}
+    scheduler = SchedulingTransport(InMemoryTransport(backend), qps=1, classes=classes, default_class='a')
+    yelp = YelpAPI('key', transport=scheduler)
+
+    queue_requests(scheduler, yelp, [('b', 'b1'), ('b', 'b2'), ('b', 'b3'), ('a', 'a1'), ('a', 'a2'), ('a', 'a3'),
+                                     ('a', 'a4')])
+
+    # "b" had the queue to itself for a while, but "a" still gets twice its share once both are queued.
+    assert backend.sent == ['first', 'a1', 'b1', 'a2', 'a3', 'b2', 'a4', 'b3']
+
+
+def test_rate_limit(backend):
+    yelp = YelpAPI('key', transport=SchedulingTransport(InMemoryTransport(backend), qps=50))
+
+    start = time.monotonic()
+    for i in range(6):
+        yelp.business_query(str(i))
+
+    assert time.monotonic() - start >= 0.1
+
+
+def test_deadline_expires_at_head_of_queue(backend):
+    scheduler = SchedulingTransport(InMemoryTransport(backend), qps=1)
+    yelp = YelpAPI('key', transport=scheduler)
+    yelp.business_query('first')
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        yelp.business_query('late', deadline=Deadline(0.05))
+
+    assert time.monotonic() - start < 0.5
+    assert backend.sent == ['first']
+    assert scheduler.stats()['interactive']['queued'] == 0
+
+
+def test_deadline_expires_behind_queue(backend):
+    scheduler = SchedulingTransport(InMemoryTransport(backend), qps=1)
+    yelp = YelpAPI('key', transport=scheduler)
+    yelp.business_query('first')
+    ahead = threading.Thread(target=yelp.business_query, args=('ahead',))
+    ahead.start()
+    while scheduler.stats()['interactive']['queued'] == 0:
+        time.sleep(0.001)
+
+    with traffic_class('batch'), pytest.raises(DeadlineExceeded):
+        yelp.business_query('late', deadline=Deadline(0.05))
+    scheduler.qps = 1000
+    ahead.join(5)
+
+    assert backend.sent == ['first', 'ahead']
+    assert scheduler.stats()['batch']['queued'] == 0
+
+
+def test_deadline_shrinks_timeout_after_wait(backend):
+    yelp = YelpAPI('key', timeout_s=5, transport=SchedulingTransport(InMemoryTransport(backend), qps=10))
+    yelp.business_query('first')
+
+    yelp.business_query('second', deadline=Deadline(1))
+
+    assert backend.timeouts[0] == 5
+    assert backend.timeouts[1] <= 0.95
+
+
+def test_annotates_span(backend):
+    yelp = YelpAPI('key', transport=SchedulingTransport(InMemoryTransport(backend), qps=1000))
+    spans = []
+    yelp.hooks['response'].append(spans.append)
+
+    with traffic_class('batch'):
+        yelp.business_query('x')
+
+    assert spans[0].attributes['traffic_class'] == 'batch'
+    assert spans[0].attributes['queue_wait_s'] >= 0
+
+
+def test_unknown_class(backend):
+    yelp = YelpAPI('key', transport=SchedulingTransport(InMemoryTransport(backend), qps=1000))
+
+    with traffic_class('unknown'), pytest.raises(ValueError, match='Unknown traffic class'):
+        yelp.business_query('x')
+
+
+@pytest.mark.parametrize('kwargs, match', [
+    ({'qps': 0}, 'qps'),
+    ({'qps': 1, 'default_class': 'unknown'}, 'Default class'),
+    ({'qps': 1, 'classes': {'interactive': (0, 0)}}, 'weight'),
+])
+def test_invalid_arguments(backend, kwargs, match):
+    with pytest.raises(ValueError, match=match):
+        SchedulingTransport(InMemoryTransport(backend), **kwargs)
+
+
+def test_close():
+    transport = InMemoryTransport()
+    transport.close = lambda: setattr(transport, 'closed', True)
+
+    SchedulingTransport(transport, qps=1).close()
+
+    assert transport.closed
@@ -0,0 +1,147 @@
+import json
+import tracemalloc
+
+import pytest
+
+from yelpapi import BusinessStore
+from yelpapi.testing import FakeYelp
+
+
+@pytest.fixture
+def business(faker):
+    return {
+        'id': faker.pystr(),
+        'alias': faker.slug(),
+        'name': faker.company(),
+        'is_closed': False,
+        'review_count': faker.random_int(0, 5000),
+        'rating': 4.5,
+        'price': '$$',
+        'categories': [
+            {'alias': 'icecream', 'title': 'Ice Cream & Frozen Yogurt'},
+            {'alias': 'cafes', 'title': 'Cafes'},
+        ],
+        'coordinates': {'latitude': float(faker.latitude()), 'longitude': float(faker.longitude())},
+        'transactions': ['pickup', 'delivery'],
+        'location': {
+            'address1': faker.street_address(),
+            'address2': None,
+            'city': faker.city(),
+            'state': faker.state_abbr(),
+            'country': 'US',
+            'zip_code': faker.postcode(),
+            'display_address': [faker.street_address(), faker.city()],
+        },
+        'phone': faker.phone_number(),
+        'distance': faker.pyfloat(),
+    }
+
+
+class TestBusinessStore:
+    def test_round_trip(self, business):
+        store = BusinessStore([business])
+
+        assert store[business['id']] == business
+        assert len(store) == 1
+        assert business['id'] in store
+        assert list(store) == [business['id']]
+
+    def test_interns_repeated_strings(self, business, faker):
+        store = BusinessStore()
+        for _ in range(10):
+            store.upsert({**business, 'id': faker.pystr()})
+
+        assert len(store) == 10
+        assert store._strings.count('Cafes') == 1
+        assert store._strings.count(business['location']['city']) == 1
+
+    def test_upsert_replaces(self, business):
+        store = BusinessStore([business])
+        updated = {'id': business['id'], 'rating': 3.0, 'name': 'Renamed'}
+
+        store.upsert(updated)
+
+        assert len(store) == 1
+        assert store[business['id']] == updated
+
+    @pytest.mark.parametrize('key, value', [
+        ('rating', None),
+        ('rating', 4),
+        ('review_count', True),
+        ('price', None),
+        ('coordinates', {'latitude': None, 'longitude': -122.4}),
+        ('coordinates', {}),
+        ('location', {'city': None}),
+        ('location', {'city': ''}),
+        ('categories', [{'alias': 'cafes'}]),
+        ('categories', []),
+        ('transactions', [None]),
+        ('transactions', None),
+    ])
+    def test_preserves_unexpected_values(self, business, key, value):
+        business[key] = value
+        store = BusinessStore([business])
+
+        decoded = store[business['id']]
+
+        assert decoded == business
+        assert type(decoded[key]) is type(value)
+
+    def test_missing_fields(self, faker):
+        business = {'id': faker.pystr()}
+
+        assert BusinessStore([business])[business['id']] == business
+
+    def test_returns_fresh_copies(self, business):
+        store = BusinessStore([business])
+        store[business['id']]['categories'].clear()
+
+        assert store[business['id']]['categories']
+
+    @pytest.mark.parametrize('invalid_id', [None, ''])
+    def test_requires_id(self, invalid_id):
+        with pytest.raises(ValueError):
+            BusinessStore().upsert({'id': invalid_id})
+
+    def test_missing_business(self):
+        assert BusinessStore().get('missing') is None
+
+    def test_remove(self, business):
+        others = [{**business, 'id': business_id, 'name': business_id} for business_id in ('b', 'c')]
+        store = BusinessStore([business, *others])
+
+        store.remove(business['id'])
+        store.remove('c')
+
+        assert list(store) == ['b']
+        assert store['b'] == others[0]
+        with pytest.raises(KeyError):
+            store.remove('c')
+
+    def test_columns(self, business):
+        store = BusinessStore([business, {'id': 'bare'}])
+
+        assert store.columns(business['id']) == {
+            'rating': business['rating'], 'review_count': business['review_count'], 'price': business['price'],
+        }
+        assert store.columns('bare') == {}
+
+
+def test_memory_benchmark():
+    """Search results in a BusinessStore vs. as a list of dicts, both decoded from JSON as if from API responses."""
+    fake = FakeYelp(businesses=2000, events=0)
+    encoded = [json.dumps(fake._summary(business, distance=123.4)) for business in fake.businesses.values()]
+
+    tracemalloc.start()
+    try:
+        dicts = [json.loads(e) for e in encoded]
+        dicts_bytes = tracemalloc.get_traced_memory()[0]
+        del dicts
+        before = tracemalloc.get_traced_memory()[0]
+        store = BusinessStore(json.loads(e) for e in encoded)
+        store_bytes = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    assert dicts_bytes / store_bytes > 7
+    assert all(store[json.loads(e)['id']] == json.loads(e) for e in encoded[:100])
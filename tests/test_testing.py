@@ -0,0 +1,304 @@
+import pytest
+import requests
+
+from yelpapi import BusinessStore, CrawlPlanner, YelpAPI
+from yelpapi.geo import distance_m
+from yelpapi.testing import FAULTS, FakeYelp
+from yelpapi.transport import InMemoryRequest
+from yelpapi.yelpapi import BUSINESS_API_URL, SEARCH_API_URL
+
+CENTER = (37.7749, -122.4194)
+
+
+@pytest.fixture(scope='module')
+def fake():
+    return FakeYelp(businesses=400, events=60, seed=1)
+
+
+@pytest.fixture
+def yelp(fake):
+    return YelpAPI('key', transport=fake.transport())
+
+
+@pytest.fixture
+def business(fake):
+    return next(iter(fake.businesses.values()))
+
+
+def error_of(call):
+    with pytest.raises(requests.exceptions.HTTPError) as exc_info:
+        call()
+    response = exc_info.value.response
+    return response.status_code, response.json()['error']['code']
+
+
+def test_deterministic():
+    assert FakeYelp(businesses=20, events=5, seed=7).businesses == FakeYelp(businesses=20, events=5, seed=7).businesses
+    assert FakeYelp(businesses=20, seed=7).businesses.keys() != FakeYelp(businesses=20, seed=8).businesses.keys()
+
+
+class TestSearch:
+    def test_filters_by_radius(self, yelp):
+        response = yelp.search_query(latitude=CENTER[0], longitude=CENTER[1], radius=2000, limit=50)
+
+        assert 0 < len(response['businesses']) <= 50
+        assert all(b['distance'] <= 2000 for b in response['businesses'])
+        assert all(distance_m(*CENTER, b['coordinates']['latitude'], b['coordinates']['longitude']) <= 2000
+                   for b in response['businesses'])
+        assert response['region'] == {'center': {'latitude': CENTER[0], 'longitude': CENTER[1]}}
+        assert 'photos' not in response['businesses'][0]
+
+    def test_does_not_decode_index(self, yelp, monkeypatch):
+        monkeypatch.setattr(BusinessStore, '__getitem__', lambda store, business_id: pytest.fail('decoded a record'))
+
+        assert yelp.search_query(location='x', categories='restaurants', sort_by='rating', price='2')['total']
+        assert yelp.transaction_search_query('delivery', location='x')['total']
+
+    def test_paginates_by_total(self, fake, yelp):
+        planner = CrawlPlanner()
+        with planner.options(paginate=True):
+            planner.search_query(location='san francisco', radius=3000, limit=50)
+
+        pages = planner.execute(yelp)
+
+        total = pages[0]['total']
+        ids = [b['id'] for page in pages for b in page['businesses']]
+        assert len(ids) == len(set(ids)) == min(total, 240)
+
+    def test_requires_location(self, fake):
+        response = fake(InMemoryRequest(SEARCH_API_URL, {'term': 'pizza'}, {'Authorization': 'Bearer key'}, None))
+
+        assert (response.status_code, response.json()['error']['code']) == (400, 'VALIDATION_ERROR')
+
+    def test_result_cap(self, yelp):
+        assert error_of(lambda: yelp.search_query(location='x', offset=200, limit=50)) == (400, 'VALIDATION_ERROR')
+
+    @pytest.mark.parametrize('kwargs', [{'limit': 51}, {'limit': 'ten'}, {'radius': 40001}, {'sort_by': 'newest'},
+                                        {'latitude': 'north', 'longitude': 1}])
+    def test_validation_errors(self, yelp, kwargs):
+        kwargs.setdefault('location', 'x')
+        assert error_of(lambda: yelp.search_query(**kwargs)) == (400, 'VALIDATION_ERROR')
+
+    def test_filters(self, yelp):
+        response = yelp.search_query(location='x', categories='restaurants', price='1,2', term='a', open_now=True,
+                                     limit=50)
+
+        for business in response['businesses']:
+            assert len(business['price']) <= 2
+            assert not business['is_closed']
+            assert 'a' in business['name'].lower() or any('a' in c['title'].lower() for c in business['categories'])
+
+    @pytest.mark.parametrize('sort_by, key', [
+        ('rating', lambda b: (-b['rating'], -b['review_count'])),
+        ('review_count', lambda b: -b['review_count']),
+        ('distance', lambda b: b['distance']),
+    ])
+    def test_sorts(self, yelp, sort_by, key):
+        businesses = yelp.search_query(location='x', sort_by=sort_by, limit=50)['businesses']
+
+        assert businesses == sorted(businesses, key=key)
+
+    def test_transaction_search(self, yelp):
+        response = yelp.transaction_search_query('delivery', location='x')
+
+        assert response['total'] == len(response['businesses']) > 0
+        assert all('delivery' in b['transactions'] for b in response['businesses'])
+        assert error_of(lambda: yelp.transaction_search_query('pickup', location='x')) == (400, 'VALIDATION_ERROR')
+
+    def test_phone_search(self, yelp, business):
+        assert business['id'] in [b['id'] for b in yelp.phone_search_query(phone=business['phone'])['businesses']]
+        assert error_of(lambda: yelp.phone_search_query(phone='5551234')) == (400, 'VALIDATION_ERROR')
+
+
+class TestBusinesses:
+    def test_business(self, yelp, business):
+        assert yelp.business_query(business['id']) == business
+        assert yelp.business_query(business['alias']) == business
+        assert 'photos' in business
+        assert error_of(lambda: yelp.business_query('unknown')) == (404, 'BUSINESS_NOT_FOUND')
+
+    def test_business_match(self, yelp, business):
+        location = business['location']
+        response = yelp.business_match_query(name=business['name'], address1=location['address1'],
+                                             city=location['city'], state=location['state'], country='US')
+
+        assert [b['id'] for b in response['businesses']] == [business['id']]
+
+    def test_business_match_requires_parameters(self, fake):
+        response = fake(InMemoryRequest(
+            'https://api.yelp.com/v3/businesses/matches', {'name': 'x'}, {'Authorization': 'Bearer key'}, None
+        ))
+
+        assert response.status_code == 400
+
+    def test_business_engagement(self, yelp, business):
+        response = yelp.business_engagement_query(business_ids=f'{business["id"]},unknown')
+
+        assert [b['business_id'] for b in response['businesses']] == [business['id']]
+        assert response['errors'] == [{'business_id': 'unknown', 'code': 'BUSINESS_NOT_FOUND'}]
+        ids = ','.join(str(i) for i in range(21))
+        assert error_of(lambda: yelp.business_engagement_query(business_ids=ids)) == (400, 'VALIDATION_ERROR')
+
+    def test_business_service_offerings(self, yelp, business):
+        response = yelp.business_service_offerings_query(business['id'])
+
+        assert set(response) == {'active', 'eligible'}
+
+    def test_reviews(self, yelp, business):
+        response = yelp.reviews_query(business['id'], limit=3, offset=1)
+
+        assert response['total'] == business['review_count']
+        assert len(response['reviews']) == min(3, max(business['review_count'] - 1, 0))
+        assert yelp.reviews_query(business['id'], limit=3, offset=1) == response
+        assert all(1 <= r['rating'] <= 5 for r in response['reviews'])
+
+    def test_review_highlights(self, yelp, business):
+        assert len(yelp.review_highlights_query(business['id'])['review_highlights']) == 3
+
+    def test_autocomplete(self, yelp, business):
+        prefix = business['name'][:4]
+        response = yelp.autocomplete_query(text=prefix)
+
+        assert all(b['name'].startswith(prefix) for b in response['businesses'])
+        assert yelp.autocomplete_query(text='piz')['categories'] == [{'alias': 'pizza', 'title': 'Pizza'}]
+
+    def test_autocomplete_requires_text(self, fake):
+        response = fake(InMemoryRequest(
+            'https://api.yelp.com/v3/autocomplete', {}, {'Authorization': 'Bearer key'}, None
+        ))
+
+        assert response.json()['error']['code'] == 'VALIDATION_ERROR'
+
+    def test_categories(self, yelp):
+        categories = yelp.categories_query()['categories']
+
+        assert {'alias': 'pizza', 'title': 'Pizza', 'parent_aliases': ['restaurants'], 'country_whitelist': [],
+                'country_blacklist': []} in categories
+        assert yelp.category_query('pizza')['category']['parent_aliases'] == ['restaurants']
+        assert error_of(lambda: yelp.category_query('unknown')) == (404, 'CATEGORY_NOT_FOUND')
+
+
+class TestEvents:
+    def test_event_lookup(self, fake, yelp):
+        event = next(iter(fake.events.values()))
+
+        assert yelp.event_lookup_query(event['id']) == event
+        assert error_of(lambda: yelp.event_lookup_query('unknown')) == (404, 'EVENT_NOT_FOUND')
+
+    def test_event_search(self, fake, yelp):
+        response = yelp.event_search_query()
+
+        assert response['total'] == len(fake.events)
+        assert len(response['events']) == 3
+        assert error_of(lambda: yelp.event_search_query(offset=990, limit=20)) == (400, 'VALIDATION_ERROR')
+
+    def test_event_search_filters(self, yelp):
+        events = yelp.event_search_query(latitude=CENTER[0], longitude=CENTER[1], radius=5000, is_free='true',
+                                         categories='music,nightlife', sort_by='desc', limit=50)['events']
+
+        assert all(e['is_free'] and e['category'] in ('music', 'nightlife') for e in events)
+        assert [e['time_start'] for e in events] == sorted((e['time_start'] for e in events), reverse=True)
+
+        popular = yelp.event_search_query(sort_on='popularity', limit=50)['events']
+        assert [e['attending_count'] for e in popular] == sorted((e['attending_count'] for e in popular), reverse=True)
+
+    def test_featured_event(self, fake, yelp):
+        event = yelp.featured_event_query(location='san francisco')
+
+        assert event['interested_count'] == max(e['interested_count'] for e in fake.events.values())
+        assert error_of(lambda: yelp.featured_event_query(latitude=1, longitude=1)) == (404, 'EVENT_NOT_FOUND')
+
+
+class TestLimits:
+    def test_qps(self, clock):
+        fake = FakeYelp(businesses=10, events=0, qps=2, clock=clock)
+        yelp = YelpAPI('key', transport=fake.transport())
+
+        yelp.categories_query()
+        yelp.categories_query()
+        assert error_of(yelp.categories_query) == (429, 'TOO_MANY_REQUESTS_PER_SECOND')
+        YelpAPI('other key', transport=fake.transport()).categories_query()
+
+        clock.now += 1
+        yelp.categories_query()
+
+    def test_daily_limit(self, clock):
+        fake = FakeYelp(businesses=10, events=0, daily_limit=2, clock=clock)
+        yelp = YelpAPI('key', transport=fake.transport())
+
+        yelp.categories_query()
+        yelp.categories_query()
+        assert error_of(yelp.categories_query) == (429, 'ACCESS_LIMIT_REACHED')
+
+        clock.now += 24 * 60 * 60
+        yelp.categories_query()
+        assert fake.calls['https://api.yelp.com/v3/categories'] == 3
+
+    def test_api_keys(self):
+        fake = FakeYelp(businesses=10, events=0, api_keys={'good'})
+
+        YelpAPI('good', transport=fake.transport()).categories_query()
+        assert error_of(YelpAPI('bad', transport=fake.transport()).categories_query) == (401, 'TOKEN_INVALID')
+
+    def test_token_missing(self, fake):
+        response = fake(InMemoryRequest(SEARCH_API_URL, {'location': 'x'}, {}, None))
+
+        assert (response.status_code, response.json()['error']['code']) == (400, 'TOKEN_MISSING')
+
+    def test_unknown_endpoint(self, fake):
+        response = fake(InMemoryRequest('https://api.yelp.com/v3/unknown', {}, {'Authorization': 'Bearer key'}, None))
+
+        assert response.status_code == 404
+
+
+class TestFaults:
+    def test_latency(self):
+        delays = []
+        fake = FakeYelp(businesses=10, events=0, latency=lambda rng: rng.uniform(0.1, 0.2), sleep=delays.append)
+
+        YelpAPI('key', transport=fake.transport()).categories_query()
+
+        assert 0.1 <= delays[0] <= 0.2
+
+    def test_latency_beyond_timeout(self):
+        delays = []
+        fake = FakeYelp(businesses=10, events=0, latency=lambda rng: 0.5, sleep=delays.append)
+
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            YelpAPI('key', timeout_s=0.2, transport=fake.transport()).categories_query()
+        assert delays == [0.2]
+
+    @pytest.mark.parametrize('fault, expected', [
+        ('timeout', requests.exceptions.ReadTimeout),
+        ('connection_error', requests.exceptions.ConnectionError),
+        ('internal_error', requests.exceptions.HTTPError),
+        ('service_unavailable', requests.exceptions.HTTPError),
+    ])
+    def test_faults(self, fault, expected):
+        assert fault in FAULTS
+        yelp = YelpAPI('key', transport=FakeYelp(businesses=10, events=0, faults={fault: 1.0}).transport())
+
+        with pytest.raises(expected):
+            yelp.business_query('x')
+
+    def test_fault_rate(self):
+        fake = FakeYelp(businesses=10, events=0, faults={'internal_error': 0.25}, seed=3)
+        yelp = YelpAPI('key', transport=fake.transport())
+        failures = 0
+        for _ in range(400):
+            try:
+                yelp.categories_query()
+            except requests.exceptions.HTTPError:
+                failures += 1
+
+        assert 60 < failures < 140
+
+    def test_unknown_fault(self):
+        with pytest.raises(ValueError, match='Unknown faults'):
+            FakeYelp(faults={'meteor': 1.0})
+
+    def test_business_url(self, fake, business):
+        response = fake(InMemoryRequest(BUSINESS_API_URL.format(business['id']), {}, {'Authorization': 'Bearer k'},
+                                        None))
+
+        assert response.json() is business
@@ -0,0 +1,146 @@
+import time
+
+import pytest
+import requests
+from unittest.mock import MagicMock
+
+from yelpapi import YelpAPI
+from yelpapi.deadline import _current_deadline
+from yelpapi.tracing import TraceSpan, _current_span, annotate, opentelemetry_hook
+from yelpapi.yelpapi import BUSINESS_API_URL, SEARCH_API_URL
+
+
+@pytest.fixture
+def yelp(faker):
+    return YelpAPI(faker.pystr())
+
+
+@pytest.fixture
+def spans(yelp):
+    spans = []
+    yelp.hooks['response'].append(spans.append)
+    return spans
+
+
+class TestHooks:
+    def test_records_span(self, yelp, spans, faker, mock_request):
+        business_id = faker.pystr()
+        mock_request.get(BUSINESS_API_URL.format(business_id), json={'id': business_id})
+
+        yelp.business_query(business_id, locale='en_US', foo=None)
+
+        [span] = spans
+        assert span.endpoint == BUSINESS_API_URL
+        assert span.url == BUSINESS_API_URL.format(business_id)
+        assert span.param_count == 1
+        assert span.status_code == 200
+        assert span.response_bytes == len(f'{{"id": "{business_id}"}}')
+        assert span.error is None
+        assert set(span.phases) == {'request_hooks', 'transport', 'server', 'decode'}
+        assert span.start_time_ns <= span.end_time_ns
+
+    def test_request_hook_sees_span_before_call(self, yelp, faker, mock_request):
+        mock_request.get(SEARCH_API_URL, json={})
+        seen = []
+
+        def hook(span):
+            seen.append((span.endpoint, span.end_time_ns, mock_request.called))
+            span.attributes['caller'] = 'test'
+
+        yelp.hooks['request'].append(hook)
+        spans = []
+        yelp.hooks['response'].append(spans.append)
+
+        yelp.search_query(location=faker.city())
+
+        assert seen == [(SEARCH_API_URL, None, False)]
+        assert spans[0].attributes == {'caller': 'test'}
+
+    def test_request_hooks_are_not_transport_time(self, yelp, spans, faker, mock_request):
+        mock_request.get(SEARCH_API_URL, json={})
+        yelp.hooks['request'].append(lambda span: time.sleep(0.1))
+
+        yelp.search_query(location=faker.city())
+
+        assert spans[0].phases['request_hooks'] >= 0.1
+        assert spans[0].phases['transport'] < 0.1
+
+    @pytest.mark.parametrize('mock_kwargs, error', [
+        ({'status_code': 500}, requests.exceptions.HTTPError),
+        ({'json': {'error': {'code': 'X', 'description': 'Y'}}}, YelpAPI.YelpAPIError),
+        ({'exc': requests.exceptions.ConnectTimeout}, requests.exceptions.ConnectTimeout),
+    ])
+    def test_records_errors(self, yelp, spans, faker, mock_request, mock_kwargs, error):
+        mock_request.get(SEARCH_API_URL, **mock_kwargs)
+
+        with pytest.raises(error):
+            yelp.search_query(location=faker.city())
+
+        assert isinstance(spans[0].error, error)
+        assert spans[0].end_time_ns is not None
+
+    def test_request_hook_error(self, yelp, spans, mock_request):
+        error = RuntimeError('hook failed')
+
+        def hook(span):
+            raise error
+
+        yelp.hooks['request'].append(hook)
+
+        with pytest.raises(RuntimeError):
+            yelp.search_query(location='x')
+
+        assert not mock_request.called
+        assert spans[0].error is error
+        assert spans[0].end_time_ns is not None
+        assert _current_span.get() is None
+        assert _current_deadline.get() is None
+
+    def test_annotate(self, yelp, spans, faker, mock_request):
+        mock_request.get(SEARCH_API_URL, json={})
+        yelp.hooks['request'].append(lambda span: annotate('retry', False))
+
+        yelp.search_query(location=faker.city())
+
+        assert spans[0].attributes == {'retry': False}
+
+    def test_annotate_without_span(self):
+        annotate('retry', False)
+
+    def test_no_span_without_hooks(self, yelp, faker, mock_request, monkeypatch):
+        mock_request.get(SEARCH_API_URL, json={})
+        monkeypatch.setattr('yelpapi.yelpapi.TraceSpan', None)
+
+        assert yelp.search_query(location=faker.city()) == {}
+
+
+class TestOpenTelemetry:
+    def test_attributes(self):
+        span = TraceSpan(SEARCH_API_URL, SEARCH_API_URL, 2, status_code=200, response_bytes=10,
+                         error=ValueError(), phases={'decode': 0.5}, attributes={'hedged': True})
+
+        assert span.otel_attributes() == {
+            'http.request.method': 'GET',
+            'url.full': SEARCH_API_URL,
+            'url.template': SEARCH_API_URL,
+            'yelpapi.param_count': 2,
+            'http.response.status_code': 200,
+            'http.response.body.size': 10,
+            'error.type': 'ValueError',
+            'yelpapi.phase.decode_s': 0.5,
+            'yelpapi.hedged': True,
+        }
+
+    def test_exports_span(self, yelp, faker, mock_request):
+        mock_request.get(SEARCH_API_URL, status_code=404)
+        tracer = MagicMock()
+        yelp.hooks['response'].append(opentelemetry_hook(tracer))
+
+        with pytest.raises(requests.exceptions.HTTPError):
+            yelp.search_query(location=faker.city())
+
+        _, kwargs = tracer.start_span.call_args
+        assert kwargs['attributes']['http.response.status_code'] == 404
+        otel_span = tracer.start_span.return_value
+        otel_span.record_exception.assert_called_once()
+        assert otel_span.end.call_args.kwargs['end_time'] >= kwargs['start_time']
@@ -0,0 +1,219 @@
+import sys
+import types
+
+import pytest
+import requests
+from unittest.mock import MagicMock
+
+from yelpapi import YelpAPI
+from yelpapi.transport import (
+    HTTPXResponse,
+    HTTPXTransport,
+    InMemoryRequest,
+    InMemoryResponse,
+    InMemoryTransport,
+    RequestsTransport,
+    Transport,
+)
+from yelpapi.yelpapi import BUSINESS_API_URL, SEARCH_API_URL
+
+
+@pytest.fixture
+def transport():
+    return InMemoryTransport()
+
+
+@pytest.fixture
+def httpx(monkeypatch):
+    """A stand-in for the `httpx` module, with its exception hierarchy."""
+    module = types.ModuleType('httpx')
+    module.Client = MagicMock()
+    module.HTTPError = type('HTTPError', (Exception,), {})
+    module.RequestError = type('RequestError', (module.HTTPError,), {})
+    module.TransportError = type('TransportError', (module.RequestError,), {})
+    module.TimeoutException = type('TimeoutException', (module.TransportError,), {})
+    module.ConnectTimeout = type('ConnectTimeout', (module.TimeoutException,), {})
+    module.ReadTimeout = type('ReadTimeout', (module.TimeoutException,), {})
+    module.PoolTimeout = type('PoolTimeout', (module.TimeoutException,), {})
+    module.ConnectError = type('ConnectError', (module.TransportError,), {})
+    module.TooManyRedirects = type('TooManyRedirects', (module.RequestError,), {})
+    module.DecodingError = type('DecodingError', (module.RequestError,), {})
+    monkeypatch.setitem(sys.modules, 'httpx', module)
+    return module
+
+
+class TestTransport:
+    def test_get_is_abstract(self):
+        with pytest.raises(TypeError):
+            Transport()
+
+    def test_close_is_optional(self):
+        class GetOnly(Transport):
+            def get(self, url, headers, params, timeout):
+                return super().get(url, headers, params, timeout)
+
+        assert GetOnly().get('', {}, {}, None) is None
+        GetOnly().close()
+
+
+class TestRequestsTransport:
+    def test_uses_given_session(self, faker, mock_request):
+        url = faker.uri()
+        mock_request.get(url, json={})
+        session = requests.Session()
+
+        RequestsTransport(session).get(url, {}, {}, None)
+
+        assert mock_request.last_request.url.startswith(url)
+
+    def test_close(self):
+        session = MagicMock()
+
+        RequestsTransport(session).close()
+
+        session.close.assert_called_once()
+
+
+class TestHTTPXTransport:
+    def test_uses_given_client(self, faker):
+        client = MagicMock()
+        url = faker.uri()
+        transport = HTTPXTransport(client=client)
+
+        assert transport.get(url, {'a': 'b'}, {'c': 'd'}, 3).httpx_response is client.get.return_value
+        transport.close()
+
+        client.get.assert_called_once_with(url, headers={'a': 'b'}, params={'c': 'd'}, timeout=3)
+        client.close.assert_called_once()
+
+    def test_requires_httpx(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, 'httpx', None)
+
+        with pytest.raises(ImportError):
+            HTTPXTransport()
+
+    def test_creates_client(self, httpx):
+        transport = HTTPXTransport(http2=False, verify=False)
+
+        assert transport._client is httpx.Client.return_value
+        httpx.Client.assert_called_once_with(http2=False, verify=False)
+
+
+    @pytest.mark.parametrize('httpx_error, requests_error', [
+        ('ConnectTimeout', requests.exceptions.ConnectTimeout),
+        ('ReadTimeout', requests.exceptions.ReadTimeout),
+        ('PoolTimeout', requests.exceptions.Timeout),
+        ('ConnectError', requests.exceptions.ConnectionError),
+        ('TooManyRedirects', requests.exceptions.TooManyRedirects),
+        ('DecodingError', requests.exceptions.RequestException),
+    ])
+    def test_translates_errors(self, httpx, httpx_error, requests_error):
+        error = getattr(httpx, httpx_error)('failed')
+        client = MagicMock()
+        client.get.side_effect = error
+
+        with pytest.raises(requests_error, match='failed') as raised:
+            HTTPXTransport(client=client).get('', {}, {}, None)
+
+        assert type(raised.value) is requests_error
+        assert raised.value.__cause__ is error
+
+    def test_passes_other_errors_through(self, httpx):
+        client = MagicMock()
+        client.get.side_effect = ValueError()
+
+        with pytest.raises(ValueError):
+            HTTPXTransport(client=client).get('', {}, {}, None)
+
+    def test_passes_errors_through_without_httpx(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, 'httpx', None)
+        client = MagicMock()
+        client.get.side_effect = ValueError()
+
+        with pytest.raises(ValueError):
+            HTTPXTransport(client=client).get('', {}, {}, None)
+
+    @pytest.mark.parametrize('status_code, kind', [(404, 'Client'), (503, 'Server')])
+    def test_raise_for_status(self, status_code, kind):
+        response = HTTPXResponse(MagicMock(status_code=status_code, reason_phrase='Oops', url='https://x'))
+
+        with pytest.raises(requests.exceptions.HTTPError, match=f'{status_code} {kind} Error: Oops') as raised:
+            response.raise_for_status()
+
+        assert raised.value.response is response
+        assert response.status_code == status_code
+
+    def test_ok_response(self):
+        httpx_response = MagicMock(status_code=200)
+        httpx_response.json.return_value = {'a': 1}
+        response = HTTPXResponse(httpx_response)
+
+        response.raise_for_status()
+
+        assert response.json() == {'a': 1}
+        assert response.content is httpx_response.content
+
+    def test_with_yelp_api(self):
+        client = MagicMock()
+        client.get.return_value = MagicMock(status_code=429, reason_phrase='Too Many Requests', url='https://x')
+
+        with pytest.raises(requests.exceptions.HTTPError, match='429'):
+            YelpAPI('key', transport=HTTPXTransport(client=client)).business_query('x')
+
+
+class TestInMemoryTransport:
+    def test_serves_registered_response(self, transport, faker):
+        body = {'id': faker.pystr()}
+        transport.add(SEARCH_API_URL, json=body)
+
+        with YelpAPI(faker.pystr(), transport=transport) as yelp:
+            assert yelp.search_query(location=faker.city()) is body
+        assert transport.request_count == 1
+
+    def test_raises_http_error(self, transport, faker):
+        transport.add(SEARCH_API_URL, status_code=500)
+
+        with pytest.raises(requests.exceptions.HTTPError):
+            YelpAPI(faker.pystr(), transport=transport).search_query(location=faker.city())
+
+    def test_raises_yelp_api_error(self, transport, faker):
+        transport.add(SEARCH_API_URL, json={'error': {'code': 'X', 'description': 'Y'}})
+
+        with pytest.raises(YelpAPI.YelpAPIError):
+            YelpAPI(faker.pystr(), transport=transport).search_query(location=faker.city())
+
+    def test_unknown_url(self, transport, faker):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            YelpAPI(faker.pystr(), transport=transport).business_query(faker.pystr())
+
+    @pytest.mark.parametrize('handler_result', [{'id': 'x'}, InMemoryResponse({'id': 'x'})])
+    def test_handler(self, faker, handler_result):
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(request)
+            return handler_result
+
+        api_key = faker.pystr()
+        yelp = YelpAPI(api_key, timeout_s=2, transport=InMemoryTransport(handler))
+
+        assert yelp.business_query('x', locale='en_US', foo=None) == {'id': 'x'}
+        assert requests_seen == [InMemoryRequest(
+            BUSINESS_API_URL.format('x'),
+            {'locale': 'en_US'},
+            {'Authorization': f'Bearer {api_key}'},
+            2,
+        )]
+
+    def test_response_content(self):
+        assert InMemoryResponse({'a': 1}).content == b'{"a": 1}'
+
+
+class TestYelpAPITransport:
+    def test_closes_transport(self, faker):
+        transport = MagicMock()
+
+        with YelpAPI(faker.pystr(), transport=transport):
+            pass
+
+        transport.close.assert_called_once()
@@ -19,6 +19,8 @@ from yelpapi.yelpapi import (
     REVIEWS_API_URL,
     SEARCH_API_URL,
     TRANSACTION_SEARCH_API_URL,
+    endpoint_template,
+    project_fields,
 )
 
 
@@ -102,6 +104,15 @@ class TestYelpAPI:
         with pytest.raises(requests.exceptions.HTTPError):
             yelp._query(url)
 
+    def test_projects_fields(self, yelp, mock_request):
+        business = {'id': 'a', 'name': 'A', 'rating': 4.5, 'photos': ['x'], 'hours': [], 'attributes': {}}
+        mock_call = mock_request.get(SEARCH_API_URL, json={'businesses': [business], 'total': 1})
+
+        resp = yelp.search_query(location='austin, tx', fields=['id', 'name', 'rating'])
+
+        assert resp == {'businesses': [{'id': 'a', 'name': 'A', 'rating': 4.5}], 'total': 1}
+        assert 'fields' not in mock_call.last_request.qs
+
     def test_close(self, api_key):
         yelp = YelpAPI(api_key)
         yelp.close()
@@ -363,3 +374,61 @@ class TestTransactionSearchQuery:
         assert yelp.transaction_search_query(
             transaction_type, latitude=faker.latitude(), longitude=faker.longitude()
         ) == random_dict
+
+
+class TestEndpointTemplate:
+    @pytest.mark.parametrize('template', [
+        AUTOCOMPLETE_API_URL,
+        BUSINESS_API_URL,
+        BUSINESS_ENGAGEMENT_API_URL,
+        BUSINESS_MATCH_API_URL,
+        BUSINESS_SERVICE_OFFERINGS_API_URL,
+        CATEGORIES_API_URL,
+        CATEGORY_API_URL,
+        EVENT_LOOKUP_API_URL,
+        EVENT_SEARCH_API_URL,
+        FEATURED_EVENT_API_URL,
+        PHONE_SEARCH_API_URL,
+        REVIEW_HIGHLIGHTS_API_URL,
+        REVIEWS_API_URL,
+        SEARCH_API_URL,
+        TRANSACTION_SEARCH_API_URL,
+    ])
+    def test_maps_url_to_template(self, faker, template):
+        assert endpoint_template(template.format(faker.pystr())) == template
+
+    @pytest.mark.parametrize('url', ['https://api.yelp.com/v3/businesses/', 'https://api.yelp.com/v3/businesses/a/b'])
+    def test_unknown_url(self, url):
+        assert endpoint_template(url) == url
+
+
+class TestProjectFields:
+    @pytest.mark.parametrize('url, key', [
+        (AUTOCOMPLETE_API_URL, 'businesses'),
+        (BUSINESS_MATCH_API_URL, 'businesses'),
+        (CATEGORIES_API_URL, 'categories'),
+        (EVENT_SEARCH_API_URL, 'events'),
+        (REVIEWS_API_URL.format('a'), 'reviews'),
+        (SEARCH_API_URL, 'businesses'),
+        (TRANSACTION_SEARCH_API_URL.format('delivery'), 'businesses'),
+    ])
+    def test_projects_each_record(self, url, key):
+        response = {key: [{'id': 1, 'name': 'a', 'extra': 1}, {'id': 2, 'extra': 2}], 'total': 2}
+
+        assert project_fields(url, response, 'id, name') == {key: [{'id': 1, 'name': 'a'}, {'id': 2}], 'total': 2}
+        assert response[key][0]['extra'] == 1
+
+    def test_projects_nested_record(self):
+        response = {'category': {'alias': 'bars', 'title': 'Bars', 'parent_aliases': ['nightlife']}}
+
+        assert project_fields(CATEGORY_API_URL.format('bars'), response, ['alias']) == {'category': {'alias': 'bars'}}
+
+    @pytest.mark.parametrize('url', [BUSINESS_API_URL.format('a'), EVENT_LOOKUP_API_URL.format('a'),
+                                     FEATURED_EVENT_API_URL])
+    def test_projects_whole_response(self, url):
+        response = {'id': 'a', 'name': 'A', 'photos': ['x'], 'special_hours': []}
+
+        assert project_fields(url, response, ('id', 'name')) == {'id': 'a', 'name': 'A'}
+
+    def test_missing_records(self):
+        assert project_fields(SEARCH_API_URL, {'total': 0}, ['id']) == {'total': 0}
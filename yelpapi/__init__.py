@@ -22,3 +22,7 @@
 """
 
 from .yelpapi import YelpAPI
+from .geo import GeoIndex
+from .planner import CrawlPlanner
+from .refresh import RefreshScheduler
+from .store import BusinessStore
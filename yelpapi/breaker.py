@@ -0,0 +1,229 @@
+"""
+    Copyright (c) 2013, Triad National Security, LLC
+    All rights reserved.
+
+    Redistribution and use in source and binary forms, with or without modification, are permitted provided that the
+    following conditions are met:
+
+    * Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+      disclaimer.
+    * Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+      following disclaimer in the documentation and/or other materials provided with the distribution.
+    * Neither the name of Triad National Security, LLC nor the names of its contributors may be used to endorse or
+      promote products derived from this software without specific prior written permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+    INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+    DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+    SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+    WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+import requests
+
+from .deadline import DeadlineExceeded, _current_deadline
+from .tracing import annotate
+from .transport import Transport
+from .yelpapi import endpoint_template
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+        Raised instead of issuing a request while the circuit for its endpoint is open. `endpoint` is the endpoint URL
+        template, and `retry_after_s` is how long until the circuit will start letting probe requests through.
+    """
+
+    def __init__(self, endpoint: str, retry_after_s: float) -> None:
+        super().__init__(f'Circuit for {endpoint} is open; retry in {retry_after_s:.1f}s.')
+        self.endpoint = endpoint
+        self.retry_after_s = retry_after_s
+
+
+class _Circuit:
+    __slots__ = ('state', 'outcomes', 'opened_at', 'probes_in_flight', 'probe_successes')
+
+    def __init__(self, window: int) -> None:
+        self.state = CLOSED
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+
+
+class CircuitBreakerTransport(Transport):
+    """
+        A transport that stops sending requests to an endpoint that is failing, so that callers fail fast rather than
+        tying up threads and connections waiting on it. Circuits are kept per endpoint URL template (e.g.,
+        `REVIEW_HIGHLIGHTS_API_URL`), so a degraded endpoint doesn't affect healthy ones.
+
+        A request counts as failed if the wrapped transport raises, the response has a 5xx status code, or (if
+        `slow_call_s` is given) it takes longer than `slow_call_s` seconds. Each circuit moves between three states:
+
+            * closed - requests flow normally; once at least `min_requests` of the last `window` requests have been
+              seen and `failure_rate` of them failed, the circuit opens
+            * open - every request immediately raises `CircuitOpenError`; after `open_s` seconds, the circuit becomes
+              half-open
+            * half-open - up to `probes` requests at a time are let through as probes (the rest still fail fast);
+              once `probes` probes have succeeded the circuit closes, and any probe failure re-opens it
+
+        A request that fails because its `deadline` ran out (raising `DeadlineExceeded`, or timing out once the deadline
+        has expired) says nothing about the endpoint, so it counts as neither failed nor succeeded.
+
+        `states()` and `stats()` expose the circuits for dashboards.
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        failure_rate: float = 0.5,
+        slow_call_s: float | None = None,
+        window: int = 20,
+        min_requests: int = 10,
+        open_s: float = 30.0,
+        probes: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+            Instantiate a CircuitBreakerTransport object.
+
+            required parameters:
+                * transport - the transport to protect
+
+            optional parameters:
+                * failure_rate - fraction (0-1) of failed requests in the window at which the circuit opens
+                * slow_call_s - requests taking longer than this many seconds count as failures
+                * window - number of recent requests per endpoint used to compute the failure rate
+                * min_requests - number of requests that must be in the window before the circuit can open
+                * open_s - number of seconds an open circuit waits before letting probes through
+                * probes - number of successful probes needed to close a half-open circuit
+                * clock - monotonic clock, in seconds
+        """
+        if not 0 < failure_rate <= 1:
+            raise ValueError('A valid failure rate between 0 and 1 (parameter "failure_rate") must be provided.')
+
+        self._transport = transport
+        self._failure_rate = failure_rate
+        self._slow_call_s = slow_call_s
+        self._window = window
+        self._min_requests = min_requests
+        self._open_s = open_s
+        self._probes = probes
+        self._clock = clock
+        self._circuits: dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def states(self) -> dict[str, str]:
+        """
+            The state (`closed`, `open`, or `half_open`) of every endpoint's circuit.
+        """
+        with self._lock:
+            return {endpoint: self._refresh_state(circuit) for endpoint, circuit in self._circuits.items()}
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """
+            The state, recent request count, and recent failure rate of every endpoint's circuit.
+        """
+        with self._lock:
+            return {
+                endpoint: {
+                    'state': self._refresh_state(circuit),
+                    'requests': len(circuit.outcomes),
+                    'failure_rate': sum(circuit.outcomes) / len(circuit.outcomes) if circuit.outcomes else 0.0,
+                }
+                for endpoint, circuit in self._circuits.items()
+            }
+
+    def get(
+        self,
+        url: str,
+        headers: dict[str, str],
+        params: dict[str, Any],
+        timeout: float | None,
+    ) -> Any:
+        endpoint = endpoint_template(url)
+        probe = self._admit(endpoint)
+
+        start = self._clock()
+        try:
+            response = self._transport.get(url, headers, params, timeout)
+        except Exception as e:
+            # Running out of the caller's deadline says nothing about the endpoint's health.
+            deadline = _current_deadline.get()
+            neutral = isinstance(e, DeadlineExceeded) or deadline is not None and deadline.stopped(e)
+            self._record(endpoint, probe, failed=None if neutral else True)
+            raise
+
+        slow = self._slow_call_s is not None and self._clock() - start > self._slow_call_s
+        self._record(endpoint, probe, failed=slow or response.status_code >= 500)
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+    def _admit(self, endpoint: str) -> bool:
+        """
+            Raise `CircuitOpenError` if the request may not be sent; otherwise, return whether it's a probe.
+        """
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is None:
+                circuit = self._circuits[endpoint] = _Circuit(self._window)
+
+            state = self._refresh_state(circuit)
+            annotate('circuit_state', state)
+            if state == CLOSED:
+                return False
+
+            if state == HALF_OPEN and circuit.probes_in_flight < self._probes - circuit.probe_successes:
+                circuit.probes_in_flight += 1
+                return True
+
+            raise CircuitOpenError(endpoint, max(circuit.opened_at + self._open_s - self._clock(), 0.0))
+
+    def _record(self, endpoint: str, probe: bool, failed: bool | None) -> None:
+        """
+            Record the outcome of a request: failed, succeeded, or (if `failed` is None) neither.
+        """
+        with self._lock:
+            circuit = self._circuits[endpoint]
+            if probe:
+                circuit.probes_in_flight = max(circuit.probes_in_flight - 1, 0)
+                if circuit.state != HALF_OPEN or failed is None:
+                    # Another probe already re-opened the circuit, or this one didn't tell either way.
+                    return
+                if failed:
+                    self._open(circuit)
+                else:
+                    circuit.probe_successes += 1
+                    if circuit.probe_successes >= self._probes:
+                        circuit.state = CLOSED
+                        circuit.outcomes.clear()
+            elif circuit.state == CLOSED and failed is not None:
+                circuit.outcomes.append(failed)
+                if len(circuit.outcomes) >= self._min_requests and \
+                        sum(circuit.outcomes) >= self._failure_rate * len(circuit.outcomes):
+                    self._open(circuit)
+
+    def _open(self, circuit: _Circuit) -> None:
+        circuit.state = OPEN
+        circuit.opened_at = self._clock()
+
+    def _refresh_state(self, circuit: _Circuit) -> str:
+        if circuit.state == OPEN and self._clock() - circuit.opened_at >= self._open_s:
+            circuit.state = HALF_OPEN
+            circuit.probes_in_flight = 0
+            circuit.probe_successes = 0
+        return circuit.state
@@ -0,0 +1,198 @@
+"""
+    Copyright (c) 2013, Triad National Security, LLC
+    All rights reserved.
+
+    Redistribution and use in source and binary forms, with or without modification, are permitted provided that the
+    following conditions are met:
+
+    * Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+      disclaimer.
+    * Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+      following disclaimer in the documentation and/or other materials provided with the distribution.
+    * Neither the name of Triad National Security, LLC nor the names of its contributors may be used to endorse or
+      promote products derived from this software without specific prior written permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+    INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+    DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+    SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+    WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable
+
+import requests
+
+from .deadline import _current_deadline
+from .tracing import annotate
+from .transport import Transport
+from .yelpapi import endpoint_template
+
+# Weight of each new latency in an endpoint's smoothed latency (an exponentially weighted moving average), and how
+# many latencies an endpoint needs before its latency is judged at all.
+_SMOOTHING = 0.2
+_MIN_LATENCY_SAMPLES = 10
+
+
+class AdaptiveConcurrencyTransport(Transport):
+    """
+        A transport that limits how many requests are in flight at once, and adapts the limit to what Yelp will
+        accept, so that there is no need to guess a fixed number of workers. Requests beyond the limit wait for a
+        request in flight to finish.
+
+        The limit is adjusted by additive increase, multiplicative decrease (AIMD):
+
+            * every successful request raises the limit by 1 / limit, i.e., by one per limit's worth of requests, as
+              long as the limit is actually being used (at least half of it is in flight)
+            * a 429 (or 503) response, a timeout or connection error, or a smoothed latency more than
+              `latency_tolerance` times the median recent latency multiplies the limit by `backoff`; requests that
+              were already in flight
+              when the limit was last lowered can't lower it again, so a burst of 429s counts once
+
+        Latencies are tracked per endpoint, since a fast endpoint (e.g., autocomplete) says nothing about a slow one
+        (e.g., search). Each endpoint's latency is smoothed over its last several requests, so that ordinary variance
+        in single requests isn't mistaken for overload.
+
+        The current limit is available as `limit`, and every change to its whole-number value is recorded (with
+        its time) in `history`.
+
+        A request with a `deadline` waits for a free slot at most until the deadline, and then raises
+        `DeadlineExceeded`; once sent, its timeout is shrunk to whatever of the deadline is left. A timeout that
+        happens because the deadline ran out says nothing about Yelp, so it doesn't lower the limit.
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        latency_tolerance: float | None = 2.0,
+        window: int = 100,
+        history_size: int = 1000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+            Instantiate an AdaptiveConcurrencyTransport object.
+
+            required parameters:
+                * transport - the transport to limit; it is called from the callers' threads, so it must be
+                  thread-safe
+
+            optional parameters:
+                * initial_limit - number of requests allowed in flight to begin with
+                * min_limit - lowest the limit may go
+                * max_limit - highest the limit may go
+                * backoff - factor (0-1) the limit is multiplied by when Yelp is overloaded
+                * latency_tolerance - a successful request that brings its endpoint's smoothed latency above this many
+                  times the median latency in the window counts as overload; None to only react to errors
+                * window - number of recent latencies per endpoint in which to find the median latency
+                * history_size - number of limit changes kept in `history`
+                * clock - monotonic clock, in seconds
+        """
+        if not 0 < backoff < 1:
+            raise ValueError('A valid backoff factor between 0 and 1 (parameter "backoff") must be provided.')
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError('Limits must satisfy 1 <= min_limit <= initial_limit <= max_limit.')
+
+        self._transport = transport
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._backoff = backoff
+        self._latency_tolerance = latency_tolerance
+        self._latencies: defaultdict[str, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._smoothed: dict[str, float] = {}
+        self._clock = clock
+        self._last_decrease = float('-inf')
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.history: deque[tuple[float, int]] = deque([(clock(), initial_limit)], maxlen=history_size)
+
+    @property
+    def limit(self) -> int:
+        """
+            The number of requests currently allowed in flight at once.
+        """
+        return int(self._limit)
+
+    def get(
+        self,
+        url: str,
+        headers: dict[str, str],
+        params: dict[str, Any],
+        timeout: float | None,
+    ) -> Any:
+        deadline = _current_deadline.get()
+        with self._condition:
+            while self.in_flight >= int(self._limit):
+                self._condition.wait(None if deadline is None else deadline.timeout())
+            if deadline is not None:
+                timeout = deadline.timeout(timeout)
+            self.in_flight += 1
+            in_flight = self.in_flight
+            annotate('concurrency_limit', int(self._limit))
+
+        start = self._clock()
+        try:
+            response = self._transport.get(url, headers, params, timeout)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            self._release(start, in_flight, overloaded=None if deadline is not None and deadline.stopped(e) else True)
+            raise
+        except Exception:
+            self._release(start, in_flight, overloaded=None)
+            raise
+
+        if response.status_code in (429, 503):
+            overloaded = True
+        elif response.status_code >= 400:
+            overloaded = None
+        else:
+            overloaded = self._record_latency(endpoint_template(url), self._clock() - start)
+        self._release(start, in_flight, overloaded)
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+    def _record_latency(self, endpoint: str, latency: float) -> bool:
+        """
+            Record the latency of a successful request to `endpoint`, and return whether it shows Yelp overloaded.
+        """
+        with self._condition:
+            latencies = self._latencies[endpoint]
+            smoothed = self._smoothed.get(endpoint, latency)
+            smoothed = self._smoothed[endpoint] = smoothed + _SMOOTHING * (latency - smoothed)
+            latencies.append(latency)
+            if self._latency_tolerance is None or len(latencies) < _MIN_LATENCY_SAMPLES:
+                return False
+            ordered = sorted(latencies)
+            return smoothed > self._latency_tolerance * ordered[len(ordered) // 2]
+
+    def _release(self, start: float, in_flight: int, overloaded: bool | None) -> None:
+        """
+            Free the slot of a request that was started at `start` with `in_flight` requests in flight, and adjust the
+            limit by whether it found Yelp `overloaded` (None if it says nothing either way).
+        """
+        with self._condition:
+            self.in_flight -= 1
+            limit = self._limit
+            if overloaded:
+                if start >= self._last_decrease:
+                    self._limit = max(self._limit * self._backoff, self._min_limit)
+                    self._last_decrease = self._clock()
+            elif overloaded is False and in_flight * 2 >= limit:
+                self._limit = min(self._limit + 1 / self._limit, self._max_limit)
+
+            if int(self._limit) != int(limit):
+                self.history.append((self._clock(), int(self._limit)))
+            self._condition.notify_all()
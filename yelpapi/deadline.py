@@ -0,0 +1,137 @@
+"""
+    Copyright (c) 2013, Triad National Security, LLC
+    All rights reserved.
+
+    Redistribution and use in source and binary forms, with or without modification, are permitted provided that the
+    following conditions are met:
+
+    * Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+      disclaimer.
+    * Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+      following disclaimer in the documentation and/or other materials provided with the distribution.
+    * Neither the name of Triad National Security, LLC nor the names of its contributors may be used to endorse or
+      promote products derived from this software without specific prior written permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+    INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+    DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+    SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+    WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+from typing import Callable
+
+import requests
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """
+        Raised instead of starting a request once its operation's deadline has passed or it has been cancelled.
+    """
+    pass
+
+
+class Deadline:
+    """
+        A time budget for a whole operation, which may span many API calls. Pass it to any query method as
+        `deadline=...` (or to a composite operation such as `CrawlPlanner.execute()` or `RefreshScheduler.refresh()`)
+        and:
+
+            * each request's timeout shrinks to fit whatever remains of the budget
+            * no request is started once the budget is spent (`DeadlineExceeded` is raised instead)
+
+        A Deadline can also be cancelled with `cancel()` (e.g., from another thread), which has the same effect as it
+        expiring. Without a `timeout_s`, it is purely a cancellation token.
+
+        NOTE: the timeout given to a request bounds each connect and read on the socket rather than the request as a
+        whole, so a single, slowly trickling response can still run past the deadline.
+    """
+
+    def __init__(self, timeout_s: float | None = None, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+            Instantiate a Deadline object.
+
+            optional parameters:
+                * timeout_s - seconds from now until the deadline; if not given, the deadline never expires on its
+                  own but can still be cancelled
+                * clock - monotonic clock, in seconds
+        """
+        self._clock = clock
+        self._expires_at = None if timeout_s is None else clock() + timeout_s
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        """
+            Cancel the operation; no further requests will be started.
+        """
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    @property
+    def expired(self) -> bool:
+        """
+            Whether no further requests may be started, either because the deadline has passed or because it was
+            cancelled.
+        """
+        remaining = self.remaining()
+        return self._cancelled or (remaining is not None and remaining <= 0)
+
+    def remaining(self) -> float | None:
+        """
+            Seconds left until the deadline (never negative), or None if it has no time limit.
+        """
+        if self._expires_at is None:
+            return None
+        return max(self._expires_at - self._clock(), 0.0)
+
+    def timeout(self, timeout_s: float | None = None) -> float | None:
+        """
+            The timeout to use for a request that would otherwise use `timeout_s`, shrunk to fit the time remaining.
+            Raises `DeadlineExceeded` if no request may be started.
+        """
+        if self.expired:
+            raise DeadlineExceeded('Operation cancelled.' if self._cancelled else 'Operation deadline exceeded.')
+
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout_s
+        return remaining if timeout_s is None else min(timeout_s, remaining)
+
+    def stopped(self, error: BaseException | None = None) -> bool:
+        """
+            Whether a composite operation should stop and return what it has so far: either the deadline has expired,
+            or `error` (raised by a request) is a timeout caused by it expiring.
+        """
+        if error is not None and not isinstance(error, requests.exceptions.Timeout):
+            return False
+        return self.expired
+
+
+# The deadline of the request being made (in this thread or task), so that transports that hold requests back (e.g.,
+# to wait for a free slot) can give up in time and shrink their timeouts to what is left.
+_current_deadline: ContextVar[Deadline | None] = ContextVar('yelpapi_deadline', default=None)
+
+
+class PartialList(list):
+    """
+        A list of results from a composite operation. `truncated` is True if the operation was cut short by its
+        deadline, in which case only the results gathered up to that point are included.
+    """
+    truncated = False
+
+
+class PartialDict(dict):
+    """
+        A dict of results from a composite operation. `truncated` is True if the operation was cut short by its
+        deadline, in which case only the results gathered up to that point are included.
+    """
+    truncated = False
@@ -0,0 +1,411 @@
+"""
+    Copyright (c) 2013, Triad National Security, LLC
+    All rights reserved.
+
+    Redistribution and use in source and binary forms, with or without modification, are permitted provided that the
+    following conditions are met:
+
+    * Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+      disclaimer.
+    * Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+      following disclaimer in the documentation and/or other materials provided with the distribution.
+    * Neither the name of Triad National Security, LLC nor the names of its contributors may be used to endorse or
+      promote products derived from this software without specific prior written permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+    INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+    DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+    SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+    WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any, Callable, NamedTuple
+
+from .store import BusinessStore
+from .yelpapi import SEARCH_API_URL, YelpAPI, project_fields
+
+EARTH_RADIUS_M = 6_371_008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+# Search API parameters that `GeoIndex.search_query` knows how to answer locally.
+_LOCAL_SEARCH_PARAMS = frozenset((
+    'latitude', 'longitude', 'radius', 'categories', 'price', 'sort_by', 'limit', 'offset',
+))
+_LOCAL_SORTS = {
+    'best_match': lambda d, b: d,
+    'distance': lambda d, b: d,
+    'rating': lambda d, b: (-b.get('rating', 0), d),
+    'review_count': lambda d, b: (-b.get('review_count', 0), d),
+}
+
+
+def distance_m(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    """
+        Great-circle (haversine) distance, in meters, between two points.
+    """
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(longitude2 - longitude1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(math.sqrt(a), 1.0))
+
+
+def _descendants(taxonomy: Iterable[Mapping[str, Any]]) -> dict[str, frozenset[str]]:
+    """
+        Map every category alias to itself and all of its descendants.
+    """
+    children: dict[str, set[str]] = {}
+    for category in taxonomy:
+        children.setdefault(category['alias'], set())
+        for parent in category.get('parent_aliases') or ():
+            children.setdefault(parent, set()).add(category['alias'])
+
+    descendants: dict[str, frozenset[str]] = {}
+
+    def expand(alias: str, path: frozenset[str]) -> frozenset[str]:
+        if alias not in descendants:
+            found = {alias}
+            for child in children.get(alias, ()):
+                if child not in path:
+                    found |= expand(child, path | {child})
+            descendants[alias] = frozenset(found)
+        return descendants[alias]
+
+    for alias in children:
+        expand(alias, frozenset((alias,)))
+    return descendants
+
+
+def _split_categories(categories: str | Iterable[str] | None) -> frozenset[str] | None:
+    if not categories:
+        return None
+    if isinstance(categories, str):
+        categories = categories.split(',')
+    return frozenset(c.strip() for c in categories if c.strip()) or None
+
+
+class _Coverage(NamedTuple):
+    latitude: float
+    longitude: float
+    radius_m: float
+    categories: frozenset[str] | None
+    fetched_at: float
+
+
+class GeoIndex:
+    """
+        A local spatial index over harvested businesses, able to answer radius and bounding-box queries (with category
+        and price filters and Yelp's sort orders) in memory.
+
+        Businesses are bucketed into a grid of `cell_size_deg`-sized latitude/longitude cells, keyed on their
+        `coordinates`; records themselves are kept in a `BusinessStore`. The index also remembers which areas have been
+        completely harvested, and when. `search_query()` answers a Search API query locally when its circle lies
+        entirely within a fresh, completely harvested area, and otherwise passes it on to the Search API (indexing
+        whatever comes back).
+
+        Category filters match a business's own category aliases, as well as any category it was returned for by a
+        previous search. Yelp only lists the most specific categories on each business, so a search for a parent
+        category (e.g., `restaurants`) can only be answered from an area harvested without a category filter if the
+        category hierarchy is known: pass the `categories` of a Categories API response as `taxonomy`.
+
+        When a search completely harvests an area again, businesses in it that Yelp no longer returned are removed.
+
+        NOTE: the grid does not wrap around the antimeridian.
+    """
+
+    def __init__(
+        self,
+        max_age_s: float = 7 * 24 * 60 * 60,
+        cell_size_deg: float = 0.01,
+        store: BusinessStore | None = None,
+        taxonomy: Iterable[Mapping[str, Any]] | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+            Instantiate a GeoIndex object.
+
+            optional parameters:
+                * max_age_s - how long, in seconds, a harvested area is considered fresh
+                * cell_size_deg - size of each grid cell, in degrees
+                * store - the `BusinessStore` in which to keep business records; any businesses already in it are
+                  indexed
+                * taxonomy - category records (with `alias` and `parent_aliases`), as in a Categories API response
+                * clock - function returning the current time, in seconds since the epoch
+        """
+        self.max_age_s = max_age_s
+        self._cell_size_deg = cell_size_deg
+        self._clock = clock
+        self._store = BusinessStore() if store is None else store
+        self._cells: dict[tuple[int, int], set[str]] = {}
+        self._points: dict[str, tuple[float, float, frozenset[str]]] = {}
+        self._coverage: list[_Coverage] = []
+        self._descendants = None if taxonomy is None else _descendants(taxonomy)
+
+        for business_id in list(self._store):
+            self._index(self._store[business_id])
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, business_id: object) -> bool:
+        return business_id in self._points
+
+    def add(self, business: dict[str, Any], categories: Iterable[str] = ()) -> None:
+        """
+            Add (or replace) a business record. Businesses without valid coordinates are ignored.
+
+            optional parameters:
+                * categories - category filters this business is known to match, in addition to its own categories
+        """
+        coordinates = business.get('coordinates') or {}
+        if not isinstance(coordinates.get('latitude'), (int, float)) or \
+                not isinstance(coordinates.get('longitude'), (int, float)):
+            return
+
+        # `distance` is relative to whatever search returned the business, so it is meaningless here.
+        business = {k: v for k, v in business.items() if k != 'distance'}
+        self._store.upsert(business)
+        self._index(business, categories)
+
+    def remove(self, business_id: str) -> None:
+        """
+            Remove a business from the index (and its store), if it is there.
+        """
+        point = self._points.pop(business_id, None)
+        if point is not None:
+            self._cells[self._cell(point[0], point[1])].discard(business_id)
+        if business_id in self._store:
+            self._store.remove(business_id)
+
+    def extend(self, businesses: Iterable[dict[str, Any]], categories: Iterable[str] = ()) -> None:
+        """
+            Add every business record in `businesses`.
+        """
+        categories = tuple(categories)
+        for business in businesses:
+            self.add(business, categories)
+
+    def within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_m: float,
+        categories: str | Iterable[str] | None = None,
+    ) -> list[tuple[float, dict[str, Any]]]:
+        """
+            All indexed businesses within `radius_m` meters of a point, optionally filtered to those matching any of
+            `categories`, as (distance in meters, business) pairs sorted by distance.
+        """
+        return [(distance, self._store[business_id])
+                for distance, business_id in self.ids_within_radius(latitude, longitude, radius_m, categories)]
+
+    def ids_within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_m: float,
+        categories: str | Iterable[str] | None = None,
+    ) -> list[tuple[float, str]]:
+        """
+            Like `within_radius()`, but returns (distance in meters, business ID) pairs, without decoding any records.
+        """
+        d_latitude = radius_m / METERS_PER_DEGREE
+        d_longitude = d_latitude / max(math.cos(math.radians(min(abs(latitude) + d_latitude, 90.0))), 1e-9)
+        # The haversine formula of `distance_m`, inlined with the query point's terms hoisted out of the loop, since
+        # this is called for every candidate.
+        phi1 = math.radians(latitude)
+        cos_phi1 = math.cos(phi1)
+        radians, sin, cos, asin, sqrt = math.radians, math.sin, math.cos, math.asin, math.sqrt
+        matches = []
+        for business_id, (b_latitude, b_longitude) in self._candidates(
+            latitude - d_latitude, longitude - d_longitude, latitude + d_latitude, longitude + d_longitude, categories
+        ):
+            phi2 = radians(b_latitude)
+            a = sin((phi2 - phi1) / 2) ** 2 + cos_phi1 * cos(phi2) * sin(radians(b_longitude - longitude) / 2) ** 2
+            distance = 2 * EARTH_RADIUS_M * asin(min(sqrt(a), 1.0))
+            if distance <= radius_m:
+                matches.append((distance, business_id))
+        matches.sort()
+        return matches
+
+    def within_bbox(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        categories: str | Iterable[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+            All indexed businesses within a latitude/longitude bounding box, optionally filtered to those matching any
+            of `categories`.
+        """
+        return [self._store[business_id] for business_id, _ in self._candidates(south, west, north, east, categories)]
+
+    def mark_covered(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_m: float,
+        categories: str | Iterable[str] | None = None,
+        fetched_at: float | None = None,
+    ) -> None:
+        """
+            Record that every business within `radius_m` meters of a point (matching any of `categories`, if given)
+            has been harvested into the index.
+        """
+        fetched_at = self._clock() if fetched_at is None else fetched_at
+        self._coverage.append(_Coverage(latitude, longitude, radius_m, _split_categories(categories), fetched_at))
+
+    def is_covered(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_m: float,
+        categories: str | Iterable[str] | None = None,
+    ) -> bool:
+        """
+            Whether the circle of `radius_m` meters around a point lies entirely within one freshly harvested area
+            whose categories include `categories`. An area harvested without a category filter only covers category
+            queries if `taxonomy` was given and includes every queried category.
+        """
+        oldest = self._clock() - self.max_age_s
+        self._coverage = [c for c in self._coverage if c.fetched_at >= oldest]
+
+        categories = _split_categories(categories)
+        resolvable = categories is None or (self._descendants is not None and categories <= self._descendants.keys())
+        for c in self._coverage:
+            if c.categories is None and not resolvable:
+                continue
+            if c.categories is not None and (categories is None or not categories <= c.categories):
+                continue
+            if distance_m(latitude, longitude, c.latitude, c.longitude) + radius_m <= c.radius_m:
+                return True
+        return False
+
+    def search_query(self, api: YelpAPI, **kwargs: Any) -> dict[str, Any]:
+        """
+            Answer a Search API query, locally if possible.
+
+            The query is answered locally when it is made by latitude, longitude, and radius, uses only parameters
+            the index understands (`categories`, `price`, `sort_by`, `limit`, and `offset`), and lies within a fresh,
+            completely harvested area. Locally, `best_match` is approximated by distance.
+
+            Otherwise, `api.search_query` is called and the returned businesses are indexed. If that response
+            contains every business matching the query, its area is marked as covered.
+
+            If `fields` is given, it is applied to the response either way; complete businesses are still fetched for
+            the index.
+        """
+        deadline = kwargs.pop('deadline', None)
+        fields = kwargs.pop('fields', None)
+        parameters = {k: v for k, v in kwargs.items() if v is not None}
+        latitude, longitude, radius = parameters.get('latitude'), parameters.get('longitude'), parameters.get('radius')
+        categories = parameters.get('categories')
+        local = (
+            latitude is not None and longitude is not None and radius is not None
+            and parameters.get('sort_by', 'best_match') in _LOCAL_SORTS
+            and parameters.keys() <= _LOCAL_SEARCH_PARAMS
+        )
+
+        if local and self.is_covered(latitude, longitude, radius, categories):
+            response = self._local_search(**parameters)
+            return response if fields is None else project_fields(SEARCH_API_URL, response, fields)
+
+        response = api.search_query(deadline=deadline, **kwargs)
+        businesses = response.get('businesses', [])
+        self.extend(businesses, _split_categories(categories) or ())
+        if local and not parameters.get('offset') and not parameters.get('price') and \
+                response.get('total', 0) <= len(businesses):
+            # Anything else indexed in this area that matches the query has closed or moved away.
+            returned = {b.get('id') for b in businesses}
+            for _, business_id in self.ids_within_radius(latitude, longitude, radius, categories):
+                if business_id not in returned:
+                    self.remove(business_id)
+            self.mark_covered(latitude, longitude, radius, categories)
+        return response if fields is None else project_fields(SEARCH_API_URL, response, fields)
+
+    def _local_search(
+        self,
+        latitude: float,
+        longitude: float,
+        radius: float,
+        categories: str | None = None,
+        price: str | None = None,
+        sort_by: str = 'best_match',
+        limit: int = 20,
+        offset: int = 0,
+    ) -> dict[str, Any]:
+        # Filter, sort, and page on IDs and columns, so that only the returned page of records is decoded.
+        matches = self.ids_within_radius(latitude, longitude, radius, categories)
+        if price or _LOCAL_SORTS[sort_by] is not _LOCAL_SORTS['distance']:
+            columns = {business_id: self._store.columns(business_id) for _, business_id in matches}
+            if price:
+                prices = {int(p) for p in str(price).split(',')}
+                matches = [(d, i) for d, i in matches if len(columns[i].get('price', '')) in prices]
+            key = _LOCAL_SORTS[sort_by]
+            matches.sort(key=lambda match: key(match[0], columns[match[1]]))
+
+        page = matches[int(offset):int(offset) + int(limit)]
+        return {
+            'businesses': [{**self._store[business_id], 'distance': distance} for distance, business_id in page],
+            'total': len(matches),
+            'region': {'center': {'latitude': latitude, 'longitude': longitude}},
+        }
+
+    def _cell(self, latitude: float, longitude: float) -> tuple[int, int]:
+        return math.floor(latitude / self._cell_size_deg), math.floor(longitude / self._cell_size_deg)
+
+    def _index(self, business: dict[str, Any], categories: Iterable[str] = ()) -> None:
+        business_id = business['id']
+        coordinates = business.get('coordinates') or {}
+        latitude, longitude = coordinates.get('latitude'), coordinates.get('longitude')
+        if not isinstance(latitude, (int, float)) or not isinstance(longitude, (int, float)):
+            return
+
+        tags = frozenset(c['alias'] for c in business.get('categories') or () if isinstance(c, dict) and 'alias' in c)
+        previous = self._points.get(business_id)
+        if previous is not None:
+            tags |= previous[2]
+            self._cells[self._cell(previous[0], previous[1])].discard(business_id)
+
+        self._points[business_id] = (latitude, longitude, tags | frozenset(categories))
+        self._cells.setdefault(self._cell(latitude, longitude), set()).add(business_id)
+
+    def _candidates(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        categories: str | Iterable[str] | None,
+    ) -> Iterator[tuple[str, tuple[float, float]]]:
+        categories = _split_categories(categories)
+        if categories is not None and self._descendants is not None:
+            categories = frozenset(d for c in categories for d in self._descendants.get(c, (c,)))
+        min_row, min_column = self._cell(south, west)
+        max_row, max_column = self._cell(north, east)
+        if (max_row - min_row + 1) * (max_column - min_column + 1) <= len(self._cells):
+            cells = [(row, column)
+                     for row in range(min_row, max_row + 1)
+                     for column in range(min_column, max_column + 1)]
+        else:
+            # The box spans more cells than are occupied, so it's cheaper to check the occupied ones.
+            cells = [(row, column) for row, column in self._cells
+                     if min_row <= row <= max_row and min_column <= column <= max_column]
+
+        for cell in cells:
+            for business_id in self._cells.get(cell, ()):
+                latitude, longitude, tags = self._points[business_id]
+                if not (south <= latitude <= north and west <= longitude <= east):
+                    continue
+                if categories is not None and categories.isdisjoint(tags):
+                    continue
+                yield business_id, (latitude, longitude)
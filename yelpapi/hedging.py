@@ -0,0 +1,205 @@
+"""
+    Copyright (c) 2013, Triad National Security, LLC
+    All rights reserved.
+
+    Redistribution and use in source and binary forms, with or without modification, are permitted provided that the
+    following conditions are met:
+
+    * Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+      disclaimer.
+    * Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+      following disclaimer in the documentation and/or other materials provided with the distribution.
+    * Neither the name of Triad National Security, LLC nor the names of its contributors may be used to endorse or
+      promote products derived from this software without specific prior written permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+    INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+    DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+    SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+    WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any
+
+from .tracing import annotate
+from .transport import Transport
+from .yelpapi import endpoint_template
+
+
+def _close_response(future: Future) -> None:
+    if not future.cancelled() and future.exception() is None:
+        close = getattr(future.result(), 'close', None)
+        if close is not None:
+            close()
+
+
+class HedgedTransport(Transport):
+    """
+        A transport that cuts tail latency by hedging: if a request hasn't been answered within the `percentile`th
+        percentile of recent latencies for its endpoint, an identical second request is sent, and whichever answers
+        first is used. All Yelp API calls are idempotent GETs, so this is always safe, but each hedge does spend an
+        extra API call; `budget` caps hedges to a fraction of all requests.
+
+        The losing request is cancelled if it hasn't started yet. Blocking HTTP clients can't abort a request that is
+        already in flight, so its response is simply discarded (and closed) when it arrives.
+
+        Hedging starts once `min_samples` latencies have been observed for an endpoint. Hedged requests are issued
+        from a pool of `max_workers` threads, so the wrapped transport must be thread-safe. The pool never queues
+        requests: while all of its threads are busy, requests are issued on the caller's thread without a hedge, so
+        the pool size caps how many requests can be hedged at once, not how many can be in flight.
+
+        A hedge is sent with whatever is left of the request's timeout, so it never outlives the original request
+        (or its deadline).
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        percentile: float = 95.0,
+        budget: float = 0.05,
+        window: int = 200,
+        min_samples: int = 20,
+        max_workers: int = 16,
+    ) -> None:
+        """
+            Instantiate a HedgedTransport object.
+
+            required parameters:
+                * transport - the transport to hedge requests on
+
+            optional parameters:
+                * percentile - latency percentile (0-100) of recent requests after which to send a hedge
+                * budget - maximum number of hedges, as a fraction of all requests
+                * window - number of recent latencies kept per endpoint
+                * min_samples - number of latencies that must be observed for an endpoint before hedging it
+                * max_workers - size of the thread pool used to issue hedged requests
+        """
+        if not 0 <= percentile <= 100:
+            raise ValueError('A valid percentile between 0 and 100 (parameter "percentile") must be provided.')
+
+        self._transport = transport
+        self._percentile = percentile
+        self._budget = budget
+        self._min_samples = min_samples
+        self._max_workers = max_workers
+        self._busy_workers = 0
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='yelpapi-hedge')
+        self._latencies: defaultdict[str, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.hedge_count = 0
+
+    def hedge_delay(self, endpoint: str) -> float | None:
+        """
+            How long, in seconds, to wait for a response from `endpoint` before hedging; None if too few latencies
+            have been observed yet.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies[endpoint])
+        if len(latencies) < self._min_samples:
+            return None
+        return latencies[min(int(len(latencies) * self._percentile / 100), len(latencies) - 1)]
+
+    def get(
+        self,
+        url: str,
+        headers: dict[str, str],
+        params: dict[str, Any],
+        timeout: float | None,
+    ) -> Any:
+        endpoint = endpoint_template(url)
+        with self._lock:
+            self.request_count += 1
+
+        delay = self.hedge_delay(endpoint)
+        primary = None if delay is None else self._submit(endpoint, url, headers, params, timeout)
+        if primary is None:
+            return self._timed_get(endpoint, url, headers, params, timeout)
+
+        start = time.monotonic()
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+
+        hedge_timeout = None if timeout is None else timeout - (time.monotonic() - start)
+        if (hedge_timeout is not None and hedge_timeout <= 0) or not self._take_budget():
+            return primary.result()
+        hedge = self._submit(endpoint, url, headers, params, hedge_timeout)
+        if hedge is None:
+            self._return_budget()
+            return primary.result()
+
+        annotate('hedged', True)
+        done, pending = wait((primary, hedge), return_when=FIRST_COMPLETED)
+        successful = [f for f in (primary, hedge) if f in done and f.exception() is None]
+        if successful:
+            winner = successful[0]
+        else:
+            # The first request to finish failed, but the other one may yet succeed.
+            winner = pending.pop() if pending else primary
+
+        for loser in {primary, hedge} - {winner}:
+            if not loser.cancel():
+                loser.add_done_callback(_close_response)
+
+        if winner is hedge:
+            annotate('hedge_won', True)
+        return winner.result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self._transport.close()
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self.hedge_count + 1 > self._budget * self.request_count:
+                return False
+            self.hedge_count += 1
+            return True
+
+    def _return_budget(self) -> None:
+        with self._lock:
+            self.hedge_count -= 1
+
+    def _submit(self, *args: Any) -> Future | None:
+        """
+            Issue a request on the pool, or return None if every thread in the pool is busy. The request runs in a copy
+            of the caller's context, so its traffic class, deadline, and trace span carry over to the pool thread.
+        """
+        with self._lock:
+            if self._busy_workers >= self._max_workers:
+                return None
+            self._busy_workers += 1
+        future = self._executor.submit(contextvars.copy_context().run, self._timed_get, *args)
+        future.add_done_callback(self._release_worker)
+        return future
+
+    def _release_worker(self, future: Future) -> None:
+        with self._lock:
+            self._busy_workers -= 1
+
+    def _timed_get(
+        self,
+        endpoint: str,
+        url: str,
+        headers: dict[str, str],
+        params: dict[str, Any],
+        timeout: float | None,
+    ) -> Any:
+        start = time.perf_counter()
+        response = self._transport.get(url, headers, params, timeout)
+        latency = time.perf_counter() - start
+        with self._lock:
+            self._latencies[endpoint].append(latency)
+        return response
@@ -0,0 +1,262 @@
+"""
+    Copyright (c) 2013, Triad National Security, LLC
+    All rights reserved.
+
+    Redistribution and use in source and binary forms, with or without modification, are permitted provided that the
+    following conditions are met:
+
+    * Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+      disclaimer.
+    * Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+      following disclaimer in the documentation and/or other materials provided with the distribution.
+    * Neither the name of Triad National Security, LLC nor the names of its contributors may be used to endorse or
+      promote products derived from this software without specific prior written permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+    INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+    DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+    SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+    WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+from collections.abc import Hashable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from .deadline import Deadline, PartialList
+from .yelpapi import EVENT_SEARCH_API_URL, SEARCH_API_URL, YelpAPI
+
+# Endpoints that page through results with `offset` and `limit`, mapped to Yelp's default `limit` and the maximum
+# number of results Yelp will return for a single query (`offset + limit` may not exceed it).
+PAGINATED_API_URLS = {
+    SEARCH_API_URL: (20, 240),
+    EVENT_SEARCH_API_URL: (3, 1000),
+}
+
+
+def total_key(url: str, params: dict[str, Any]) -> Hashable:
+    """
+        The key under which `CrawlPlanner.totals` caches the `total` of a paginated query. Paging parameters (and
+        `fields`, which doesn't change the results) are ignored so that every page of a query shares one key.
+    """
+    return url, tuple(sorted((k, str(v)) for k, v in params.items() if k not in ('offset', 'limit', 'fields')))
+
+
+@dataclass
+class PlannedCall:
+    """
+        A single query recorded by `CrawlPlanner`. `url` and `params` are exactly what would have been passed to
+        `YelpAPI._query`, so the call can be replayed against any `YelpAPI` instance.
+    """
+    url: str
+    params: dict[str, Any]
+    priority: int = 0
+    paginate: bool = False
+
+
+class CrawlPlanner(YelpAPI):
+    """
+        A dry-run stand-in for `YelpAPI`. Every query method is available and validates its parameters exactly like
+        `YelpAPI` does, but instead of issuing an API call, the call is recorded in `self.calls` and an empty dict is
+        returned. No API key is needed, and no connections are ever opened.
+
+        Once a job has been recorded, the planner can estimate how many API calls it will take (`estimate_calls()`),
+        pack the recorded calls into daily and/or per-key quotas (`schedule()` and `split()`), and run them against a
+        real `YelpAPI` instance (`execute()`).
+
+        Paginated searches (see `options()`) are estimated using the `total` Yelp reported the last time the same
+        query was executed. These totals are kept in `self.totals`, which can be saved and passed back in to a new
+        planner. When no total is known, the worst case (every page up to Yelp's result cap) is assumed.
+    """
+
+    def __init__(self, totals: dict[Hashable, int] | None = None) -> None:
+        """
+            Instantiate a CrawlPlanner object.
+
+            optional parameters:
+                * totals - previously cached search totals, as found in `self.totals` of an earlier planner
+        """
+        self.calls: list[PlannedCall] = []
+        self.totals = {} if totals is None else totals
+        self._priority = 0
+        self._paginate = False
+
+    def close(self) -> None:
+        """
+            Nothing to close; the planner never opens a Session.
+        """
+        pass
+
+    @contextmanager
+    def options(self, priority: int = 0, paginate: bool = False) -> Iterator[CrawlPlanner]:
+        """
+            Set options for all calls recorded inside the `with` block.
+
+            optional parameters:
+                * priority - calls with a higher priority are scheduled (and executed) before lower-priority calls
+                * paginate - fetch every page of the search rather than just the one page requested; only the
+                  Search and Event Search APIs can be paginated
+        """
+        previous = self._priority, self._paginate
+        self._priority, self._paginate = priority, paginate
+        try:
+            yield self
+        finally:
+            self._priority, self._paginate = previous
+
+    def estimate_calls(self, call: PlannedCall | None = None) -> int:
+        """
+            Estimate how many API calls a single recorded call will take or, if no call is given, how many API calls
+            the entire plan will take.
+        """
+        if call is None:
+            return sum(self.estimate_calls(c) for c in self.calls)
+
+        if not call.paginate:
+            return 1
+
+        offset, limit, max_results = self._first_page(call)
+        total = self.totals.get(total_key(call.url, call.params), max_results)
+        return max(math.ceil((min(total, max_results) - offset) / limit), 1)
+
+    def split(self, budgets: Sequence[int]) -> tuple[list[list[PlannedCall]], list[PlannedCall]]:
+        """
+            Pack the recorded calls into the given API call budgets (e.g., the remaining quota of several days or
+            several API keys). Calls are placed in priority order, each into the first budget it still fits in, so
+            high-priority work lands in the earliest budgets. Once a call has to go into a later budget because the
+            earlier ones are full, lower-priority calls go into that budget or later ones where they fit, and only use
+            the room left in earlier budgets rather than not being scheduled at all.
+
+            Returns a list of calls per budget, plus the list of calls that did not fit anywhere.
+        """
+        shards: list[list[PlannedCall]] = [[] for _ in budgets]
+        remaining = list(budgets)
+        unscheduled = []
+        # The first budget that calls of the current priority should use, and the first that lower-priority ones should.
+        first = spilled = 0
+        priority = None
+
+        for call in self._by_priority(self.calls):
+            if call.priority != priority:
+                first, priority = spilled, call.priority
+            cost = self.estimate_calls(call)
+            for i in itertools.chain(range(first, len(remaining)), range(first)):
+                if cost <= remaining[i]:
+                    shards[i].append(call)
+                    remaining[i] -= cost
+                    spilled = max(spilled, i)
+                    break
+            else:
+                unscheduled.append(call)
+
+        return shards, unscheduled
+
+    def schedule(
+        self,
+        daily_limit: int,
+        days: int = 1,
+        keys: int = 1,
+        used_today: int | Sequence[int] = 0,
+    ) -> tuple[list[list[list[PlannedCall]]], list[PlannedCall]]:
+        """
+            Spread the recorded calls over several days and/or API keys, each of which allows `daily_limit` calls per
+            day.
+
+            required parameters:
+                * daily_limit - number of API calls each key may make per day
+
+            optional parameters:
+                * days - number of days to spread the plan over
+                * keys - number of API keys available
+                * used_today - calls already spent today, either one number for all keys or one number per key
+
+            Returns the calls to make on each day with each key (indexed as `plan[day][key]`), plus the list of
+            calls that did not fit.
+        """
+        if isinstance(used_today, int):
+            used_today = [used_today] * keys
+
+        if len(used_today) != keys:
+            raise ValueError('One "used_today" value must be provided per key.')
+
+        budgets = [max(daily_limit - used_today[key], 0) if day == 0 else daily_limit
+                   for day in range(days) for key in range(keys)]
+        shards, unscheduled = self.split(budgets)
+        return [shards[day * keys:(day + 1) * keys] for day in range(days)], unscheduled
+
+    def execute(
+        self,
+        api: YelpAPI,
+        calls: Iterable[PlannedCall] | None = None,
+        deadline: Deadline | None = None,
+    ) -> PartialList:
+        """
+            Issue the given calls (by default, every recorded call in priority order) using `api`, and return the
+            responses in order. Paginated calls return one response per page. The `total` of every paginated search
+            is cached in `self.totals` to improve future estimates.
+
+            If a `deadline` is given, no call is started once it has passed; the responses gathered so far are
+            returned, marked as `truncated`.
+        """
+        responses = PartialList()
+
+        try:
+            for call in self._by_priority(self.calls) if calls is None else calls:
+                if not call.paginate:
+                    responses.append(api._query(call.url, deadline=deadline, **call.params))
+                    continue
+
+                offset, limit, max_results = self._first_page(call)
+                while True:
+                    response = api._query(call.url, deadline=deadline,
+                                          **{**call.params, 'offset': offset, 'limit': limit})
+                    responses.append(response)
+
+                    total = response.get('total', 0)
+                    self.totals[total_key(call.url, call.params)] = total
+                    offset += limit
+                    if offset >= min(total, max_results):
+                        break
+                    limit = min(limit, max_results - offset)
+        except Exception as e:
+            if deadline is None or not deadline.stopped(e):
+                raise
+            responses.truncated = True
+
+        return responses
+
+    @staticmethod
+    def _first_page(call: PlannedCall) -> tuple[int, int, int]:
+        """
+            The `offset` and `limit` of the first page of a paginated call, with the limit clamped so that the page
+            doesn't run past Yelp's result cap, and that cap.
+        """
+        default_limit, max_results = PAGINATED_API_URLS[call.url]
+        offset = int(call.params.get('offset') or 0)
+        limit = min(int(call.params.get('limit') or default_limit), max(max_results - offset, 1))
+        return offset, limit, max_results
+
+    @staticmethod
+    def _by_priority(calls: Iterable[PlannedCall]) -> list[PlannedCall]:
+        # sorted() is stable, so calls of equal priority keep the order in which they were recorded.
+        return sorted(calls, key=lambda call: -call.priority)
+
+    def _query(self, url: str, **kwargs: Any) -> dict[str, Any]:
+        """
+            Record the call rather than issuing it.
+        """
+        if self._paginate and url not in PAGINATED_API_URLS:
+            raise ValueError(f'{url} does not support pagination.')
+
+        # A deadline only applies to actually issuing the call; pass one to `execute()` instead.
+        kwargs.pop('deadline', None)
+        parameters = {k: v for k, v in kwargs.items() if v is not None}
+        self.calls.append(PlannedCall(url, parameters, self._priority, self._paginate))
+        return {}
@@ -0,0 +1,247 @@
+"""
+    Copyright (c) 2013, Triad National Security, LLC
+    All rights reserved.
+
+    Redistribution and use in source and binary forms, with or without modification, are permitted provided that the
+    following conditions are met:
+
+    * Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+      disclaimer.
+    * Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+      following disclaimer in the documentation and/or other materials provided with the distribution.
+    * Neither the name of Triad National Security, LLC nor the names of its contributors may be used to endorse or
+      promote products derived from this software without specific prior written permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+    INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+    DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+    SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+    WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import time
+from collections.abc import Mapping
+from typing import Any, Callable
+
+from .deadline import Deadline, PartialDict
+from .yelpapi import YelpAPI
+
+# How much a change to each field matters. Fields not listed here are not watched for changes.
+DEFAULT_FIELD_WEIGHTS = {
+    'is_closed': 4.0,
+    'hours': 2.0,
+    'rating': 1.0,
+    'review_count': 0.5,
+}
+
+
+class RefreshResults(PartialDict):
+    """
+        The records fetched by `RefreshScheduler.refresh()`, by business ID. `errors` holds the exception raised for
+        each business that could not be fetched (e.g., an `HTTPError` for a business that no longer exists).
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.errors: dict[str, Exception] = {}
+
+
+class _Tracked:
+    __slots__ = ('first_fetch', 'last_fetch', 'due', 'fingerprints', 'changes', 'entry', 'failures')
+
+    def __init__(self) -> None:
+        self.first_fetch: float | None = None
+        self.last_fetch: float | None = None
+        self.due = float('-inf')
+        self.fingerprints: tuple[int, ...] | None = None
+        self.changes: tuple[int, ...] | None = None
+        self.entry = -1
+        self.failures = 0
+
+
+class RefreshScheduler:
+    """
+        Decides which tracked businesses to refresh with the Business API, so that a limited budget of API calls is
+        spent on the records most likely to have changed.
+
+        Every time a business is fetched, the watched fields (`field_weights`) are compared with the previous fetch to
+        learn how often that business changes. Each business is then due for a refresh once, at its learned rate of
+        change, one (weighted) change is expected to have happened since its last fetch; businesses that have never
+        been fetched are due immediately. `refresh()` fetches the most overdue businesses first.
+
+        Until enough history has been gathered, change rates are estimated from a prior of one change to each watched
+        field per `prior_interval_s` seconds.
+
+        A business that fails to refresh is retried after `retry_interval_s` seconds, doubling with every
+        consecutive failure (up to `prior_interval_s`), so that it doesn't hold up the rest.
+    """
+
+    def __init__(
+        self,
+        field_weights: Mapping[str, float] | None = None,
+        prior_interval_s: float = 30 * 24 * 60 * 60,
+        retry_interval_s: float = 60 * 60,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+            Instantiate a RefreshScheduler object.
+
+            optional parameters:
+                * field_weights - how much a change to each watched field matters; defaults to
+                  `DEFAULT_FIELD_WEIGHTS`
+                * prior_interval_s - assumed time, in seconds, between changes to a field before any have been seen
+                * retry_interval_s - time, in seconds, to wait before retrying a business that failed to refresh
+                * clock - function returning the current time, in seconds since the epoch
+        """
+        field_weights = DEFAULT_FIELD_WEIGHTS if field_weights is None else field_weights
+        if sum(field_weights.values()) <= 0:
+            raise ValueError('At least one field must have a positive weight (parameter "field_weights").')
+
+        self._fields = tuple(field_weights)
+        self._weights = tuple(field_weights.values())
+        self._prior_interval_s = prior_interval_s
+        self._retry_interval_s = retry_interval_s
+        self._clock = clock
+        self._tracked: dict[str, _Tracked] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._entries = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._tracked)
+
+    def __contains__(self, business_id: object) -> bool:
+        return business_id in self._tracked
+
+    def track(self, business_id: str, business: dict[str, Any] | None = None, fetched_at: float | None = None) -> None:
+        """
+            Start tracking a business. If a previously fetched record is given, it is used as the baseline for
+            detecting changes (fetched at `fetched_at`, or now); otherwise, the business is due immediately.
+        """
+        if not business_id:
+            raise ValueError('A valid business ID (parameter "business_id") must be provided.')
+
+        if business_id not in self._tracked:
+            self._tracked[business_id] = _Tracked()
+            if business is None:
+                self._push(business_id)
+
+        if business is not None:
+            self.record(business_id, business, fetched_at)
+
+    def untrack(self, business_id: str) -> None:
+        """
+            Stop tracking a business.
+        """
+        del self._tracked[business_id]
+        self._compact()
+
+    def record(self, business_id: str, business: dict[str, Any], fetched_at: float | None = None) -> None:
+        """
+            Record a freshly fetched copy of a tracked business, learning from whatever changed since the previous
+            fetch. `refresh()` does this automatically.
+        """
+        tracked = self._tracked[business_id]
+        fetched_at = self._clock() if fetched_at is None else fetched_at
+        fingerprints = tuple(hash(json.dumps(business.get(f), sort_keys=True)) for f in self._fields)
+
+        if tracked.fingerprints is None:
+            tracked.first_fetch = fetched_at
+            tracked.changes = (0,) * len(self._fields)
+        else:
+            tracked.changes = tuple(n + (new != old)
+                                    for n, new, old in zip(tracked.changes, fingerprints, tracked.fingerprints))
+        tracked.fingerprints = fingerprints
+        tracked.last_fetch = fetched_at
+        tracked.failures = 0
+        tracked.due = fetched_at + 1 / self.volatility(business_id)
+        self._push(business_id)
+
+    def volatility(self, business_id: str) -> float:
+        """
+            The learned, weighted rate of change (in changes per second) of a tracked business.
+        """
+        tracked = self._tracked[business_id]
+        changes = tracked.changes or (0,) * len(self._fields)
+        observed = 0.0 if tracked.first_fetch is None else tracked.last_fetch - tracked.first_fetch
+        return sum(w * (n + 1) / (observed + self._prior_interval_s) for w, n in zip(self._weights, changes))
+
+    def due(self, budget: int) -> list[str]:
+        """
+            The IDs of (at most) `budget` businesses that should be refreshed next, most overdue first.
+        """
+        due = []
+        for _ in range(min(budget, len(self._tracked))):
+            due.append(self._pop())
+        for business_id in due:
+            self._push(business_id)
+        return due
+
+    def refresh(
+        self,
+        api: YelpAPI,
+        budget: int,
+        deadline: Deadline | None = None,
+        **kwargs: Any,
+    ) -> RefreshResults:
+        """
+            Refresh (at most) `budget` of the most overdue businesses using `api.business_query`, and return the
+            fetched records by business ID. Any other parameters are passed on to `business_query`.
+
+            If a fetch raises an exception, the exception is recorded in the result's `errors`, the business is
+            rescheduled for a retry (see `retry_interval_s`), and refreshing carries on with the next business. If a
+            `deadline` is given and it passes, the records fetched so far are returned, marked as `truncated`.
+        """
+        refreshed = RefreshResults()
+        # Pick every business up front: fetching one reschedules it, and it mustn't be picked again in this run.
+        due = [self._pop() for _ in range(min(budget, len(self._tracked)))]
+        for i, business_id in enumerate(due):
+            try:
+                business = api.business_query(business_id, deadline=deadline, **kwargs)
+            except Exception as e:
+                if deadline is not None and deadline.stopped(e):
+                    for unfetched in due[i:]:
+                        self._push(unfetched)
+                    refreshed.truncated = True
+                    break
+                self._retry_later(business_id)
+                refreshed.errors[business_id] = e
+                continue
+            self.record(business_id, business)
+            refreshed[business_id] = business
+        return refreshed
+
+    def _retry_later(self, business_id: str) -> None:
+        tracked = self._tracked[business_id]
+        tracked.failures += 1
+        backoff = min(self._retry_interval_s * 2 ** (tracked.failures - 1), self._prior_interval_s)
+        tracked.due = self._clock() + backoff
+        self._push(business_id)
+
+    def _push(self, business_id: str) -> None:
+        tracked = self._tracked[business_id]
+        tracked.entry = next(self._entries)
+        heapq.heappush(self._heap, (tracked.due, tracked.entry, business_id))
+        self._compact()
+
+    def _compact(self) -> None:
+        # Rebuild the heap from the current entries once stale ones outnumber them, so that rescheduling and
+        # untracking don't grow it without bound.
+        if len(self._heap) > 2 * len(self._tracked) + 64:
+            self._heap = [(t.due, t.entry, business_id) for business_id, t in self._tracked.items()]
+            heapq.heapify(self._heap)
+
+    def _pop(self) -> str:
+        # Entries aren't removed from the heap when a business is rescheduled or untracked (until it is compacted),
+        # so skip any entry that is no longer the current entry of its business.
+        while True:
+            _, entry, business_id = heapq.heappop(self._heap)
+            tracked = self._tracked.get(business_id)
+            if tracked is not None and tracked.entry == entry:
+                return business_id
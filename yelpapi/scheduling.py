@@ -0,0 +1,223 @@
+"""
+    Copyright (c) 2013, Triad National Security, LLC
+    All rights reserved.
+
+    Redistribution and use in source and binary forms, with or without modification, are permitted provided that the
+    following conditions are met:
+
+    * Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+      disclaimer.
+    * Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+      following disclaimer in the documentation and/or other materials provided with the distribution.
+    * Neither the name of Triad National Security, LLC nor the names of its contributors may be used to endorse or
+      promote products derived from this software without specific prior written permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+    INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+    DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+    SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+    WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from .deadline import Deadline, DeadlineExceeded, _current_deadline
+from .tracing import annotate
+from .transport import Transport
+
+# Traffic classes, mapped to their (priority, weight). Requests of a higher priority are always sent first; classes of
+# equal priority share what is left in proportion to their weights.
+DEFAULT_CLASSES = {
+    'interactive': (1, 1.0),
+    'batch': (0, 1.0),
+}
+
+_current_class: ContextVar[str | None] = ContextVar('yelpapi_traffic_class', default=None)
+
+
+@contextmanager
+def traffic_class(name: str) -> Iterator[None]:
+    """
+        Send every request made inside the `with` block (in this thread or task) as traffic class `name`, e.g.:
+
+            with traffic_class('batch'):
+                planner.execute(yelp_api)
+    """
+    token = _current_class.set(name)
+    try:
+        yield
+    finally:
+        _current_class.reset(token)
+
+
+class _Class:
+    __slots__ = ('priority', 'weight', 'last_tag', 'queued', 'sent', 'wait_s')
+
+    def __init__(self, priority: int, weight: float) -> None:
+        self.priority = priority
+        self.weight = weight
+        self.last_tag = 0.0
+        self.queued = 0
+        self.sent = 0
+        self.wait_s = 0.0
+
+
+class SchedulingTransport(Transport):
+    """
+        A transport that lets several kinds of traffic (e.g., user-facing lookups and a nightly crawl) share one QPS
+        limit without the bulk traffic crowding out the rest. Requests are sent at most `qps` per second; while they
+        wait for a slot, they queue by traffic class:
+
+            * a request of a higher-priority class is sent at the next free slot, ahead of every queued request of a
+              lower-priority class
+            * classes of equal priority are served by weighted fair queuing (self-clocked), so each gets a share of
+              the slots proportional to its weight
+
+        Lower-priority traffic therefore gets exactly the slots higher-priority traffic leaves unused, and speeds up
+        or slows down as that changes. `qps` can also be changed at any time (e.g., to track the quota remaining).
+
+        The class of a request is set with `traffic_class()`; requests made outside of one use `default_class`.
+
+        A request with a `deadline` waits in the queue at most until the deadline, and then raises `DeadlineExceeded`
+        (a cancelled deadline is noticed the next time the queue moves); once sent, its timeout is shrunk to whatever
+        of the deadline is left after waiting.
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        qps: float,
+        classes: Mapping[str, tuple[int, float]] | None = None,
+        default_class: str = 'interactive',
+    ) -> None:
+        """
+            Instantiate a SchedulingTransport object.
+
+            required parameters:
+                * transport - the transport to schedule requests on
+                * qps - maximum number of requests to send per second
+
+            optional parameters:
+                * classes - traffic classes, mapped to their (priority, weight); defaults to `DEFAULT_CLASSES`
+                * default_class - class of requests made outside of `traffic_class()`
+        """
+        classes = DEFAULT_CLASSES if classes is None else classes
+        if default_class not in classes:
+            raise ValueError(f'Default class "{default_class}" is not one of the given classes.')
+        if any(weight <= 0 for _, weight in classes.values()):
+            raise ValueError('Every class weight must be positive.')
+
+        self._transport = transport
+        self._classes = {name: _Class(priority, weight) for name, (priority, weight) in classes.items()}
+        self._default_class = default_class
+        self._condition = threading.Condition()
+        self._interval = 0.0
+        self.qps = qps
+        self._last_sent = float('-inf')
+        self._virtual_time = 0.0
+        # Heap of (-priority, finish tag, arrival order, ticket); the request at its head is the next one sent.
+        self._queue: list[tuple[int, float, int, object]] = []
+        self._arrivals = itertools.count()
+
+    @property
+    def qps(self) -> float:
+        return 1 / self._interval
+
+    @qps.setter
+    def qps(self, qps: float) -> None:
+        if qps <= 0:
+            raise ValueError('A valid number of requests per second (parameter "qps") must be provided.')
+        with self._condition:
+            self._interval = 1 / qps
+            self._condition.notify_all()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """
+            The number of queued and sent requests, and the mean time sent requests spent queued, of every class.
+        """
+        with self._condition:
+            return {
+                name: {
+                    'queued': c.queued,
+                    'sent': c.sent,
+                    'mean_wait_s': c.wait_s / c.sent if c.sent else 0.0,
+                }
+                for name, c in self._classes.items()
+            }
+
+    def get(
+        self,
+        url: str,
+        headers: dict[str, str],
+        params: dict[str, Any],
+        timeout: float | None,
+    ) -> Any:
+        name = _current_class.get() or self._default_class
+        deadline = _current_deadline.get()
+        wait_s = self._wait_for_slot(name, deadline)
+        annotate('traffic_class', name)
+        annotate('queue_wait_s', wait_s)
+        if deadline is not None:
+            timeout = deadline.timeout(timeout)
+        return self._transport.get(url, headers, params, timeout)
+
+    def close(self) -> None:
+        self._transport.close()
+
+    def _wait_for_slot(self, name: str, deadline: Deadline | None = None) -> float:
+        """
+            Queue a request of class `name` and block until it may be sent; return how long it waited. Raises
+            `DeadlineExceeded` (and leaves the queue) if `deadline` expires first.
+        """
+        c = self._classes.get(name)
+        if c is None:
+            raise ValueError(f'Unknown traffic class "{name}".')
+
+        start = time.monotonic()
+        ticket = object()
+        with self._condition:
+            tag = c.last_tag = max(self._virtual_time, c.last_tag) + 1 / c.weight
+            entry = (-c.priority, tag, next(self._arrivals), ticket)
+            heapq.heappush(self._queue, entry)
+            c.queued += 1
+            # The new request may now be at the head of the queue, ahead of the one waiting for the next slot.
+            self._condition.notify_all()
+
+            try:
+                while True:
+                    if self._queue[0][-1] is not ticket:
+                        self._condition.wait(None if deadline is None else deadline.timeout())
+                        continue
+                    now = time.monotonic()
+                    next_slot = self._last_sent + self._interval
+                    if now < next_slot:
+                        self._condition.wait(next_slot - now if deadline is None else deadline.timeout(next_slot - now))
+                        continue
+                    break
+            except DeadlineExceeded:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                c.queued -= 1
+                self._condition.notify_all()
+                raise
+
+            heapq.heappop(self._queue)
+            self._virtual_time = tag
+            self._last_sent = now
+            c.queued -= 1
+            c.sent += 1
+            c.wait_s += now - start
+            self._condition.notify_all()
+        return now - start
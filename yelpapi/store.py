@@ -0,0 +1,291 @@
+"""
+    Copyright (c) 2013, Triad National Security, LLC
+    All rights reserved.
+
+    Redistribution and use in source and binary forms, with or without modification, are permitted provided that the
+    following conditions are met:
+
+    * Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+      disclaimer.
+    * Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+      following disclaimer in the documentation and/or other materials provided with the distribution.
+    * Neither the name of Triad National Security, LLC nor the names of its contributors may be used to endorse or
+      promote products derived from this software without specific prior written permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+    INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+    DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+    SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+    WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import zlib
+from array import array
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any
+
+_MISSING = float('nan')
+
+# Fields of the `location` object that are heavily repeated across businesses and are therefore interned.
+_INTERNED_LOCATION_FIELDS = ('city', 'state', 'country', 'zip_code')
+
+# Preset dictionary for compressing the encoded remainder of each record: the keys and URL prefixes that almost
+# every record repeats. A record is far too short to compress well on its own, but against this dictionary, its
+# boilerplate costs a few bytes. Deflate finds the nearest match, so the most common strings go last.
+# NOTE: changing this makes previously compressed remainders undecodable; they are never persisted, though.
+_ZDICT = (
+    b'"transactions":"is_claimed":"hours":"photos":"special_hours":"attributes":"review_count":"rating":'
+    b'"price":"categories":"coordinates":"latitude":"longitude":"address2":null,"address3":null,"city":'
+    b'"distance":"display_phone":"(","phone":"+1","display_address":["","address3":"","address2":"",'
+    b'"location":{"address1":"?adjust_creative=&utm_campaign=yelp_api_v3&utm_medium=api_v3_business_search'
+    b'&utm_source=","url":"https://www.yelp.com/biz/","is_closed":false,"image_url":'
+    b'"https://s3-media1.fl.yelpcdn.com/bphoto//o.jpg","name":"{"alias":"'
+)
+
+
+def _pop_typed(obj: dict[str, Any], key: str, typ: type) -> Any:
+    """
+        Remove and return `obj[key]` if it has exactly the type `typ`; otherwise, leave it alone and return None.
+    """
+    if type(obj.get(key)) is typ:
+        return obj.pop(key)
+    return None
+
+
+def _compress(data: bytes) -> bytes:
+    compressor = zlib.compressobj(wbits=-15, zdict=_ZDICT)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _decompress(data: bytes) -> bytes:
+    return zlib.decompressobj(wbits=-15, zdict=_ZDICT).decompress(data)
+
+
+class BusinessStore(Mapping[str, dict[str, Any]]):
+    """
+        A compact, in-process store of business records, as returned by the Business API and within the `businesses`
+        list of the Search API. Records are keyed by business ID and behave like a read-only dict of dicts, but are
+        stored column-wise rather than as one dict per business:
+
+            * repeated strings (price, city, state, country, zip code, category aliases and titles, transactions) are
+              interned into a single string table and stored as integer indices
+            * numeric fields (rating, review count, latitude, longitude) are stored in typed arrays
+            * everything else is stored as compact, UTF-8 encoded JSON, compressed against a preset dictionary of
+              the keys and URL prefixes that every record repeats
+
+        Only values of the expected type are moved into columns; anything unexpected (e.g., a null rating) is kept
+        verbatim in the encoded remainder, so every record is returned exactly as it was stored.
+
+        Records are added or replaced with `upsert()` (or `extend()` for many at once) and deleted with `remove()`.
+        Each lookup decodes a fresh dict, so callers are free to modify what they get back; `columns()` reads just the
+        columnar fields without decoding the rest of the record.
+    """
+
+    def __init__(self, businesses: Iterable[dict[str, Any]] = ()) -> None:
+        self._rows: dict[str, int] = {}
+        self._ids: list[str] = []
+        self._strings: list[str | None] = [None]
+        self._string_indices: dict[str, int] = {}
+
+        self._rating = array('d')
+        self._review_count = array('q')
+        self._latitude = array('d')
+        self._longitude = array('d')
+        self._price = array('I')
+        self._location = {field: array('I') for field in _INTERNED_LOCATION_FIELDS}
+        self._categories: list[bytes | None] = []
+        self._transactions: list[bytes | None] = []
+        self._remainder: list[bytes] = []
+
+        self.extend(businesses)
+
+    def __getitem__(self, business_id: str) -> dict[str, Any]:
+        return self._decode(self._rows[business_id], business_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, business_id: object) -> bool:
+        return business_id in self._rows
+
+    def upsert(self, business: dict[str, Any]) -> None:
+        """
+            Add a business record, replacing any existing record with the same ID.
+
+            required parameters:
+                * business - a business record; it must have an `id`
+        """
+        if not business.get('id'):
+            raise ValueError('A valid business ID (key "id") must be present in the record.')
+
+        remainder = dict(business)
+        business_id = remainder.pop('id')
+
+        rating = _pop_typed(remainder, 'rating', float)
+        review_count = _pop_typed(remainder, 'review_count', int)
+        price = _pop_typed(remainder, 'price', str)
+
+        latitude = longitude = None
+        if isinstance(remainder.get('coordinates'), dict):
+            coordinates = dict(remainder['coordinates'])
+            latitude = _pop_typed(coordinates, 'latitude', float)
+            longitude = _pop_typed(coordinates, 'longitude', float)
+            self._replace_nested(remainder, 'coordinates', coordinates, latitude is not None or longitude is not None)
+
+        location_values = dict.fromkeys(_INTERNED_LOCATION_FIELDS)
+        if isinstance(remainder.get('location'), dict):
+            location = dict(remainder['location'])
+            for field in _INTERNED_LOCATION_FIELDS:
+                location_values[field] = _pop_typed(location, field, str)
+            self._replace_nested(remainder, 'location', location, any(v is not None for v in location_values.values()))
+
+        categories = None
+        if self._is_category_list(remainder.get('categories')):
+            categories = self._encode_strings(s for c in remainder.pop('categories') for s in (c['alias'], c['title']))
+
+        transactions = None
+        if isinstance(remainder.get('transactions'), list) and all(type(t) is str for t in remainder['transactions']):
+            transactions = self._encode_strings(remainder.pop('transactions'))
+
+        row = self._rows.get(business_id)
+        if row is None:
+            row = self._rows[business_id] = len(self._rows)
+            self._ids.append(business_id)
+            self._append_empty_row()
+
+        self._rating[row] = _MISSING if rating is None else rating
+        self._review_count[row] = -1 if review_count is None else review_count
+        self._latitude[row] = _MISSING if latitude is None else latitude
+        self._longitude[row] = _MISSING if longitude is None else longitude
+        self._price[row] = self._intern(price)
+        for field, value in location_values.items():
+            self._location[field][row] = self._intern(value)
+        self._categories[row] = categories
+        self._transactions[row] = transactions
+        self._remainder[row] = _compress(json.dumps(remainder, separators=(',', ':'), ensure_ascii=False).encode())
+
+    def extend(self, businesses: Iterable[dict[str, Any]]) -> None:
+        """
+            Upsert every business record in `businesses`.
+        """
+        for business in businesses:
+            self.upsert(business)
+
+    def remove(self, business_id: str) -> None:
+        """
+            Delete a business record. Raises `KeyError` if there is no record with that ID.
+        """
+        row = self._rows.pop(business_id)
+        last = len(self._ids) - 1
+        last_id = self._ids.pop()
+        # Move the last row into the freed one, so that the columns stay dense.
+        for column in self._columns():
+            if row != last:
+                column[row] = column[last]
+            column.pop()
+        if row != last:
+            self._ids[row] = last_id
+            self._rows[last_id] = row
+
+    def columns(self, business_id: str) -> dict[str, Any]:
+        """
+            The `rating`, `review_count`, and `price` of a business (those that it has), read straight from their
+            columns. This is much cheaper than decoding the whole record, e.g., for sorting or filtering many records.
+        """
+        return self._scalars(self._rows[business_id])
+
+    def _columns(self) -> list[Any]:
+        return [self._rating, self._review_count, self._latitude, self._longitude, self._price,
+                *self._location.values(), self._categories, self._transactions, self._remainder]
+
+    def _append_empty_row(self) -> None:
+        for column in (self._rating, self._latitude, self._longitude):
+            column.append(_MISSING)
+        self._review_count.append(-1)
+        self._price.append(0)
+        for column in self._location.values():
+            column.append(0)
+        self._categories.append(None)
+        self._transactions.append(None)
+        self._remainder.append(b'')
+
+    def _decode(self, row: int, business_id: str) -> dict[str, Any]:
+        business = json.loads(_decompress(self._remainder[row]))
+        business['id'] = business_id
+        business.update(self._scalars(row))
+
+        coordinates = {}
+        if not math.isnan(self._latitude[row]):
+            coordinates['latitude'] = self._latitude[row]
+        if not math.isnan(self._longitude[row]):
+            coordinates['longitude'] = self._longitude[row]
+        if coordinates:
+            business['coordinates'] = {**business.get('coordinates', {}), **coordinates}
+
+        location = {field: self._strings[column[row]] for field, column in self._location.items() if column[row]}
+        if location:
+            business['location'] = {**business.get('location', {}), **location}
+
+        if self._categories[row] is not None:
+            strings = self._decode_strings(self._categories[row])
+            business['categories'] = [{'alias': a, 'title': t} for a, t in zip(strings[::2], strings[1::2])]
+        if self._transactions[row] is not None:
+            business['transactions'] = self._decode_strings(self._transactions[row])
+
+        return business
+
+    def _scalars(self, row: int) -> dict[str, Any]:
+        scalars: dict[str, Any] = {}
+        if not math.isnan(self._rating[row]):
+            scalars['rating'] = self._rating[row]
+        if self._review_count[row] >= 0:
+            scalars['review_count'] = self._review_count[row]
+        if self._price[row]:
+            scalars['price'] = self._strings[self._price[row]]
+        return scalars
+
+    def _intern(self, value: str | None) -> int:
+        """
+            Return the index of `value` in the string table, adding it if necessary. None is stored as index 0.
+        """
+        if value is None:
+            return 0
+        index = self._string_indices.get(value)
+        if index is None:
+            index = self._string_indices[value] = len(self._strings)
+            self._strings.append(value)
+        return index
+
+    def _encode_strings(self, values: Iterable[str]) -> bytes:
+        return array('I', [self._intern(v) for v in values]).tobytes()
+
+    def _decode_strings(self, encoded: bytes) -> list[str]:
+        indices = array('I')
+        indices.frombytes(encoded)
+        return [self._strings[i] for i in indices]
+
+    @staticmethod
+    def _is_category_list(categories: Any) -> bool:
+        return isinstance(categories, list) and all(
+            isinstance(c, dict) and c.keys() == {'alias', 'title'}
+            and type(c['alias']) is str and type(c['title']) is str
+            for c in categories
+        )
+
+    @staticmethod
+    def _replace_nested(remainder: dict[str, Any], key: str, nested: dict[str, Any], extracted: bool) -> None:
+        # If any fields were pulled out into columns, the nested object is rebuilt from those columns on decode, so
+        # an emptied object doesn't need to be stored at all.
+        if nested or not extracted:
+            remainder[key] = nested
+        else:
+            del remainder[key]
@@ -0,0 +1,685 @@
+"""
+    Copyright (c) 2013, Triad National Security, LLC
+    All rights reserved.
+
+    Redistribution and use in source and binary forms, with or without modification, are permitted provided that the
+    following conditions are met:
+
+    * Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+      disclaimer.
+    * Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+      following disclaimer in the documentation and/or other materials provided with the distribution.
+    * Neither the name of Triad National Security, LLC nor the names of its contributors may be used to endorse or
+      promote products derived from this software without specific prior written permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+    INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+    DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+    SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+    WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+
+from __future__ import annotations
+
+import base64
+import math
+import random
+import re
+import string
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import Mapping
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+import requests
+
+from .geo import METERS_PER_DEGREE, GeoIndex, distance_m
+from .transport import InMemoryRequest, InMemoryResponse, InMemoryTransport
+from .yelpapi import (
+    AUTOCOMPLETE_API_URL,
+    BUSINESS_API_URL,
+    BUSINESS_ENGAGEMENT_API_URL,
+    BUSINESS_MATCH_API_URL,
+    BUSINESS_SERVICE_OFFERINGS_API_URL,
+    CATEGORIES_API_URL,
+    CATEGORY_API_URL,
+    EVENT_LOOKUP_API_URL,
+    EVENT_SEARCH_API_URL,
+    FEATURED_EVENT_API_URL,
+    PHONE_SEARCH_API_URL,
+    REVIEW_HIGHLIGHTS_API_URL,
+    REVIEWS_API_URL,
+    SEARCH_API_URL,
+    TRANSACTION_SEARCH_API_URL,
+    endpoint_template,
+)
+
+# Faults `FakeYelp` can inject, and what each one looks like to the client.
+FAULTS = ('timeout', 'connection_error', 'internal_error', 'service_unavailable')
+
+SEARCH_RESULT_CAP = 240
+EVENT_RESULT_CAP = 1000
+MAX_RADIUS_M = 40000
+
+# (alias, title, parent aliases)
+_CATEGORIES = (
+    ('restaurants', 'Restaurants', ()),
+    ('food', 'Food', ()),
+    ('nightlife', 'Nightlife', ()),
+    ('active', 'Active Life', ()),
+    ('pizza', 'Pizza', ('restaurants',)),
+    ('italian', 'Italian', ('restaurants',)),
+    ('mexican', 'Mexican', ('restaurants',)),
+    ('chinese', 'Chinese', ('restaurants',)),
+    ('sushi', 'Sushi Bars', ('restaurants',)),
+    ('burgers', 'Burgers', ('restaurants',)),
+    ('cafes', 'Cafes', ('restaurants',)),
+    ('coffee', 'Coffee & Tea', ('food',)),
+    ('bakeries', 'Bakeries', ('food',)),
+    ('bars', 'Bars', ('nightlife',)),
+    ('bikerentals', 'Bike Rentals', ('active',)),
+    ('parks', 'Parks', ('active',)),
+)
+_PARENTS = {alias: parents for alias, _, parents in _CATEGORIES}
+_LEAF_CATEGORIES = [(alias, title) for alias, title, parents in _CATEGORIES if parents]
+_EVENT_CATEGORIES = ('music', 'food-and-drink', 'sports-active-life', 'visual-arts', 'nightlife', 'festivals-fairs')
+_NAME_ADJECTIVES = ('Golden', 'Blue', 'Little', 'Happy', 'Old Town', 'Lucky', 'Red', 'Green', 'Silver', 'Sunny',
+                    'Royal', 'Urban', 'Hidden', 'Wild')
+_NAME_NOUNS = ('Fork', 'Spoon', 'Table', 'Lantern', 'Garden', 'Corner', 'Oak', 'Harbor', 'Bridge', 'Kitchen', 'Bell',
+               'Fox')
+_STREETS = ('Market St', 'Mission St', 'Valencia St', 'Geary Blvd', 'Irving St', 'Castro St', 'Divisadero St',
+            'Polk St', 'Clement St', 'Haight St')
+_TRANSACTIONS = ('delivery', 'pickup', 'restaurant_reservation')
+_SERVICE_OFFERINGS = ('free_estimates', 'virtual_consultations', 'discounts', 'online_booking')
+_REVIEW_WORDS = ('great', 'friendly staff', 'slow service', 'cozy', 'overpriced', 'amazing', 'fresh', 'crowded',
+                 'would come back', 'hidden gem')
+# Fields returned for each business by the search endpoints; the Business API returns every field.
+_SUMMARY_FIELDS = ('id', 'alias', 'name', 'image_url', 'is_closed', 'url', 'review_count', 'categories', 'rating',
+                   'coordinates', 'transactions', 'price', 'location', 'phone', 'display_phone')
+
+
+class _YelpError(Exception):
+    def __init__(self, status_code: int, code: str, description: str) -> None:
+        super().__init__(description)
+        self.status_code = status_code
+        self.code = code
+        self.description = description
+
+
+def _random_id(rng: random.Random) -> str:
+    # 22 characters of URL-safe base64, like Yelp's own IDs.
+    return base64.urlsafe_b64encode(rng.randbytes(18)).decode('ascii')[:22]
+
+
+def _slug(text: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def _int(params: Mapping[str, Any], name: str, default: int, maximum: int | None = None) -> int:
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise _YelpError(400, 'VALIDATION_ERROR', f'\'{value}\' is not of type \'integer\' (parameter "{name}")')
+    if value < 0 or (maximum is not None and value > maximum):
+        raise _YelpError(400, 'VALIDATION_ERROR', f'{value} is not a valid value for parameter "{name}"')
+    return value
+
+
+def _list(params: Mapping[str, Any], name: str) -> list[str]:
+    value = params.get(name)
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(v).strip() for v in value if str(v).strip()]
+
+
+class FakeYelp:
+    """
+        An offline stand-in for the Yelp Fusion API, for testing and load testing crawlers without spending any API
+        calls. It generates a synthetic city of businesses, reviews, and events from `seed` and serves all of the
+        endpoints `YelpAPI` supports, mimicking Yelp's behavior where it matters at scale:
+
+            * searches filter by distance from `latitude`/`longitude` (any `location` resolves to the city center),
+              report the `total` number of matches, and reject `offset + limit` beyond Yelp's result caps (240 for
+              the Search API, 1000 for the Event Search API)
+            * errors are returned with Yelp's status codes and `{"error": {"code": ..., "description": ...}}` bodies
+            * `qps` limits requests per second per API key, answering the excess with 429
+              `TOO_MANY_REQUESTS_PER_SECOND`
+            * `daily_limit` limits requests per UTC day per API key, answering the excess with 429
+              `ACCESS_LIMIT_REACHED`
+
+        Every request is delayed by `latency(rng)` seconds, if given (e.g., `lambda rng: rng.lognormvariate(-3, 0.5)`);
+        requests with a shorter timeout wait out the timeout and raise a `ReadTimeout` instead. `faults` injects
+        failures: it maps each fault in `FAULTS` to the probability of it affecting a request. Injected timeouts and
+        connection errors are raised immediately, as the equivalent `requests` exceptions.
+
+        A FakeYelp is an `InMemoryTransport` handler, so use it through `transport()`:
+
+            fake = FakeYelp(businesses=5000, qps=50)
+            yelp_api = YelpAPI('any key', transport=fake.transport())
+
+        `calls` counts the requests served per endpoint URL template. Responses share the fake's records (in
+        `businesses` and `events`), so they must not be modified.
+    """
+
+    def __init__(
+        self,
+        businesses: int = 1000,
+        events: int = 100,
+        seed: int = 0,
+        center: tuple[float, float] = (37.7749, -122.4194),
+        city_radius_m: float = 10000.0,
+        city: str = 'San Francisco',
+        state: str = 'CA',
+        qps: float | None = None,
+        daily_limit: int | None = None,
+        latency: Callable[[random.Random], float] | None = None,
+        faults: Mapping[str, float] | None = None,
+        api_keys: set[str] | None = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+            Instantiate a FakeYelp object.
+
+            optional parameters:
+                * businesses - number of businesses in the city
+                * events - number of events in the city
+                * seed - seed for generating the city and for all random behavior (latency and faults)
+                * center - latitude and longitude of the city center
+                * city_radius_m - radius, in meters, of the city around its center
+                * city, state - name of the city and its state, used in business addresses
+                * qps - maximum number of requests per second per API key
+                * daily_limit - maximum number of requests per day per API key
+                * latency - function of a `random.Random` returning the latency, in seconds, of a request
+                * faults - probability (0-1) of each kind of fault in `FAULTS`
+                * api_keys - API keys to accept; if not given, any API key is accepted
+                * clock - function returning the current time, in seconds since the epoch
+                * sleep - function used to wait out latencies
+        """
+        unknown = set(faults or ()) - set(FAULTS)
+        if unknown:
+            raise ValueError(f'Unknown faults: {", ".join(sorted(unknown))}.')
+
+        self.center = center
+        self.city = city
+        self.state = state
+        self._city_radius_m = city_radius_m
+        self._seed = seed
+        self._qps = qps
+        self._daily_limit = daily_limit
+        self._latency = latency
+        self._faults = dict(faults or {})
+        self._api_keys = api_keys
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent: dict[str, deque[float]] = {}
+        self._usage: dict[str, tuple[int, int]] = {}
+        self.calls: Counter[str] = Counter()
+
+        self.businesses: dict[str, dict[str, Any]] = {}
+        self._aliases: dict[str, str] = {}
+        self._index = GeoIndex(max_age_s=0)
+        for _ in range(businesses):
+            self._add_business(self._generate_business())
+        self.events: dict[str, dict[str, Any]] = {}
+        for _ in range(events):
+            event = self._generate_event()
+            self.events[event['id']] = event
+
+        self._endpoints: dict[str, Callable[[str, Mapping[str, Any]], Any]] = {
+            AUTOCOMPLETE_API_URL: self._autocomplete,
+            BUSINESS_API_URL: self._business,
+            BUSINESS_ENGAGEMENT_API_URL: self._business_engagement,
+            BUSINESS_MATCH_API_URL: self._business_match,
+            BUSINESS_SERVICE_OFFERINGS_API_URL: self._business_service_offerings,
+            CATEGORIES_API_URL: self._categories,
+            CATEGORY_API_URL: self._category,
+            EVENT_LOOKUP_API_URL: self._event_lookup,
+            EVENT_SEARCH_API_URL: self._event_search,
+            FEATURED_EVENT_API_URL: self._featured_event,
+            PHONE_SEARCH_API_URL: self._phone_search,
+            REVIEW_HIGHLIGHTS_API_URL: self._review_highlights,
+            REVIEWS_API_URL: self._reviews,
+            SEARCH_API_URL: self._search,
+            TRANSACTION_SEARCH_API_URL: self._transaction_search,
+        }
+
+    def transport(self) -> InMemoryTransport:
+        """
+            A transport serving every request from this fake.
+        """
+        return InMemoryTransport(self)
+
+    def __call__(self, request: InMemoryRequest) -> InMemoryResponse:
+        template = endpoint_template(request.url)
+        try:
+            key = self._authenticate(request.headers)
+            with self._lock:
+                self._admit(key)
+                self.calls[template] += 1
+                delay = self._latency(self._rng) if self._latency is not None else 0.0
+                fault = next((f for f, p in self._faults.items() if self._rng.random() < p), None)
+
+            if request.timeout is not None and delay > request.timeout:
+                self._sleep(request.timeout)
+                raise requests.exceptions.ReadTimeout(f'Read timed out. (read timeout={request.timeout})')
+            if delay > 0:
+                self._sleep(delay)
+            if fault == 'timeout':
+                raise requests.exceptions.ReadTimeout(f'Read timed out (injected) for url: {request.url}')
+            if fault == 'connection_error':
+                raise requests.exceptions.ConnectionError(f'Connection reset (injected) for url: {request.url}')
+            if fault == 'internal_error':
+                raise _YelpError(500, 'INTERNAL_ERROR', 'Something went wrong internally, please try again later.')
+            if fault == 'service_unavailable':
+                raise _YelpError(503, 'SERVICE_UNAVAILABLE', 'The service is temporarily unavailable.')
+
+            endpoint = self._endpoints.get(template)
+            if endpoint is None:
+                raise _YelpError(404, 'NOT_FOUND', 'Resource could not be found.')
+            value = ''
+            if '{}' in template:
+                prefix, suffix = template.split('{}')
+                value = request.url[len(prefix):len(request.url) - len(suffix)]
+            body = endpoint(value, request.params)
+        except _YelpError as e:
+            return InMemoryResponse({'error': {'code': e.code, 'description': e.description}}, e.status_code,
+                                    request.url)
+        return InMemoryResponse(body, 200, request.url)
+
+    def _authenticate(self, headers: Mapping[str, str]) -> str:
+        authorization = headers.get('Authorization', '')
+        if not authorization.startswith('Bearer ') or not authorization[len('Bearer '):]:
+            raise _YelpError(400, 'TOKEN_MISSING', 'An access token must be supplied in order to use this endpoint.')
+        key = authorization[len('Bearer '):]
+        if self._api_keys is not None and key not in self._api_keys:
+            raise _YelpError(401, 'TOKEN_INVALID', 'Invalid access token or authorization header.')
+        return key
+
+    def _admit(self, key: str) -> None:
+        now = self._clock()
+        if self._daily_limit is not None:
+            day = int(now // 86400)
+            usage_day, used = self._usage.get(key, (day, 0))
+            used = used if usage_day == day else 0
+            if used >= self._daily_limit:
+                raise _YelpError(429, 'ACCESS_LIMIT_REACHED',
+                                 'You\'ve reached the access limit for this client. Please contact api@yelp.com.')
+            self._usage[key] = (day, used + 1)
+
+        if self._qps is not None:
+            recent = self._recent.setdefault(key, deque())
+            while recent and recent[0] <= now - 1:
+                recent.popleft()
+            if len(recent) >= self._qps:
+                raise _YelpError(429, 'TOO_MANY_REQUESTS_PER_SECOND',
+                                 'You have exceeded the queries-per-second limit for this endpoint. Try reducing the '
+                                 'rate at which you make queries.')
+            recent.append(now)
+
+    # Generating the city
+
+    def _random_point(self, rng: random.Random) -> tuple[float, float]:
+        distance = self._city_radius_m * math.sqrt(rng.random())
+        bearing = rng.uniform(0, 2 * math.pi)
+        latitude = self.center[0] + distance * math.cos(bearing) / METERS_PER_DEGREE
+        longitude = self.center[1] + \
+            distance * math.sin(bearing) / METERS_PER_DEGREE / math.cos(math.radians(self.center[0]))
+        return round(latitude, 6), round(longitude, 6)
+
+    def _address(self, rng: random.Random) -> dict[str, Any]:
+        address1 = f'{rng.randint(1, 4000)} {rng.choice(_STREETS)}'
+        zip_code = str(rng.randint(94102, 94134))
+        return {
+            'address1': address1,
+            'address2': '',
+            'address3': '',
+            'city': self.city,
+            'zip_code': zip_code,
+            'country': 'US',
+            'state': self.state,
+            'display_address': [address1, f'{self.city}, {self.state} {zip_code}'],
+        }
+
+    def _generate_business(self) -> dict[str, Any]:
+        rng = self._rng
+        categories = rng.sample(_LEAF_CATEGORIES, rng.choice((1, 1, 2)))
+        name = f'{rng.choice(_NAME_ADJECTIVES)} {rng.choice(_NAME_NOUNS)} {categories[0][1]}'
+        alias = base = f'{_slug(name)}-{_slug(self.city)}'
+        suffix = 1
+        while alias in self._aliases:
+            suffix += 1
+            alias = f'{base}-{suffix}'
+        latitude, longitude = self._random_point(rng)
+        phone = f'+1415555{rng.randint(0, 9999):04d}'
+        business_id = _random_id(rng)
+        return {
+            'id': business_id,
+            'alias': alias,
+            'name': name,
+            'image_url': f'https://s3-media1.fl.yelpcdn.com/bphoto/{business_id}/o.jpg',
+            'is_claimed': rng.random() < 0.7,
+            'is_closed': rng.random() < 0.03,
+            'url': f'https://www.yelp.com/biz/{alias}',
+            'phone': phone,
+            'display_phone': f'(415) 555-{phone[-4:]}',
+            'review_count': min(int(rng.paretovariate(1.2) * 5), 5000),
+            'categories': [{'alias': category, 'title': title} for category, title in categories],
+            'rating': round(rng.uniform(1, 5) * 2) / 2,
+            'location': self._address(rng),
+            'coordinates': {'latitude': latitude, 'longitude': longitude},
+            'photos': [f'https://s3-media1.fl.yelpcdn.com/bphoto/{_random_id(rng)}/o.jpg' for _ in range(3)],
+            'price': rng.choice(('$', '$', '$$', '$$', '$$$', '$$$$')),
+            'hours': [{
+                'open': [{'is_overnight': False, 'start': '0900', 'end': '2100', 'day': day} for day in range(7)],
+                'hours_type': 'REGULAR',
+                'is_open_now': True,
+            }],
+            'transactions': sorted(rng.sample(_TRANSACTIONS, rng.randint(0, len(_TRANSACTIONS)))),
+            'special_hours': [],
+            'attributes': {'outdoor_seating': rng.random() < 0.3, 'wheelchair_accessible': rng.random() < 0.6},
+        }
+
+    def _add_business(self, business: dict[str, Any]) -> None:
+        self.businesses[business['id']] = business
+        self._aliases[business['alias']] = business['id']
+        # The index only needs to find IDs (see `_nearby`), so it is given just the location and category aliases.
+        categories = [category['alias'] for category in business['categories']]
+        categories += [parent for category in categories for parent in _PARENTS[category]]
+        self._index.add({'id': business['id'], 'coordinates': business['coordinates']}, categories)
+
+    def _generate_event(self) -> dict[str, Any]:
+        rng = self._rng
+        category = rng.choice(_EVENT_CATEGORIES)
+        latitude, longitude = self._random_point(rng)
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(hours=rng.randint(0, 24 * 365))
+        cost = rng.choice((None, None, 10.0, 25.0, 60.0))
+        business_id = rng.choice(list(self.businesses)) if self.businesses and rng.random() < 0.5 else None
+        event_id = f'{_slug(self.city)}-{category}-{_random_id(rng)[:10].lower()}'
+        return {
+            'id': event_id,
+            'name': f'{rng.choice(_NAME_ADJECTIVES)} {category.replace("-", " ").title()} Night',
+            'category': category,
+            'description': f'A {category.replace("-", " ")} event in {self.city}.',
+            'cost': cost,
+            'cost_max': None if cost is None else cost * 2,
+            'is_free': cost is None,
+            'is_canceled': rng.random() < 0.02,
+            'is_official': rng.random() < 0.1,
+            'attending_count': rng.randint(0, 500),
+            'interested_count': rng.randint(0, 2000),
+            'time_start': start.isoformat(),
+            'time_end': (start + timedelta(hours=rng.randint(1, 6))).isoformat(),
+            'latitude': latitude,
+            'longitude': longitude,
+            'location': self._address(rng),
+            'business_id': business_id,
+            'event_site_url': f'https://www.yelp.com/events/{event_id}',
+            'image_url': f'https://s3-media1.fl.yelpcdn.com/ephoto/{event_id}/o.jpg',
+            'tickets_url': None if cost is None else f'https://tickets.example.com/{event_id}',
+        }
+
+    # Endpoints
+
+    def _location(self, params: Mapping[str, Any], required: bool = True) -> tuple[float, float] | None:
+        latitude, longitude = params.get('latitude'), params.get('longitude')
+        if latitude is not None and longitude is not None:
+            try:
+                return float(latitude), float(longitude)
+            except (TypeError, ValueError):
+                raise _YelpError(400, 'VALIDATION_ERROR', 'Invalid latitude or longitude.')
+        if params.get('location'):
+            return self.center
+        if required:
+            raise _YelpError(400, 'VALIDATION_ERROR', 'Please specify a location or a latitude and longitude')
+        return None
+
+    def _get_business(self, business_id: str) -> dict[str, Any]:
+        business = self.businesses.get(self._aliases.get(business_id, business_id))
+        if business is None:
+            raise _YelpError(404, 'BUSINESS_NOT_FOUND', 'The requested business could not be found.')
+        return business
+
+    def _summary(self, business: dict[str, Any], distance: float | None = None) -> dict[str, Any]:
+        summary = {k: business[k] for k in _SUMMARY_FIELDS}
+        if distance is not None:
+            summary['distance'] = distance
+        return summary
+
+    def _nearby(
+        self,
+        params: Mapping[str, Any],
+        latitude: float,
+        longitude: float,
+    ) -> list[tuple[float, str]]:
+        # Only IDs are looked up here, so that searches only touch the records that they filter, sort, or return.
+        radius = _int(params, 'radius', MAX_RADIUS_M, MAX_RADIUS_M)
+        categories = _list(params, 'categories') or None
+        return self._index.ids_within_radius(latitude, longitude, radius, categories)
+
+    def _page(
+        self,
+        params: Mapping[str, Any],
+        default_limit: int,
+        max_limit: int,
+        cap: int | None = None,
+    ) -> tuple[int, int]:
+        limit = _int(params, 'limit', default_limit, max_limit)
+        offset = _int(params, 'offset', 0)
+        if cap is not None and offset + limit > cap:
+            raise _YelpError(400, 'VALIDATION_ERROR', f'Too many results requested, limit+offset must be <= {cap}.')
+        return offset, limit
+
+    def _search(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        offset, limit = self._page(params, 20, 50, SEARCH_RESULT_CAP)
+        latitude, longitude = self._location(params)
+        matches = self._nearby(params, latitude, longitude)
+        businesses = self.businesses
+
+        term = str(params.get('term') or '').lower()
+        if term:
+            matches = [(d, i) for d, i in matches if term in businesses[i]['name'].lower() or
+                       any(term in c['title'].lower() or term == c['alias'] for c in businesses[i]['categories'])]
+        prices = {int(p) for p in _list(params, 'price')}
+        if prices:
+            matches = [(d, i) for d, i in matches if len(businesses[i]['price']) in prices]
+        if params.get('open_now') in (True, 'true'):
+            matches = [(d, i) for d, i in matches if not businesses[i]['is_closed']]
+
+        sort_by = params.get('sort_by') or 'best_match'
+        if sort_by == 'rating':
+            matches.sort(key=lambda m: (-businesses[m[1]]['rating'], -businesses[m[1]]['review_count']))
+        elif sort_by == 'review_count':
+            matches.sort(key=lambda m: -businesses[m[1]]['review_count'])
+        elif sort_by not in ('best_match', 'distance'):
+            raise _YelpError(400, 'VALIDATION_ERROR', f'\'{sort_by}\' is not one of [\'best_match\', \'rating\', '
+                                                      f'\'review_count\', \'distance\'] (parameter "sort_by")')
+
+        return {
+            'businesses': [self._summary(businesses[i], d) for d, i in matches[offset:offset + limit]],
+            'total': len(matches),
+            'region': {'center': {'latitude': latitude, 'longitude': longitude}},
+        }
+
+    def _transaction_search(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        if value != 'delivery':
+            raise _YelpError(400, 'VALIDATION_ERROR', f'Unsupported transaction type: {value}')
+        businesses = [self._summary(self.businesses[i], d) for d, i in self._nearby(params, *self._location(params))
+                      if value in self.businesses[i]['transactions']]
+        return {'businesses': businesses, 'total': len(businesses)}
+
+    def _phone_search(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        phone = str(params.get('phone') or '')
+        if not phone.startswith('+'):
+            raise _YelpError(400, 'VALIDATION_ERROR', 'Phone numbers must start with "+" and the country code.')
+        businesses = [self._summary(b) for b in self.businesses.values() if b['phone'] == phone]
+        return {'businesses': businesses, 'total': len(businesses)}
+
+    def _business(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        return self._get_business(value)
+
+    def _business_match(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        for name in ('name', 'address1', 'city', 'state', 'country'):
+            if not params.get(name):
+                raise _YelpError(400, 'VALIDATION_ERROR', f'Missing required parameter "{name}"')
+        name, city = str(params['name']).lower(), str(params['city']).lower()
+        address1 = str(params['address1']).lower()
+        matches = [b for b in self.businesses.values()
+                   if b['name'].lower() == name and b['location']['city'].lower() == city and
+                   b['location']['address1'].lower() == address1]
+        limit = _int(params, 'limit', 3, 10)
+        return {'businesses': [{k: b[k] for k in ('id', 'alias', 'name', 'location', 'coordinates', 'phone')}
+                               for b in matches[:limit]]}
+
+    def _business_engagement(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        business_ids = _list(params, 'business_ids')
+        if not business_ids or len(business_ids) > 20:
+            raise _YelpError(400, 'VALIDATION_ERROR', 'Between 1 and 20 business IDs (parameter "business_ids") '
+                                                      'must be provided.')
+        businesses, errors = [], []
+        for business_id in business_ids:
+            business = self.businesses.get(self._aliases.get(business_id, business_id))
+            if business is None:
+                errors.append({'business_id': business_id, 'code': 'BUSINESS_NOT_FOUND'})
+                continue
+            rng = random.Random(f'{self._seed}:engagement:{business["id"]}')
+            businesses.append({
+                'business_id': business['id'],
+                'metrics': {
+                    'page_views': rng.randint(0, 10000),
+                    'calls': rng.randint(0, 500),
+                    'directions': rng.randint(0, 1000),
+                    'website_clicks': rng.randint(0, 1000),
+                },
+            })
+        return {'businesses': businesses, 'errors': errors}
+
+    def _business_service_offerings(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        business = self._get_business(value)
+        rng = random.Random(f'{self._seed}:offerings:{business["id"]}')
+        active = sorted(rng.sample(_SERVICE_OFFERINGS, rng.randint(0, 2)))
+        return {'active': active, 'eligible': [o for o in _SERVICE_OFFERINGS if o not in active]}
+
+    def _reviews(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        business = self._get_business(value)
+        offset, limit = self._page(params, 20, 50)
+        total = business['review_count']
+        return {
+            'reviews': [self._review(business, i) for i in range(offset, min(offset + limit, total))],
+            'total': total,
+            'possible_languages': ['en'],
+        }
+
+    def _review(self, business: dict[str, Any], i: int) -> dict[str, Any]:
+        rng = random.Random(f'{self._seed}:review:{business["id"]}:{i}')
+        review_id, user_id = _random_id(rng), _random_id(rng)
+        created = datetime(2026, 1, 1, tzinfo=timezone.utc) - timedelta(minutes=rng.randint(0, 5 * 365 * 24 * 60))
+        return {
+            'id': review_id,
+            'url': f'{business["url"]}?hrid={review_id}',
+            'text': f'{", ".join(rng.sample(_REVIEW_WORDS, 3)).capitalize()}.',
+            'rating': max(min(round(business['rating'] + rng.uniform(-1.5, 1.5)), 5), 1),
+            'time_created': created.strftime('%Y-%m-%d %H:%M:%S'),
+            'user': {
+                'id': user_id,
+                'profile_url': f'https://www.yelp.com/user_details?userid={user_id}',
+                'image_url': None,
+                'name': f'{rng.choice(string.ascii_uppercase)}{rng.choice(string.ascii_lowercase) * 2}. '
+                        f'{rng.choice(string.ascii_uppercase)}.',
+            },
+        }
+
+    def _review_highlights(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        business = self._get_business(value)
+        rng = random.Random(f'{self._seed}:highlights:{business["id"]}')
+        return {'review_highlights': [
+            {
+                'id': _random_id(rng),
+                'sentence': f'Reviewers keep saying it: [[{word}]].',
+                'review_count': rng.randint(1, max(business['review_count'], 1)),
+                'photo_url': business['image_url'],
+            }
+            for word in rng.sample(_REVIEW_WORDS, 3)
+        ]}
+
+    def _categories(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        return {'categories': [self._category_record(alias, title, parents) for alias, title, parents in _CATEGORIES]}
+
+    def _category(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        for alias, title, parents in _CATEGORIES:
+            if alias == value:
+                return {'category': self._category_record(alias, title, parents)}
+        raise _YelpError(404, 'CATEGORY_NOT_FOUND', 'The requested category could not be found.')
+
+    @staticmethod
+    def _category_record(alias: str, title: str, parents: tuple[str, ...]) -> dict[str, Any]:
+        return {
+            'alias': alias,
+            'title': title,
+            'parent_aliases': list(parents),
+            'country_whitelist': [],
+            'country_blacklist': [],
+        }
+
+    def _autocomplete(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        text = str(params.get('text') or '').lower()
+        if not text:
+            raise _YelpError(400, 'VALIDATION_ERROR', 'Missing required parameter "text"')
+        categories = [{'alias': alias, 'title': title} for alias, title, _ in _CATEGORIES
+                      if title.lower().startswith(text) or alias.startswith(text)]
+        businesses = [{'id': b['id'], 'name': b['name']} for b in self.businesses.values()
+                      if b['name'].lower().startswith(text)][:3]
+        return {
+            'terms': [{'text': c['title']} for c in categories][:3],
+            'businesses': businesses,
+            'categories': categories[:3],
+        }
+
+    def _event_lookup(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        event = self.events.get(value)
+        if event is None:
+            raise _YelpError(404, 'EVENT_NOT_FOUND', 'The requested event could not be found.')
+        return event
+
+    def _events_near(self, params: Mapping[str, Any], required: bool) -> list[tuple[float, dict[str, Any]]]:
+        location = self._location(params, required)
+        radius = _int(params, 'radius', MAX_RADIUS_M, MAX_RADIUS_M)
+        if location is None:
+            return [(0.0, event) for event in self.events.values()]
+        events = ((distance_m(*location, e['latitude'], e['longitude']), e) for e in self.events.values())
+        return [(distance, event) for distance, event in events if distance <= radius]
+
+    def _event_search(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        offset, limit = self._page(params, 3, 50, EVENT_RESULT_CAP)
+        categories = set(_list(params, 'categories'))
+        events = [e for _, e in self._events_near(params, required=False)
+                  if not categories or e['category'] in categories]
+        if params.get('is_free') is not None:
+            is_free = params['is_free'] in (True, 'true')
+            events = [e for e in events if e['is_free'] == is_free]
+
+        sort_on = params.get('sort_on') or 'time_start'
+        if sort_on == 'popularity':
+            events.sort(key=lambda e: -e['attending_count'])
+        else:
+            events.sort(key=lambda e: e['time_start'], reverse=params.get('sort_by') == 'desc')
+        return {'events': events[offset:offset + limit], 'total': len(events)}
+
+    def _featured_event(self, value: str, params: Mapping[str, Any]) -> dict[str, Any]:
+        events = self._events_near(params, required=True)
+        if not events:
+            raise _YelpError(404, 'EVENT_NOT_FOUND', 'No featured event could be found near this location.')
+        return max(events, key=lambda m: m[1]['interested_count'])[1]
+
@@ -0,0 +1,131 @@
+"""
+    Copyright (c) 2013, Triad National Security, LLC
+    All rights reserved.
+
+    Redistribution and use in source and binary forms, with or without modification, are permitted provided that the
+    following conditions are met:
+
+    * Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+      disclaimer.
+    * Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+      following disclaimer in the documentation and/or other materials provided with the distribution.
+    * Neither the name of Triad National Security, LLC nor the names of its contributors may be used to endorse or
+      promote products derived from this software without specific prior written permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+    INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+    DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+    SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+    WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+_current_span: ContextVar[TraceSpan | None] = ContextVar('yelpapi_current_span', default=None)
+
+
+@dataclass
+class TraceSpan:
+    """
+        A record of a single API call, passed to the hooks registered in `YelpAPI.hooks`. Request hooks receive the
+        span just before the call is sent; response hooks receive it once the call has finished (successfully or
+        not).
+
+        `phases` holds the time, in seconds, spent in each phase of the call:
+
+            * request_hooks - running the request hooks
+            * transport - issuing the request and receiving the response
+            * server - the part of `transport` spent waiting for the response headers, when the transport reports it
+              (`requests` does, via `Response.elapsed`)
+            * decode - parsing the JSON response
+
+        `attributes` holds anything else worth recording about the call, such as retry or cache decisions made along
+        the way (see `annotate()`). Attribute values should be strings, numbers, or booleans so they can be exported
+        as OpenTelemetry attributes.
+    """
+    endpoint: str
+    url: str
+    param_count: int
+    start_time_ns: int = field(default_factory=time.time_ns)
+    end_time_ns: int | None = None
+    phases: dict[str, float] = field(default_factory=dict)
+    status_code: int | None = None
+    response_bytes: int | None = None
+    error: BaseException | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    _last_mark: float = field(default_factory=time.perf_counter, repr=False, compare=False)
+
+    name = 'yelpapi.query'
+
+    def mark(self, phase: str) -> None:
+        """
+            Record the time since the previous mark (or the start of the span) as the duration of `phase`.
+        """
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last_mark
+        self._last_mark = now
+
+    def record_response(self, response: Any) -> None:
+        self.status_code = response.status_code
+        self.response_bytes = len(response.content)
+        elapsed = getattr(response, 'elapsed', None)
+        if elapsed is not None:
+            self.phases['server'] = elapsed.total_seconds()
+
+    def finish(self) -> None:
+        self.end_time_ns = time.time_ns()
+
+    def otel_attributes(self) -> dict[str, Any]:
+        """
+            The span's data as OpenTelemetry attributes, following the HTTP semantic conventions where they apply.
+        """
+        attributes = {
+            'http.request.method': 'GET',
+            'url.full': self.url,
+            'url.template': self.endpoint,
+            'yelpapi.param_count': self.param_count,
+        }
+        if self.status_code is not None:
+            attributes['http.response.status_code'] = self.status_code
+        if self.response_bytes is not None:
+            attributes['http.response.body.size'] = self.response_bytes
+        if self.error is not None:
+            attributes['error.type'] = type(self.error).__qualname__
+        attributes.update({f'yelpapi.phase.{phase}_s': duration for phase, duration in self.phases.items()})
+        attributes.update({f'yelpapi.{key}': value for key, value in self.attributes.items()})
+        return attributes
+
+
+def annotate(key: str, value: Any) -> None:
+    """
+        Add an attribute to the span of the API call currently in progress in this context. This does nothing when
+        no span is being recorded (i.e., when no hooks are registered).
+    """
+    span = _current_span.get()
+    if span is not None:
+        span.attributes[key] = value
+
+
+def opentelemetry_hook(tracer: Any) -> Callable[[TraceSpan], None]:
+    """
+        Create a response hook that exports every span through an OpenTelemetry tracer, e.g.:
+
+            yelp_api.hooks['response'].append(opentelemetry_hook(trace.get_tracer('yelpapi')))
+
+        OpenTelemetry itself is not a dependency of yelpapi; any object with OpenTelemetry's `Tracer.start_span()`
+        interface will do.
+    """
+    def hook(span: TraceSpan) -> None:
+        otel_span = tracer.start_span(span.name, start_time=span.start_time_ns, attributes=span.otel_attributes())
+        if span.error is not None:
+            otel_span.record_exception(span.error)
+        otel_span.end(end_time=span.end_time_ns)
+
+    return hook
@@ -0,0 +1,251 @@
+"""
+    Copyright (c) 2013, Triad National Security, LLC
+    All rights reserved.
+
+    Redistribution and use in source and binary forms, with or without modification, are permitted provided that the
+    following conditions are met:
+
+    * Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+      disclaimer.
+    * Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+      following disclaimer in the documentation and/or other materials provided with the distribution.
+    * Neither the name of Triad National Security, LLC nor the names of its contributors may be used to endorse or
+      promote products derived from this software without specific prior written permission.
+
+    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+    INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+    DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+    SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+    WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import annotations
+
+import abc
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import requests
+
+
+class Transport(abc.ABC):
+    """
+        The interface `YelpAPI` uses to issue HTTP GET requests. A transport only has to implement `get()`, which
+        must return a response object offering `status_code`, `content`, `raise_for_status()`, and `json()` (as
+        `requests.Response` does), and optionally `close()`. Errors, including those raised by `raise_for_status()`,
+        must be `requests` exceptions (e.g., `requests.exceptions.Timeout`), which is what callers and the transport
+        wrappers handle.
+    """
+
+    @abc.abstractmethod
+    def get(
+        self,
+        url: str,
+        headers: dict[str, str],
+        params: dict[str, Any],
+        timeout: float | None,
+    ) -> Any:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+        The default transport, which issues all requests through a single `requests.Session`.
+    """
+
+    def __init__(self, session: requests.Session | None = None) -> None:
+        """
+            optional parameters:
+                * session - the `requests.Session` to use; a new one is created if this is not given
+        """
+        self._session = requests.Session() if session is None else session
+
+    def get(
+        self,
+        url: str,
+        headers: dict[str, str],
+        params: dict[str, Any],
+        timeout: float | None,
+    ) -> requests.Response:
+        return self._session.get(url, headers=headers, params=params, timeout=timeout)
+
+    def close(self) -> None:
+        self._session.close()
+
+
+class HTTPXTransport(Transport):
+    """
+        A transport built on `httpx.Client`, which can multiplex concurrent requests over a single HTTP/2 connection.
+        This requires the optional `httpx` dependency (`pip install yelpapi[http2]`).
+
+        Responses and errors are translated to their `requests` equivalents, just as `RequestsTransport` would raise
+        them: e.g., `raise_for_status()` raises `requests.exceptions.HTTPError`, and an `httpx.TimeoutException` is
+        raised as a `requests.exceptions.Timeout`. The original `httpx` exception is chained as the `__cause__`.
+    """
+
+    def __init__(self, http2: bool = True, client: Any = None, **client_kwargs: Any) -> None:
+        """
+            optional parameters:
+                * http2 - whether to negotiate HTTP/2
+                * client - the `httpx.Client` to use; if given, `http2` and `client_kwargs` are ignored
+                * client_kwargs - any other arguments to pass to `httpx.Client`
+        """
+        if client is None:
+            try:
+                import httpx
+            except ImportError as e:
+                raise ImportError('HTTPXTransport requires httpx; install it with `pip install yelpapi[http2]`.') from e
+            client = httpx.Client(http2=http2, **client_kwargs)
+        self._client = client
+
+    def get(
+        self,
+        url: str,
+        headers: dict[str, str],
+        params: dict[str, Any],
+        timeout: float | None,
+    ) -> HTTPXResponse:
+        try:
+            response = self._client.get(url, headers=headers, params=params, timeout=timeout)
+        except Exception as e:
+            error = _requests_error(e)
+            if error is None:
+                raise
+            raise error from e
+        return HTTPXResponse(response)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+# `httpx` exceptions, most specific first, and the `requests` exceptions they are raised as.
+_HTTPX_ERRORS = (
+    ('ConnectTimeout', requests.exceptions.ConnectTimeout),
+    ('ReadTimeout', requests.exceptions.ReadTimeout),
+    ('TimeoutException', requests.exceptions.Timeout),
+    ('TooManyRedirects', requests.exceptions.TooManyRedirects),
+    ('TransportError', requests.exceptions.ConnectionError),
+    ('RequestError', requests.exceptions.RequestException),
+)
+
+
+def _requests_error(error: Exception) -> requests.exceptions.RequestException | None:
+    """
+        The `requests` equivalent of an `httpx` exception, or None if `error` isn't one.
+    """
+    try:
+        import httpx
+    except ImportError:
+        return None
+    for name, requests_error in _HTTPX_ERRORS:
+        if isinstance(error, getattr(httpx, name)):
+            return requests_error(str(error))
+    return None
+
+
+class HTTPXResponse:
+    """
+        An `httpx.Response` (available as `httpx_response`) behaving like a `requests.Response`: `raise_for_status()`
+        raises `requests.exceptions.HTTPError`. Every other attribute is that of the `httpx.Response`.
+    """
+
+    def __init__(self, httpx_response: Any) -> None:
+        self.httpx_response = httpx_response
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.httpx_response, name)
+
+    def raise_for_status(self) -> None:
+        status_code = self.httpx_response.status_code
+        if 400 <= status_code < 600:
+            kind = 'Client' if status_code < 500 else 'Server'
+            raise requests.exceptions.HTTPError(
+                f'{status_code} {kind} Error: {self.httpx_response.reason_phrase} for url: {self.httpx_response.url}',
+                response=self,
+            )
+
+
+@dataclass
+class InMemoryRequest:
+    """
+        A request as seen by an `InMemoryTransport` handler.
+    """
+    url: str
+    params: dict[str, Any]
+    headers: dict[str, str]
+    timeout: float | None
+
+
+class InMemoryResponse:
+    """
+        A response served by `InMemoryTransport`. The body is handed back from `json()` as-is, without ever being
+        serialized, so callers share (and must not modify) the object that was registered.
+    """
+
+    __slots__ = ('status_code', 'url', '_body')
+
+    def __init__(self, body: Any = None, status_code: int = 200, url: str = '') -> None:
+        self.status_code = status_code
+        self.url = url
+        self._body = body
+
+    @property
+    def content(self) -> bytes:
+        return json.dumps(self._body).encode('utf-8')
+
+    def json(self) -> Any:
+        return self._body
+
+    def raise_for_status(self) -> None:
+        if 400 <= self.status_code < 600:
+            raise requests.exceptions.HTTPError(f'{self.status_code} Error for url: {self.url}', response=self)
+
+
+class InMemoryTransport(Transport):
+    """
+        A transport that never touches the network. Responses are looked up by exact URL among those registered with
+        `add()`; any other URL is passed to `handler` (if given), which receives an `InMemoryRequest` and returns an
+        `InMemoryResponse` or a JSON body. Requesting an unknown URL without a handler raises
+        `requests.exceptions.ConnectionError`.
+    """
+
+    def __init__(self, handler: Callable[[InMemoryRequest], Any] | None = None) -> None:
+        self._handler = handler
+        self._routes: dict[str, InMemoryResponse] = {}
+        self._lock = threading.Lock()
+        self.request_count = 0
+
+    def add(self, url: str, json: Any = None, status_code: int = 200) -> None:
+        """
+            Serve `json` with the given status code for every request to `url`, regardless of parameters.
+        """
+        self._routes[url] = InMemoryResponse(json, status_code, url)
+
+    def get(
+        self,
+        url: str,
+        headers: dict[str, str],
+        params: dict[str, Any],
+        timeout: float | None,
+    ) -> InMemoryResponse:
+        with self._lock:
+            self.request_count += 1
+
+        response = self._routes.get(url)
+        if response is not None:
+            return response
+
+        if self._handler is None:
+            raise requests.exceptions.ConnectionError(f'No in-memory response registered for {url}')
+
+        response = self._handler(InMemoryRequest(url, params, headers, timeout))
+        if not isinstance(response, InMemoryResponse):
+            response = InMemoryResponse(response, url=url)
+        return response
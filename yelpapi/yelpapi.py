@@ -23,10 +23,13 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterable
 from types import TracebackType
-from typing import Any
+from typing import Any, Callable
 
-import requests
+from .deadline import Deadline, _current_deadline
+from .tracing import TraceSpan, _current_span
+from .transport import RequestsTransport, Transport
 
 AUTOCOMPLETE_API_URL = 'https://api.yelp.com/v3/autocomplete'
 BUSINESS_API_URL = 'https://api.yelp.com/v3/businesses/{}'
@@ -44,6 +47,86 @@ REVIEWS_API_URL = 'https://api.yelp.com/v3/businesses/{}/reviews'
 SEARCH_API_URL = 'https://api.yelp.com/v3/businesses/search'
 TRANSACTION_SEARCH_API_URL = 'https://api.yelp.com/v3/transactions/{}/search'
 
+_API_URLS = (
+    AUTOCOMPLETE_API_URL,
+    BUSINESS_API_URL,
+    BUSINESS_ENGAGEMENT_API_URL,
+    BUSINESS_MATCH_API_URL,
+    BUSINESS_SERVICE_OFFERINGS_API_URL,
+    CATEGORIES_API_URL,
+    CATEGORY_API_URL,
+    EVENT_LOOKUP_API_URL,
+    EVENT_SEARCH_API_URL,
+    FEATURED_EVENT_API_URL,
+    PHONE_SEARCH_API_URL,
+    REVIEW_HIGHLIGHTS_API_URL,
+    REVIEWS_API_URL,
+    SEARCH_API_URL,
+    TRANSACTION_SEARCH_API_URL,
+)
+_FIXED_API_URLS = frozenset(url for url in _API_URLS if '{}' not in url)
+_TEMPLATED_API_URLS = tuple((*url.split('{}'), url) for url in _API_URLS if '{}' in url)
+
+# Keys under which each endpoint returns its records (a list of records, or a single one). Endpoints not listed here
+# return a single record as the whole response.
+_RECORD_KEYS = {
+    AUTOCOMPLETE_API_URL: ('businesses',),
+    BUSINESS_ENGAGEMENT_API_URL: ('businesses',),
+    BUSINESS_MATCH_API_URL: ('businesses',),
+    CATEGORIES_API_URL: ('categories',),
+    CATEGORY_API_URL: ('category',),
+    EVENT_SEARCH_API_URL: ('events',),
+    PHONE_SEARCH_API_URL: ('businesses',),
+    REVIEW_HIGHLIGHTS_API_URL: ('review_highlights',),
+    REVIEWS_API_URL: ('reviews',),
+    SEARCH_API_URL: ('businesses',),
+    TRANSACTION_SEARCH_API_URL: ('businesses',),
+}
+
+
+def endpoint_template(url: str) -> str:
+    """
+        Map an API URL back to the endpoint URL it was built from, e.g., the Business API URL of a specific business
+        maps to `BUSINESS_API_URL`. URLs that don't belong to any known endpoint are returned unchanged.
+    """
+    if url in _FIXED_API_URLS:
+        return url
+
+    for prefix, suffix, template in _TEMPLATED_API_URLS:
+        if url.startswith(prefix) and url.endswith(suffix):
+            value = url[len(prefix):len(url) - len(suffix)]
+            if value and '/' not in value:
+                return template
+
+    return url
+
+
+def project_fields(url: str, response: dict[str, Any], fields: str | Iterable[str]) -> dict[str, Any]:
+    """
+        Keep only the given top-level `fields` (a list, or a comma-delimited string) of each record in a response from
+        `url`, e.g., each business of a Search API response. Anything else in the response, such as a search's
+        `total`, is kept as is. The response itself is not modified.
+    """
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    fields = frozenset(field.strip() for field in fields)
+
+    def project(record: dict[str, Any]) -> dict[str, Any]:
+        return {k: v for k, v in record.items() if k in fields}
+
+    keys = _RECORD_KEYS.get(endpoint_template(url))
+    if keys is None:
+        return project(response)
+
+    projected = dict(response)
+    for key in keys:
+        records = response.get(key)
+        if isinstance(records, list):
+            projected[key] = [project(record) for record in records]
+        elif isinstance(records, dict):
+            projected[key] = project(records)
+    return projected
+
 
 class YelpAPI:
     """
@@ -76,9 +159,18 @@ class YelpAPI:
         precious API calls, each method explicitly checks for parameters that are required in order for the query to
         succeed before issuing the call.
 
-        This class will create and use a single `requests.Session` object for all API calls, which will provide a nice
-        performance boost with many calls. To avoid keeping unnecessary connections open, you should be sure to close
-        the Session once all Yelp API interactions are complete. This can be done manully by calling close() or by
+        Every method also accepts a `deadline` (a `yelpapi.deadline.Deadline`), which is not sent to Yelp. The
+        request's timeout is shrunk to fit the time remaining, and `DeadlineExceeded` is raised instead of issuing
+        the request if the deadline has already passed or been cancelled.
+
+        Similarly, every method accepts `fields`, a list (or comma-delimited string) of the record fields to keep,
+        e.g., `fields=['id', 'name', 'rating']`. Every other field is dropped from the returned records (e.g., each
+        business in a search) as soon as the response is decoded. See `project_fields()`.
+
+        By default, this class will create and use a single `requests.Session` object for all API calls, which will
+        provide a nice performance boost with many calls. A different transport (see `yelpapi.transport`) can be
+        given at construction time instead. To avoid keeping unnecessary connections open, you should be sure to close
+        the transport once all Yelp API interactions are complete. This can be done manully by calling close() or by
         using it as a context manager.
     """
 
@@ -89,7 +181,7 @@ class YelpAPI:
         """
         pass
 
-    def __init__(self, api_key: str, timeout_s: float | None = None) -> None:
+    def __init__(self, api_key: str, timeout_s: float | None = None, transport: Transport | None = None) -> None:
         """
             Instantiate a YelpAPI object. An API key from Yelp is required.
 
@@ -101,16 +193,23 @@ class YelpAPI:
                   the timeout expires before the request completes, then a Timeout
                   exception will be raised. If this is not given, the default is to
                   block indefinitely.
+                * transport - Transport used to issue all API calls (see `yelpapi.transport`). If this is not given,
+                  a `RequestsTransport` is used. The transport is closed when this object is closed.
+
+            Hooks can be registered by appending them to `self.hooks['request']` (called with a
+            `yelpapi.tracing.TraceSpan` before each API call) and `self.hooks['response']` (called with the
+            finished span after each API call). Spans are only recorded while at least one hook is registered.
         """
         self._timeout_s = timeout_s
-        self._yelp_session = requests.Session()
+        self._transport = RequestsTransport() if transport is None else transport
+        self.hooks: dict[str, list[Callable[[TraceSpan], Any]]] = {'request': [], 'response': []}
         self._headers = {'Authorization': f'Bearer {api_key}'}
 
     def close(self) -> None:
         """
-            When the user is done interacting with the API, self.close() should be called to close the Session.
+            When the user is done interacting with the API, self.close() should be called to close the transport.
         """
-        self._yelp_session.close()
+        self._transport.close()
 
     def __enter__(self) -> YelpAPI:
         return self
@@ -365,21 +464,57 @@ class YelpAPI:
             All query methods have the same logic, so don't repeat it! Query the URL, parse the response as JSON,
             and check for errors. If all goes well, return the parsed JSON.
         """
+        deadline: Deadline | None = kwargs.pop('deadline', None)
+        fields: str | Iterable[str] | None = kwargs.pop('fields', None)
+        timeout = self._timeout_s if deadline is None else deadline.timeout(self._timeout_s)
         parameters = {k: v for k, v in kwargs.items() if v is not None}
-        response = self._yelp_session.get(
-            url,
-            headers=self._headers,
-            params=parameters,
-            timeout=self._timeout_s,
-        )
-        response.raise_for_status()
-
-        response_json = response.json()
-
-        # Yelp can return one of many different API errors, so check for one of them.
-        # The Yelp Fusion API does not yet have a complete list of errors, but this is on the TODO list; see
-        # https://github.com/Yelp/yelp-fusion/issues/95 for more info.
-        if 'error' in response_json:
-            raise YelpAPI.YelpAPIError(f'{response_json["error"]["code"]}: {response_json["error"]["description"]}')
-
-        return response_json
+
+        span = None
+        if self.hooks['request'] or self.hooks['response']:
+            span = TraceSpan(endpoint_template(url), url, len(parameters))
+            span_token = _current_span.set(span)
+
+        deadline_token = _current_deadline.set(deadline)
+        try:
+            # Request hooks run inside the try, so that the response hooks still see the span (with its error) and
+            # the context is restored even if a request hook raises.
+            if span is not None:
+                for hook in self.hooks['request']:
+                    hook(span)
+                span.mark('request_hooks')
+
+            response = self._transport.get(
+                url,
+                headers=self._headers,
+                params=parameters,
+                timeout=timeout,
+            )
+            if span is not None:
+                span.mark('transport')
+                span.record_response(response)
+            response.raise_for_status()
+
+            response_json = response.json()
+            if span is not None:
+                span.mark('decode')
+
+            # Yelp can return one of many different API errors, so check for one of them.
+            # The Yelp Fusion API does not yet have a complete list of errors, but this is on the TODO list; see
+            # https://github.com/Yelp/yelp-fusion/issues/95 for more info.
+            if 'error' in response_json:
+                raise YelpAPI.YelpAPIError(f'{response_json["error"]["code"]}: {response_json["error"]["description"]}')
+
+            if fields is not None:
+                response_json = project_fields(url, response_json, fields)
+            return response_json
+        except Exception as e:
+            if span is not None:
+                span.error = e
+            raise
+        finally:
+            _current_deadline.reset(deadline_token)
+            if span is not None:
+                span.finish()
+                _current_span.reset(span_token)
+                for hook in self.hooks['response']:
+                    hook(span)